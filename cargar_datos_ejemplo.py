@@ -2,14 +2,14 @@
 # Ejecutar con: python manage.py shell < cargar_datos_ejemplo.py
 
 # Importamos los modelos
-from .tienda.models import Categoria, Producto, Proveedor, Cliente
+from tienda.models import Categoria, Producto, Proveedor, Cliente
 
-# Limpiamos datos anteriores (opcional)
+# Limpiamos datos anteriores (opcional); _base_manager incluye los desactivados
 print("Limpiando datos anteriores...")
-Producto.objects.all().delete()
-Categoria.objects.all().delete()
-Proveedor.objects.all().delete()
-Cliente.objects.all().delete()
+Producto._base_manager.all().delete()
+Categoria._base_manager.all().delete()
+Proveedor._base_manager.all().delete()
+Cliente._base_manager.all().delete()
 
 # ============ CREAR CATEGORÍAS ============
 print("\nCreando categorías...")
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,11 +46,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tienda.metricas.MetricasMiddleware',  # Latencia, SQL y plantillas por vista (primero: mide a los demás)
+    'tienda.perfilado.PerfiladorMiddleware',  # Perfil por muestreo de peticiones lentas (ver TIENDA_PERFIL_*)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tienda.middleware.RolUsuarioMiddleware',  # request.rol (después de AuthenticationMiddleware)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,7 +62,7 @@ ROOT_URLCONF = 'sistema_tienda.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'tienda.metricas.PlantillasMedidas',  # DjangoTemplates que mide el tiempo de render
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,6 +70,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'tienda.context_processors.rol_usuario',
             ],
         },
     },
@@ -98,6 +103,79 @@ DATABASES = {
 }
 
 
+# Caché
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Guarda las estadísticas del dashboard (tienda/estadisticas.py). LocMemCache es
+# por proceso; con varios workers conviene un backend compartido (Redis/Memcached)
+# para que todos vean los mismos contadores.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda-default',
+    },
+    # Filas de las listas ({% cache %} en *_lista.html). La llave incluye el `modificado`
+    # del registro, así que una fila editada nunca se sirve vieja aunque cada proceso
+    # tenga su propia copia: se queda en memoria local (sin viaje de red por fila
+    # aunque 'default' pase a Redis/Memcached). Las filas viejas salen por TTL/MAX_ENTRIES.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda-fragmentos',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Copia local de las sesiones (tienda/sesiones.py): la lectura por petición no va
+    # a la base ni a la red. TIENDA_SESION_CACHE_TTL acota cuánto dura cada copia; las
+    # sesiones cerradas se anotan en 'acceso' para que ningún worker siga usando la suya.
+    'sesiones': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda-sesiones',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Contadores de intentos de login (tienda/acceso.py) y sesiones cerradas (tienda/sesiones.py):
+    # deben verlos todos los workers, así que viven en la base aunque 'default' sea local. La tabla la crea migrate
+    # (tienda/migrations/0013); si se agrega otra DatabaseCache: python manage.py createcachetable
+    # (con Redis/Memcached en producción, este alias puede apuntar a ese mismo servidor).
+    'acceso': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'tienda_cache_acceso',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+
+# Sesiones y mensajes
+# TIENDA_SESIONES elige dónde viven las sesiones:
+# - 'cached_db' (defecto): tienda.sesiones, base de datos con copia en la caché 'sesiones';
+#   solo escribe django_session cuando los datos cambian.
+# - 'signed_cookies': todo en una cookie firmada, sin E/S de sesión en el servidor.
+#   Sirve porque la sesión solo guarda el login (unos cientos de bytes); a cambio,
+#   cerrar sesión no invalida una copia robada de la cookie hasta que vence.
+# - 'db': el motor de Django sin caché (una lectura de django_session por petición).
+# Los mensajes (messages.success tras cada alta/edición) van en su propia cookie y
+# no escriben la sesión.
+
+TIENDA_SESIONES = os.environ.get('TIENDA_SESIONES', 'cached_db')
+SESSION_ENGINE = {
+    'cached_db': 'tienda.sesiones',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[TIENDA_SESIONES]
+SESSION_CACHE_ALIAS = 'sesiones'
+TIENDA_SESION_CACHE_TTL = 60  # Segundos que un worker usa su copia sin releer la base
+TIENDA_SESION_CACHE_CERRADAS = 'acceso'  # Marcas de sesiones cerradas que ven todos los workers
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
+# Autenticación
+# PerfilModelBackend carga User y PerfilUsuario en una sola consulta.
+# ModelBackend se mantiene para que las sesiones abiertas antes del cambio sigan válidas.
+
+AUTHENTICATION_BACKENDS = [
+    'tienda.backends.PerfilModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -152,4 +230,17 @@ LOGIN_REDIRECT_URL = 'home'
 # URL a la que se redirige DESPUÉS de cerrar sesión
 LOGOUT_REDIRECT_URL = 'login'
 
+# Métricas por vista (tienda/metricas.py): /metrics/ para usuarios staff o con este token
+# (Authorization: Bearer <token>); vacío = solo staff
+TIENDA_METRICAS_TOKEN = os.environ.get('TIENDA_METRICAS_TOKEN', '')
+# Encabezado Server-Timing en cada respuesta (desglose visible en el navegador; expone tiempos internos)
+TIENDA_SERVER_TIMING = False
+
+# Perfilado de peticiones (tienda/perfilado.py); se consulta en /perfiles/ (staff)
+TIENDA_PERFIL_FRACCION = 0.01  # Fracción de peticiones perfiladas al azar (0 = ninguna)
+TIENDA_PERFIL_UMBRAL_MS = 1000  # Peticiones más lentas que esto siempre se guardan (None = no)
+TIENDA_PERFIL_INTERVALO_MS = 10  # Intervalo entre muestras de pila
+TIENDA_PERFIL_DIR = BASE_DIR / 'perfiles'  # Buffer circular de perfiles (fuera de git)
+TIENDA_PERFIL_MAX = 200  # Perfiles conservados
+
 CRISPY_TEMPLATE_PACK = "bootstrap5"
\ No newline at end of file
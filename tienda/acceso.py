@@ -0,0 +1,67 @@
+# tienda/acceso.py
+# Límite de intentos fallidos de login (lo usa views.login_view).
+#
+# Se cuentan los fallos por usuario y por IP en la caché TIENDA_LOGIN_CACHE ('acceso')
+# con ventanas fijas de TIENDA_LOGIN_VENTANA segundos. Si cualquiera de los dos
+# contadores llegó a su límite, el intento se rechaza ANTES de autenticar: un ataque
+# de fuerza bruta no consume PBKDF2 (cientos de ms de CPU por intento) en los workers.
+#
+# Los contadores deben verse desde todos los workers: la caché 'acceso' es compartida
+# (DatabaseCache en settings, o Redis/Memcached). Con una LocMemCache cada worker
+# llevaría su propia cuenta y el límite efectivo se multiplicaría por los workers.
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+PREFIJO = 'tienda:login'
+INTENTOS_USUARIO = 5  # Fallos por usuario dentro de la ventana
+INTENTOS_IP = 20  # Fallos por IP (una caja compartida puede equivocarse con varios usuarios)
+VENTANA = 15 * 60  # Segundos
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'TIENDA_LOGIN_{nombre}', defecto)
+
+
+def _cache():
+    return caches[_config('CACHE', 'acceso')]
+
+
+def ip_de(request):
+    """IP del cliente; detrás de un proxy, TIENDA_LOGIN_IP_META nombra la cabecera confiable"""
+    return request.META.get(_config('IP_META', 'REMOTE_ADDR'), '') or ''
+
+
+def _claves(username, ip):
+    # El usuario va como hash: llaves de longitud fija y sin caracteres raros para memcached
+    usuario = hashlib.md5(username.strip().lower().encode()).hexdigest()
+    return f'{PREFIJO}:usuario:{usuario}', f'{PREFIJO}:ip:{ip}'
+
+
+def bloqueado(username, ip):
+    """True si el usuario o la IP agotaron sus intentos (una sola lectura de caché)"""
+    clave_usuario, clave_ip = _claves(username, ip)
+    fallos = _cache().get_many([clave_usuario, clave_ip])
+    return (fallos.get(clave_usuario, 0) >= _config('INTENTOS_USUARIO', INTENTOS_USUARIO)
+            or fallos.get(clave_ip, 0) >= _config('INTENTOS_IP', INTENTOS_IP))
+
+
+def registrar_fallo(username, ip):
+    cache = _cache()
+    for clave in _claves(username, ip):
+        cache.add(clave, 0, _config('VENTANA', VENTANA))  # Abre la ventana si no existe
+        try:
+            cache.incr(clave)  # Atómico en Redis/Memcached; en DatabaseCache, leer y escribir
+        except ValueError:
+            cache.set(clave, 1, _config('VENTANA', VENTANA))  # Expiró entre add() e incr()
+
+
+def registrar_exito(username, ip):
+    """Un login correcto borra los fallos del usuario (los de la IP siguen contando)"""
+    _cache().delete(_claves(username, ip)[0])
+
+
+def reiniciar(username, ip):
+    """Borra ambos contadores (desbloqueo manual, benchmark_login)"""
+    _cache().delete_many(list(_claves(username, ip)))
@@ -1,8 +1,58 @@
 # tienda/admin.py
 # Importamos el módulo admin de Django para registrar modelos
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
 # Importamos todos nuestros modelos
-from .models import Categoria, Producto, Proveedor, Cliente, PerfilUsuario
+from .models import Categoria, Producto, Proveedor, Cliente, PerfilUsuario, MovimientoInventario
+from . import busqueda, inventario, papelera
+from .forms import StockMostradoMixin
+
+# Máximo de resultados que devuelve la búsqueda de productos en el admin
+ADMIN_LIMITE_BUSQUEDA = 500
+
+
+# ============ ELIMINACIÓN LÓGICA ============
+class PapeleraAdminMixin:
+    """
+    El admin ve también las filas desactivadas (el manager por defecto las oculta, ver
+    tienda/papelera.py) y puede desactivarlas o reactivarlas. No hay borrado masivo
+    (delete_selected): el DELETE en cascada de muchas filas lo hace purgar_inactivos
+    por lotes; el botón de borrar de cada registro sigue siendo un DELETE real.
+    """
+    actions = ['desactivar', 'reactivar']
+
+    def get_queryset(self, request):
+        queryset = self.model._base_manager.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Un producto de una categoría o proveedor desactivado se sigue pudiendo guardar
+        if db_field.related_model in papelera.MODELOS and 'queryset' not in kwargs:
+            kwargs['queryset'] = db_field.related_model._base_manager.all()
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    @admin.action(description='Desactivar los seleccionados (eliminación lógica)')
+    def desactivar(self, request, queryset):
+        objetos = list(queryset.filter(activo__in=[True]))
+        for objeto in objetos:
+            papelera.desactivar(objeto)
+        self.message_user(request, f'{len(objetos)} desactivados.')
+
+    @admin.action(description='Reactivar los seleccionados')
+    def reactivar(self, request, queryset):
+        objetos = list(queryset.filter(activo__in=[False]))
+        for objeto in objetos:
+            papelera.reactivar(objeto)
+        self.message_user(request, f'{len(objetos)} reactivados.')
 
 
 # ============ CONFIGURACIÓN DEL ADMIN PARA PERFILES DE USUARIO ============
@@ -18,44 +68,103 @@ class PerfilUsuarioAdmin(admin.ModelAdmin):
 
 # ============ CONFIGURACIÓN DEL ADMIN PARA CATEGORÍAS ============
 @admin.register(Categoria)  # Decorador que registra el modelo Categoria
-class CategoriaAdmin(admin.ModelAdmin):
+class CategoriaAdmin(PapeleraAdminMixin, admin.ModelAdmin):
     """Configuración personalizada del admin para Categorías"""
-    list_display = ('id', 'nombre', 'fecha_creacion')  # Columnas que se muestran en la lista
+    list_display = ('id', 'nombre', 'stock_minimo', 'activo', 'fecha_creacion')  # Columnas que se muestran en la lista
     search_fields = ('nombre',)  # Campos por los que se puede buscar
-    list_filter = ('fecha_creacion',)  # Filtros laterales
+    list_filter = ('activo', 'fecha_creacion')  # Filtros laterales
     ordering = ('nombre',)  # Orden por defecto
 
+    def save_model(self, request, obj, form, change):
+        """Desmarcar 'activo' desactiva también sus productos, como papelera.desactivar()"""
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if change and 'activo' in form.changed_data and not obj.activo:
+                papelera.desactivar_productos(obj)
+
 
 # ============ CONFIGURACIÓN DEL ADMIN PARA PRODUCTOS ============
+class ProductoAdminForm(StockMostradoMixin, forms.ModelForm):
+    """El stock editado en el admin se aplica como ajuste contra el valor mostrado"""
+
+    class Meta:
+        model = Producto
+        fields = '__all__'
+
+
 @admin.register(Producto)
-class ProductoAdmin(admin.ModelAdmin):
+class ProductoAdmin(PapeleraAdminMixin, admin.ModelAdmin):
     """Configuración personalizada del admin para Productos"""
+    form = ProductoAdminForm
     # --- CORREGIDO AQUÍ ---
-    list_display = ('id', 'nombre', 'categoria', 'precio_venta', 'stock', 'activo', 'fecha_creacion')  # Columnas visibles
+    list_display = ('id', 'nombre', 'categoria', 'precio_venta', 'stock', 'stock_minimo', 'requiere_reorden', 'activo', 'fecha_creacion')  # Columnas visibles
     search_fields = ('nombre', 'descripcion')  # Búsqueda por nombre o descripción
-    list_filter = ('categoria', 'activo', 'fecha_creacion')  # Filtros por categoría, estado y fecha
+    list_filter = ('categoria', 'activo', 'requiere_reorden', 'fecha_creacion')  # Filtros por categoría, estado, reorden y fecha
     # --- Y CORREGIDO AQUÍ ---
     list_editable = ('precio_venta', 'stock', 'activo')  # Campos editables directamente en la lista
     ordering = ('-fecha_creacion',)  # Orden descendente por fecha
 
+    def get_search_results(self, request, queryset, search_term):
+        """Usa el índice de trigramas en lugar de icontains (que recorre toda la tabla)"""
+        if not search_term:
+            return queryset, False
+        # El admin también ve los desactivados
+        resultados = busqueda.buscar_ids(search_term, limite=ADMIN_LIMITE_BUSQUEDA, solo_activos=False)
+        ids = [producto_id for producto_id, _ in resultados]
+        return queryset.filter(pk__in=ids), False
+
+    def get_changelist_form(self, request, **kwargs):
+        # list_editable también necesita el stock mostrado para calcular el ajuste
+        kwargs.setdefault('form', ProductoAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        """El stock editado (también desde list_editable) se aplica como ajuste en el libro de inventario"""
+        try:
+            inventario.guardar_producto(form, usuario=request.user)
+        except inventario.SinStock as exc:
+            # Las ventas hechas mientras se editaba dejarían el stock negativo: se conserva el actual
+            inventario.guardar_producto(form, usuario=request.user, ajustar_stock=False)
+            self.message_user(request, f'{obj}: no se ajustó el stock ({exc}).', level=messages.WARNING)
+
 
 # ============ CONFIGURACIÓN DEL ADMIN PARA PROVEEDORES ============
 @admin.register(Proveedor)
-class ProveedorAdmin(admin.ModelAdmin):
+class ProveedorAdmin(PapeleraAdminMixin, admin.ModelAdmin):
     """Configuración personalizada del admin para Proveedores"""
     # --- CORREGIDO AQUÍ (eliminado 'fecha_registro') ---
-    list_display = ('id', 'nombre', 'empresa', 'telefono', 'email')
+    list_display = ('id', 'nombre', 'empresa', 'telefono', 'email', 'activo')
     search_fields = ('nombre', 'empresa', 'email')  # Búsqueda por nombre, empresa o email
     # --- CORREGIDO AQUÍ (eliminado 'fecha_registro') ---
-    list_filter = ('empresa',) # Cambiado a 'empresa' como ejemplo
+    list_filter = ('activo', 'empresa') # Cambiado a 'empresa' como ejemplo
     ordering = ('empresa',)
 
 
 # ============ CONFIGURACIÓN DEL ADMIN PARA CLIENTES ============
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(PapeleraAdminMixin, admin.ModelAdmin):
     """Configuración personalizada del admin para Clientes"""
-    list_display = ('id', 'nombre', 'apellido', 'email', 'telefono', 'fecha_registro')
+    list_display = ('id', 'nombre', 'apellido', 'email', 'telefono', 'activo', 'fecha_registro')
     search_fields = ('nombre', 'apellido', 'email')  # Búsqueda por nombre, apellido o email
-    list_filter = ('fecha_registro',)
-    ordering = ('apellido', 'nombre')  # Orden por apellido y luego nombre
\ No newline at end of file
+    list_filter = ('activo', 'fecha_registro')
+    ordering = ('apellido', 'nombre')  # Orden por apellido y luego nombre
+
+
+# ============ CONFIGURACIÓN DEL ADMIN PARA MOVIMIENTOS DE INVENTARIO ============
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    """El libro es solo de inserción: aquí se consulta, los ajustes se hacen editando el producto"""
+    list_display = ('id', 'fecha', 'producto', 'tipo', 'cantidad', 'usuario', 'venta', 'nota')
+    list_filter = ('tipo', 'fecha')
+    list_select_related = ('producto', 'usuario')  # Evita una consulta por fila
+    raw_id_fields = ('producto', 'venta')
+    ordering = ('-fecha',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,455 @@
+# tienda/api.py
+# API JSON para cajas (POS) y lectores de inventario.
+#
+# Rutas (ver tienda/urls.py), con <recurso> = productos, clientes, categorias,
+# proveedores o ventas:
+#     GET    api/<recurso>/              lista paginada por cursor
+#     POST   api/<recurso>/lote/         crear/actualizar/eliminar muchos en una petición
+#     GET    api/<recurso>/<id>/         un registro
+#     PATCH  api/<recurso>/<id>/         actualización parcial
+#     DELETE api/<recurso>/<id>/         eliminación lógica (ver tienda/papelera.py); ventas y
+#                                        movimientos no se eliminan (405)
+#
+# - Autenticación por sesión (la misma del sitio); las peticiones POST/PATCH/DELETE
+#   llevan el token CSRF en el encabezado X-CSRFToken.
+# - Los permisos por rol son los mismos que en las vistas HTML.
+# - ?fields=id,nombre devuelve solo esas columnas (y solo esas se leen de la base).
+# - GET responde con ETag y 304 si coincide con If-None-Match; PATCH/DELETE
+#   respetan If-Match (412 si el registro cambió desde que se leyó).
+# - Los lotes son todo o nada: si un renglón falla no se aplica ninguno y se
+#   devuelven los errores de cada renglón.
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import inventario, papelera, roles
+from .forms import CategoriaForm, ClienteForm, ProductoForm, ProveedorForm
+from .models import Categoria, Cliente, MovimientoInventario, Producto, Proveedor, Venta
+from .paginacion import CursorInvalido, PaginadorKeyset
+from .ventas import ErrorVenta, registrar_lote
+
+API_POR_PAGINA = 100
+API_POR_PAGINA_MAX = 500
+API_LOTE_MAX = 500  # Operaciones máximas por lote (crear + actualizar + eliminar)
+
+TODOS = ('vendedor', 'gerente', 'administrador')
+GESTION = ('gerente', 'administrador')
+ADMINISTRADOR = ('administrador',)
+
+
+class ErrorApi(Exception):
+    """Error que se devuelve al cliente como JSON con el código HTTP indicado"""
+
+    def __init__(self, mensaje, estado=400, **extra):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.extra = extra
+
+
+# ============ FORMULARIOS DE LA API ============
+class ProductoApiForm(ProductoForm):
+    class Meta(ProductoForm.Meta):
+        fields = ProductoForm.Meta.fields + ['proveedor']  # En la API también se asigna el proveedor
+
+
+# ============ RECURSOS ============
+class Recurso:
+    """Qué modelo expone una ruta de la API, con qué campos y qué roles"""
+
+    def __init__(self, modelo, campos, form_class=None, lectura=TODOS, escritura=GESTION,
+                 eliminacion=ADMINISTRADOR):
+        self.modelo = modelo
+        self.campos = tuple(campos)  # Campos visibles; el primero debe ser 'id'
+        self.form_class = form_class  # None: no se crea/actualiza con formulario
+        self.lectura = lectura
+        self.escritura = escritura
+        self.eliminacion = eliminacion
+
+    def queryset(self):
+        return self.modelo._default_manager.all()
+
+    # ---------- Serialización ----------
+    def campos_pedidos(self, request):
+        """Campos de ?fields=, validados contra los del recurso (siempre incluye 'id')"""
+        texto = request.GET.get('fields', '').strip()
+        if not texto:
+            return self.campos
+        pedidos = [c.strip() for c in texto.split(',') if c.strip()]
+        desconocidos = [c for c in pedidos if c not in self.campos]
+        if desconocidos:
+            raise ErrorApi(f'Campos desconocidos: {", ".join(desconocidos)}', campos_validos=list(self.campos))
+        return ('id',) + tuple(c for c in pedidos if c != 'id')
+
+    def serializar(self, objeto, campos=None):
+        datos = {}
+        for nombre in campos or self.campos:
+            campo = self.modelo._meta.get_field(nombre)
+            datos[nombre] = getattr(objeto, campo.attname)  # Llaves foráneas como id, sin consultar la relación
+        return datos
+
+    # ---------- Escritura ----------
+    def crear(self, datos, request):
+        form = self.form_class(data=datos)
+        if not form.is_valid():
+            raise ErrorApi('Datos inválidos', errores=form.errors.get_json_data())
+        return form.save()
+
+    def actualizar(self, objeto, datos, request):
+        # Actualización parcial: lo que no viene en `datos` conserva su valor actual
+        completos = model_to_dict(objeto, fields=self.form_class._meta.fields)
+        completos.update(datos)
+        form = self.form_class(data=completos, instance=objeto)
+        if not form.is_valid():
+            raise ErrorApi('Datos inválidos', errores=form.errors.get_json_data())
+        return form.save()
+
+    def eliminar(self, objetos):
+        for objeto in objetos:
+            if isinstance(objeto, papelera.MODELOS):
+                papelera.desactivar(objeto)  # Eliminación lógica, como en las vistas
+            else:
+                objeto.delete()
+
+
+class RecursoProducto(Recurso):
+    """El stock se guarda como ajuste en el libro de inventario, no se sobrescribe"""
+
+    def _guardar(self, form, request):
+        if not form.is_valid():
+            raise ErrorApi('Datos inválidos', errores=form.errors.get_json_data())
+        try:
+            return inventario.guardar_producto(form, usuario=request.user)
+        except inventario.SinStock as exc:
+            raise ErrorApi(str(exc), estado=409)
+
+    def crear(self, datos, request):
+        return self._guardar(self.form_class(data=datos), request)
+
+    def actualizar(self, objeto, datos, request):
+        completos = model_to_dict(objeto, fields=self.form_class._meta.fields)
+        completos.update(datos)
+        return self._guardar(self.form_class(data=completos, instance=objeto), request)
+
+
+class RecursoMovimiento(Recurso):
+    """
+    Libro de inventario: solo se agregan movimientos (entradas, ajustes, devoluciones),
+    nunca se editan ni se borran. Las salidas por venta las registra /api/ventas/.
+    """
+    TIPOS_PERMITIDOS = ('entrada', 'ajuste', 'devolucion')
+
+    def crear_lote(self, renglones, request):
+        movimientos = []
+        for i, datos in enumerate(renglones):
+            try:
+                producto_id, cantidad = int(datos['producto']), int(datos['cantidad'])
+                tipo = datos.get('tipo', 'entrada')
+            except (KeyError, TypeError, ValueError):
+                raise ErrorApi(f'Movimiento {i + 1}: se requieren "producto" y "cantidad" enteros')
+            if tipo not in self.TIPOS_PERMITIDOS or not cantidad:
+                raise ErrorApi(f'Movimiento {i + 1}: tipo o cantidad inválidos', tipos=list(self.TIPOS_PERMITIDOS))
+            movimientos.append(MovimientoInventario(
+                producto_id=producto_id, tipo=tipo, cantidad=cantidad, usuario=request.user,
+                nota=str(datos.get('nota', ''))[:200],
+            ))
+        ids = {m.producto_id for m in movimientos}
+        faltantes = ids - set(Producto._base_manager.filter(pk__in=ids).values_list('pk', flat=True))
+        if faltantes:
+            raise ErrorApi(f'Productos inexistentes: {", ".join(map(str, sorted(faltantes)))}', estado=404)
+        try:
+            # Un UPDATE por producto y un INSERT para todo el lote (con MySQL el 'id' de la respuesta es null)
+            inventario.registrar_movimientos(movimientos)
+        except inventario.SinStock as exc:
+            raise ErrorApi(str(exc), estado=409)
+        return movimientos
+
+    def actualizar(self, objeto, datos, request):
+        raise ErrorApi('Los movimientos no se modifican', estado=405)
+
+    def eliminar(self, objetos):
+        raise ErrorApi('Los movimientos no se eliminan; registre un ajuste', estado=405)
+
+
+class RecursoVenta(Recurso):
+    """
+    Las ventas se crean con sus renglones (descuentan stock) y no se editan ni se
+    eliminan: borrarla no devolvería el stock. Una devolución se registra como
+    movimiento 'devolucion' en /api/movimientos/.
+    """
+
+    def crear_lote(self, renglones, request):
+        ventas, errores = {}, []  # {índice en el lote: venta}
+        for i, datos in enumerate(renglones):
+            if not isinstance(datos, dict):
+                errores.append({'operacion': 'crear', 'indice': i, 'error': 'Cada venta debe ser un objeto JSON'})
+            elif datos.get('cliente') is not None and not _es_id(datos['cliente']):
+                errores.append({'operacion': 'crear', 'indice': i, 'error': '"cliente" debe ser un id entero'})
+            else:
+                ventas[i] = {'lineas': datos.get('lineas', []), 'cliente_id': datos.get('cliente')}
+        # Los clientes de todo el lote en una consulta; uno desactivado ya no puede comprar
+        clientes = {v['cliente_id'] for v in ventas.values() if v['cliente_id'] is not None}
+        faltantes = clientes - set(Cliente.objects.filter(pk__in=clientes).values_list('pk', flat=True))
+        errores.extend({'operacion': 'crear', 'indice': i, 'error': 'Cliente inexistente o inactivo'}
+                       for i, venta in ventas.items() if venta['cliente_id'] in faltantes)
+        if errores:
+            raise ErrorApi('El lote no se aplicó', errores=sorted(errores, key=lambda e: e['indice']))
+        try:
+            return registrar_lote(list(ventas.values()), vendedor=request.user)
+        except (ErrorVenta, TypeError, ValueError) as exc:
+            raise ErrorApi(str(exc), estado=409 if isinstance(exc, ErrorVenta) else 400)
+
+    def actualizar(self, objeto, datos, request):
+        raise ErrorApi('Las ventas no se modifican', estado=405)
+
+    def eliminar(self, objetos):
+        raise ErrorApi('Las ventas no se eliminan; registre una devolución', estado=405)
+
+
+RECURSOS = {
+    'productos': RecursoProducto(
+        Producto, ['id', 'nombre', 'descripcion', 'precio_venta', 'stock', 'stock_minimo', 'requiere_reorden',
+                   'categoria', 'proveedor', 'activo', 'fecha_creacion'],
+        form_class=ProductoApiForm,
+    ),
+    'clientes': Recurso(
+        Cliente, ['id', 'nombre', 'apellido', 'email', 'telefono', 'direccion', 'fecha_registro'],
+        form_class=ClienteForm,
+    ),
+    'categorias': Recurso(
+        Categoria, ['id', 'nombre', 'descripcion', 'stock_minimo', 'fecha_creacion'],
+        form_class=CategoriaForm, lectura=GESTION,
+    ),
+    'proveedores': Recurso(
+        Proveedor, ['id', 'nombre', 'empresa', 'telefono', 'email', 'direccion'],
+        form_class=ProveedorForm, lectura=GESTION,
+    ),
+    'movimientos': RecursoMovimiento(
+        MovimientoInventario, ['id', 'producto', 'tipo', 'cantidad', 'fecha', 'usuario', 'venta', 'nota'],
+        lectura=GESTION,
+    ),
+    'ventas': RecursoVenta(
+        Venta, ['id', 'fecha_venta', 'total', 'cliente', 'vendido_por'],
+        lectura=GESTION, escritura=TODOS,  # Todos venden; solo gestión consulta el historial
+    ),
+}
+
+
+# ============ UTILIDADES ============
+def _json(datos, estado=200):
+    contenido = json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return HttpResponse(contenido, status=estado, content_type='application/json; charset=utf-8')
+
+
+def _error(exc):
+    return _json(dict({'error': str(exc)}, **exc.extra), estado=exc.estado)
+
+
+def _etag(datos):
+    crudo = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True).encode('utf-8')
+    return '"%s"' % hashlib.md5(crudo, usedforsecurity=False).hexdigest()
+
+
+def _respuesta_condicional(request, datos, etag=None):
+    """Respuesta JSON con ETag; 304 si el cliente ya tiene esta misma versión"""
+    etag = etag or _etag(datos)
+    condicional = get_conditional_response(request, etag=etag)
+    respuesta = condicional if condicional is not None else _json(datos)
+    respuesta['ETag'] = etag
+    return respuesta
+
+
+def _leer_json(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        raise ErrorApi('El cuerpo no es JSON válido')
+
+
+def _es_id(valor):
+    # bool es subclase de int, pero true no es un id; listas u objetos no se pueden buscar
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _entero(valor, defecto, minimo, maximo):
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return max(minimo, min(valor, maximo))
+
+
+def vista_api(roles_de):
+    """
+    Decorador de las vistas de la API: resuelve el recurso, exige sesión y el rol
+    que indique `roles_de(recurso, request)`, y convierte ErrorApi en JSON.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, recurso, *args, **kwargs):
+            try:
+                config = RECURSOS.get(recurso)
+                if config is None:
+                    raise ErrorApi(f'Recurso desconocido: {recurso}', estado=404)
+                if not request.user.is_authenticated:
+                    raise ErrorApi('Autenticación requerida', estado=401)
+                permitidos = roles_de(config, request)
+                if not roles.rol_de_request(request).permite(*permitidos):
+                    raise ErrorApi('Acceso denegado', estado=403, roles=list(permitidos))
+                return view_func(request, config, *args, **kwargs)
+            except ErrorApi as exc:
+                return _error(exc)
+        return _wrapped_view
+    return decorator
+
+
+def _roles_por_metodo(config, request):
+    return {
+        'GET': config.lectura,
+        'HEAD': config.lectura,
+        'DELETE': config.eliminacion,
+    }.get(request.method, config.escritura)
+
+
+def _roles_lote(config, request):
+    # Con eliminaciones en el lote se exige además el rol de eliminación
+    roles_lote = config.escritura
+    try:
+        if json.loads(request.body or b'{}').get('eliminar'):
+            roles_lote = tuple(r for r in config.escritura if r in config.eliminacion)
+    except (ValueError, AttributeError):
+        pass  # El cuerpo inválido se reporta en la vista
+    return roles_lote
+
+
+# ============ VISTAS ============
+@require_GET
+@vista_api(lambda config, request: config.lectura)
+def lista(request, config):
+    """Lista por cursor en orden de id (?cursor=, ?por_pagina=, ?fields=)"""
+    campos = config.campos_pedidos(request)
+    por_pagina = _entero(request.GET.get('por_pagina'), API_POR_PAGINA, 1, API_POR_PAGINA_MAX)
+    queryset = config.queryset().only(*campos)
+    paginador = PaginadorKeyset(queryset, ('id',), descendente=False, por_pagina=por_pagina)
+    try:
+        pagina = paginador.pagina(request.GET.get('cursor'))
+    except CursorInvalido as exc:
+        raise ErrorApi(str(exc))
+    datos = {
+        'resultados': [config.serializar(obj, campos) for obj in pagina],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+    }
+    return _respuesta_condicional(request, datos)
+
+
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@vista_api(_roles_por_metodo)
+def detalle(request, config, pk):
+    """Un registro; PATCH y DELETE aceptan If-Match con el ETag del GET"""
+    objeto = config.queryset().filter(pk=pk).first()
+    if objeto is None:
+        raise ErrorApi('No encontrado', estado=404)
+    completo = config.serializar(objeto)
+    etag = _etag(completo)  # Siempre sobre el registro completo, aunque se pidan menos campos
+
+    if request.method in ('GET', 'HEAD'):
+        return _respuesta_condicional(request, config.serializar(objeto, config.campos_pedidos(request)), etag)
+
+    condicional = get_conditional_response(request, etag=etag)
+    if condicional is not None:
+        return condicional  # 412: el registro cambió desde que el cliente lo leyó
+
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            config.eliminar([objeto])
+        return HttpResponse(status=204)
+
+    datos = _leer_json(request)
+    if not isinstance(datos, dict):
+        raise ErrorApi('Se esperaba un objeto JSON')
+    with transaction.atomic():
+        objeto = config.actualizar(objeto, datos, request)
+    completo = config.serializar(objeto)
+    respuesta = _json(completo)
+    respuesta['ETag'] = _etag(completo)
+    return respuesta
+
+
+@require_POST
+@vista_api(_roles_lote)
+def lote(request, config):
+    """
+    Aplica un lote en una transacción. Cuerpo:
+        {"crear": [{...}, ...], "actualizar": [{"id": 1, ...}, ...], "eliminar": [3, 4]}
+    Para ventas, cada elemento de "crear" es {"lineas": [[producto, cantidad], ...], "cliente": id}.
+    """
+    cuerpo = _leer_json(request)
+    if not isinstance(cuerpo, dict):
+        raise ErrorApi('Se esperaba un objeto JSON')
+    crear = cuerpo.get('crear') or []
+    actualizar = cuerpo.get('actualizar') or []
+    eliminar = cuerpo.get('eliminar') or []
+    if not all(isinstance(x, list) for x in (crear, actualizar, eliminar)):
+        raise ErrorApi('"crear", "actualizar" y "eliminar" deben ser listas')
+    if len(crear) + len(actualizar) + len(eliminar) > API_LOTE_MAX:
+        raise ErrorApi(f'El lote excede {API_LOTE_MAX} operaciones', estado=413)
+
+    errores = []
+    creados, actualizados = [], []
+    # Un ErrorApi que escape del bloque (p. ej. stock insuficiente en ventas) revierte todo el lote
+    with transaction.atomic():
+        # Crear
+        if hasattr(config, 'crear_lote'):
+            creados = config.crear_lote(crear, request) if crear else []
+        else:
+            for i, datos in enumerate(crear):
+                try:
+                    if not isinstance(datos, dict):
+                        raise ErrorApi('Se esperaba un objeto JSON')
+                    creados.append(config.crear(datos, request))
+                except ErrorApi as exc:
+                    errores.append(dict({'operacion': 'crear', 'indice': i, 'error': str(exc)}, **exc.extra))
+
+        # Actualizar: todos los registros en una consulta
+        ids = [d.get('id') for d in actualizar if isinstance(d, dict)]
+        existentes = config.queryset().in_bulk([i for i in ids if _es_id(i)])
+        for i, datos in enumerate(actualizar):
+            try:
+                if not isinstance(datos, dict) or not _es_id(datos.get('id')):
+                    raise ErrorApi('Se esperaba un objeto JSON con "id" entero')
+                objeto = existentes.get(datos['id'])
+                if objeto is None:
+                    raise ErrorApi('No encontrado', estado=404)
+                cambios = {k: v for k, v in datos.items() if k != 'id'}
+                actualizados.append(config.actualizar(objeto, cambios, request))
+            except ErrorApi as exc:
+                errores.append(dict({'operacion': 'actualizar', 'indice': i, 'error': str(exc)}, **exc.extra))
+
+        # Eliminar
+        por_eliminar = list(config.queryset().filter(pk__in=[i for i in eliminar if _es_id(i)]))
+        encontrados = {obj.pk for obj in por_eliminar}
+        for i, pk in enumerate(eliminar):
+            if not _es_id(pk):
+                errores.append({'operacion': 'eliminar', 'indice': i, 'error': 'Se esperaba un id entero'})
+            elif pk not in encontrados:
+                errores.append({'operacion': 'eliminar', 'indice': i, 'error': 'No encontrado'})
+        if por_eliminar:
+            config.eliminar(por_eliminar)
+
+        if errores:
+            transaction.set_rollback(True)  # Todo o nada
+
+    if errores:
+        return _json({'error': 'El lote no se aplicó', 'errores': errores}, estado=400)
+    return _json({
+        'creados': [config.serializar(obj) for obj in creados],
+        'actualizados': [config.serializar(obj) for obj in actualizados],
+        'eliminados': eliminar,  # Sin errores: todos existían y se eliminaron
+    })
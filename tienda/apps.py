@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TiendaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tienda'
+
+    def ready(self):
+        # Conecta los receptores de señales (índice de búsqueda, contadores, etc.)
+        from . import signals  # noqa: F401
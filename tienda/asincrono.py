@@ -0,0 +1,42 @@
+# tienda/asincrono.py
+# Utilidades de las vistas async (home, reportes_ventas) para servir bajo ASGI
+# (sistema_tienda/asgi.py); bajo WSGI funcionan igual, Django les abre un event loop.
+#
+# El ORM es síncrono: en_paralelo() corre cada consulta independiente en un hilo del
+# pool (sync_to_async con thread_sensitive=False) y las espera juntas, así la vista
+# tarda lo que la más lenta y no la suma de todas. Cada hilo usa su propia conexión
+# (las conexiones de Django son por hilo), que se cierra al terminar como al final de
+# una petición; por eso las consultas no comparten transacción ni foto de los datos.
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.shortcuts import render
+
+from . import metricas, perfilado
+
+
+def _tarea(funcion):
+    def ejecutar():
+        close_old_connections()  # Conexión vieja o caída que dejó otra tarea en este hilo
+        try:
+            # Sus consultas cuentan en las métricas de la petición, y su pila y SQL en su perfil
+            with metricas.en_este_hilo(), perfilado.en_este_hilo():
+                return funcion()
+        finally:
+            close_old_connections()
+    return ejecutar
+
+
+async def en_paralelo(**funciones):
+    """Ejecuta cada función (sin argumentos) en su propio hilo, a la vez; devuelve {nombre: resultado}"""
+    nombres = list(funciones)
+    resultados = await asyncio.gather(*(
+        sync_to_async(_tarea(funciones[nombre]), thread_sensitive=False)() for nombre in nombres
+    ))
+    return dict(zip(nombres, resultados))
+
+
+async def renderizar(request, plantilla, context):
+    """render() en el hilo de la petición: la plantilla y los context processors usan el ORM"""
+    return await sync_to_async(render)(request, plantilla, context)
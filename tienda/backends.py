@@ -0,0 +1,31 @@
+# tienda/backends.py
+# Backend de autenticación de la tienda.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+UserModel = get_user_model()
+
+
+class PerfilModelBackend(ModelBackend):
+    """
+    Igual que ModelBackend, pero al cargar el usuario de la sesión trae también
+    su PerfilUsuario con un JOIN. Así rol_requerido, el middleware de roles y
+    la barra de navegación no necesitan otra consulta para saber el rol.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # ModelBackend, el siguiente en AUTHENTICATION_BACKENDS (solo está por las
+            # sesiones viejas), repetiría la misma verificación: un login fallido
+            # costaría dos hashes. PermissionDenied corta la lista.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('perfil').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
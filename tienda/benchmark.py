@@ -0,0 +1,499 @@
+# tienda/benchmark.py
+# Medición de las vistas con el cliente de pruebas de Django (lo usa el comando benchmark_vistas;
+# benchmark_login y benchmark_concurrencia usan medir_login y medir_concurrencia).
+#
+# Cada escenario (una URL + método) se abre con un usuario de cada rol sobre la base
+# actual (p. ej. la generada con generar_datos) y se mide:
+#   - latencia p50/p95/p99 de N repeticiones (después de unas de calentamiento),
+#   - número de consultas SQL y su tiempo (connection.execute_wrapper, sin DEBUG),
+#   - memoria pico de Python de una petición aparte (tracemalloc la hace más lenta,
+#     por eso no se mezcla con la latencia).
+# Cada petición corre dentro de una transacción que se revierte: crear, editar,
+# eliminar y vender no cambian los datos entre repeticiones ni entre corridas.
+#
+# La línea base es un JSON {escenario:rol: métricas}; comparar() devuelve las
+# regresiones (otro estado HTTP, un escenario que ya no se mide, más consultas, o
+# p95/memoria por encima de la tolerancia).
+import asyncio
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, transaction
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from . import acceso
+from .forms import CategoriaForm, ClienteForm, ProductoForm, ProveedorForm
+from .models import Categoria, Cliente, PerfilUsuario, Producto, Proveedor, Venta
+
+ROLES = ('vendedor', 'gerente', 'administrador')
+REPETICIONES = 20
+CALENTAMIENTO = 2
+REPETICIONES_EXPORTAR = 3  # Las exportaciones recorren tablas completas: pocas repeticiones bastan
+VENTAS_POR_LOTE = 10  # Ventas del escenario api_lote_ventas
+TOLERANCIA = 0.25  # +25% sobre la línea base en p95 o memoria es regresión...
+TOLERANCIA_MS = 5.0  # ...siempre que además pase de estos márgenes absolutos (ruido)
+TOLERANCIA_KB = 256
+
+
+class MedidorSQL:
+    """execute_wrapper que cuenta las consultas y suma su tiempo"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tiempo += time.perf_counter() - inicio
+
+
+class Escenario:
+    """
+    Una petición a medir. `url` y `datos` son funciones que reciben el dict de
+    objetos de muestra (ver objetos_de_muestra) y devuelven la URL y el POST.
+    """
+
+    def __init__(self, nombre, url, metodo='get', datos=None, roles=ROLES, repeticiones=None, anonimo=False,
+                 sesion_nueva=False, cuerpo_json=False):
+        self.nombre = nombre
+        self.url = url
+        self.metodo = metodo
+        self.datos = datos
+        self.roles = roles
+        self.repeticiones = repeticiones
+        self.anonimo = anonimo  # Se abre sin sesión (login)
+        self.sesion_nueva = sesion_nueva  # Una sesión por repetición (logout cierra la suya)
+        self.cuerpo_json = cuerpo_json  # El POST va como JSON (API)
+
+
+# ============ DATOS DE LOS FORMULARIOS ============
+def datos_formulario(form_class, instancia, **cambios):
+    """POST válido para `form_class` con los valores de `instancia` (incluye los initial-* ocultos)"""
+    form = form_class(instance=instancia)
+    datos = {}
+    for nombre, campo in form.fields.items():
+        valor = form[nombre].value()
+        datos[form.add_prefix(nombre)] = '' if valor is None else valor
+        if campo.show_hidden_initial:
+            datos[form.add_initial_prefix(nombre)] = datos[form.add_prefix(nombre)]
+    datos.update(cambios)
+    return datos
+
+
+def datos_venta(objetos):
+    return {
+        'cliente': objetos['cliente'].pk,
+        'renglones-TOTAL_FORMS': 1, 'renglones-INITIAL_FORMS': 0,
+        'renglones-MIN_NUM_FORMS': 0, 'renglones-MAX_NUM_FORMS': 1000,
+        'renglones-0-producto': objetos['vendible'].pk, 'renglones-0-cantidad': 1,
+    }
+
+
+def datos_lote_ventas(objetos):
+    """Lote de una caja que estuvo sin conexión (api/ventas/lote/)"""
+    venta = {'lineas': [[objetos['vendible'].pk, 1]], 'cliente': objetos['cliente'].pk}
+    return {'crear': [venta] * VENTAS_POR_LOTE}
+
+
+def _crud(nombre, modelo_url, clave, form_class, nuevo):
+    """Escenarios de un catálogo: lista, crear/editar (formulario y POST), eliminar (confirmación y POST) y exportar"""
+    return [
+        Escenario(f'{nombre}_lista', lambda o: reverse(f'{modelo_url}_lista')),
+        Escenario(f'{nombre}_crear', lambda o: reverse(f'{modelo_url}_crear')),
+        Escenario(f'{nombre}_crear_post', lambda o: reverse(f'{modelo_url}_crear'), 'post',
+                  lambda o: datos_formulario(form_class, o[clave], **nuevo)),
+        Escenario(f'{nombre}_editar', lambda o: reverse(f'{modelo_url}_editar', args=[o[clave].pk])),
+        Escenario(f'{nombre}_editar_post', lambda o: reverse(f'{modelo_url}_editar', args=[o[clave].pk]), 'post',
+                  lambda o: datos_formulario(form_class, o[clave])),
+        Escenario(f'{nombre}_eliminar', lambda o: reverse(f'{modelo_url}_eliminar', args=[o[clave].pk])),
+        Escenario(f'{nombre}_eliminar_post', lambda o: reverse(f'{modelo_url}_eliminar', args=[o[clave].pk]), 'post'),
+        Escenario(f'{nombre}_exportar', lambda o: reverse(f'{modelo_url}_exportar'),
+                  repeticiones=REPETICIONES_EXPORTAR),
+    ]
+
+
+def _hoy(o):
+    return timezone.localdate().isoformat()
+
+
+ESCENARIOS = [
+    Escenario('login', lambda o: reverse('login'), anonimo=True),
+    Escenario('login_post', lambda o: reverse('login'), 'post',
+              lambda o: {'username': o['login'][0], 'password': o['login'][1]}, anonimo=True),
+    Escenario('logout', lambda o: reverse('logout'), sesion_nueva=True),
+    Escenario('home', lambda o: reverse('home')),
+    Escenario('venta_crear', lambda o: reverse('venta_crear')),
+    Escenario('venta_crear_post', lambda o: reverse('venta_crear'), 'post', datos_venta),
+    Escenario('venta_exportar_hoy', lambda o: reverse('venta_exportar') + f'?desde={_hoy(o)}&hasta={_hoy(o)}',
+              repeticiones=REPETICIONES_EXPORTAR),
+    Escenario('reportes', lambda o: reverse('reportes')),
+    Escenario('reorden_lista', lambda o: reverse('reorden_lista')),
+    Escenario('reorden_exportar', lambda o: reverse('reorden_exportar'), repeticiones=REPETICIONES_EXPORTAR),
+    Escenario('producto_buscar', lambda o: reverse('producto_lista') + '?q=' + o['producto'].nombre.split()[0]),
+    Escenario('api_productos', lambda o: reverse('api_lista', args=['productos'])),
+    Escenario('api_producto', lambda o: reverse('api_detalle', args=['productos', o['producto'].pk])),
+    Escenario('api_lote_ventas', lambda o: reverse('api_lote', args=['ventas']), 'post', datos_lote_ventas,
+              cuerpo_json=True),
+    # /metrics/ es para staff: en los datos de generar_datos solo lo son los administradores.
+    # perfiles_lista y perfil_detalle no se miden: son de superusuarios (generar_datos no
+    # crea ninguno) y su contenido es lo que se haya perfilado, distinto en cada corrida.
+    Escenario('metricas', lambda o: reverse('metricas'), roles=('administrador',)),
+    *_crud('producto', 'producto', 'producto', ProductoForm, {'nombre': 'Producto benchmark'}),
+    *_crud('categoria', 'categoria', 'categoria', CategoriaForm, {'nombre': 'Categoría benchmark'}),
+    *_crud('proveedor', 'proveedor', 'proveedor', ProveedorForm, {'empresa': 'Proveedor benchmark'}),
+    *_crud('cliente', 'cliente', 'cliente', ClienteForm, {'email': 'benchmark@ejemplo.invalid'}),
+]
+
+
+# ============ PREPARACIÓN ============
+def objetos_de_muestra():
+    """
+    Registros sobre los que se miden editar/eliminar/vender: los de id más bajo
+    (existen en cualquier base generada) y el producto activo con más stock.
+    """
+    objetos = {
+        'producto': Producto.objects.filter(activo=True).order_by('pk').first(),
+        'categoria': Categoria.objects.order_by('pk').first(),
+        'proveedor': Proveedor.objects.order_by('pk').first(),
+        'cliente': Cliente.objects.order_by('pk').first(),
+        'vendible': Producto.objects.filter(activo=True).order_by('-stock').first(),
+    }
+    faltantes = [nombre for nombre, objeto in objetos.items() if objeto is None]
+    if faltantes:
+        raise ValueError(f'La base no tiene datos para: {", ".join(faltantes)} (ejecute generar_datos)')
+    return objetos
+
+
+def usuarios_por_rol(roles=ROLES):
+    """Un usuario activo por rol (el de id más bajo); falla si algún rol no tiene usuarios"""
+    usuarios = {}
+    for rol in roles:
+        perfil = (PerfilUsuario.objects.select_related('user')
+                  .filter(rol=rol, activo=True, user__is_active=True).order_by('user_id').first())
+        if perfil is None:
+            raise ValueError(f'No hay usuarios activos con el rol {rol!r}')
+        usuarios[rol] = perfil.user
+    return usuarios
+
+
+# ============ MEDICIÓN ============
+def _peticion(cliente, escenario, url, datos):
+    """Ejecuta la petición (consumiendo el contenido en streaming) y la revierte"""
+    with transaction.atomic():
+        if escenario.metodo == 'post' and escenario.cuerpo_json:
+            respuesta = cliente.post(url, datos or {}, content_type='application/json')
+        elif escenario.metodo == 'post':
+            respuesta = cliente.post(url, datos or {})
+        else:
+            respuesta = cliente.get(url)
+        if respuesta.streaming:
+            for _ in respuesta.streaming_content:
+                pass
+        transaction.set_rollback(True)
+    return respuesta
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def medir(escenario, usuario, objetos, repeticiones=REPETICIONES, calentamiento=CALENTAMIENTO):
+    """Métricas de un escenario con un usuario (None para los escenarios anónimos)"""
+    repeticiones = min(repeticiones, escenario.repeticiones or repeticiones)
+    url = escenario.url(objetos)
+    datos = escenario.datos(objetos) if escenario.datos else None
+    nuevo_cliente = escenario.anonimo or escenario.sesion_nueva
+    sesiones = []  # Las abre force_login fuera de la transacción revertida: se borran al final
+
+    def cliente():
+        c = Client()
+        if usuario is not None and not escenario.anonimo:
+            c.force_login(usuario)
+            sesiones.append(c.session)
+        return c
+
+    c = cliente()
+    for _ in range(calentamiento):
+        _peticion(cliente() if nuevo_cliente else c, escenario, url, datos)
+
+    latencias, consultas, tiempos_sql, estados = [], [], [], set()
+    for _ in range(repeticiones):
+        if nuevo_cliente:
+            c = cliente()  # Sin la sesión que dejó (o cerró) la repetición anterior
+        medidor = MedidorSQL()
+        with connection.execute_wrapper(medidor):
+            inicio = time.perf_counter()
+            respuesta = _peticion(c, escenario, url, datos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(medidor.consultas)
+        tiempos_sql.append(medidor.tiempo * 1000)
+        estados.add(respuesta.status_code)
+
+    c = cliente() if nuevo_cliente else c
+    tracemalloc.start()
+    try:
+        _peticion(c, escenario, url, datos)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    for sesion in sesiones:
+        sesion.delete()
+
+    latencias.sort()
+    return {
+        'estado': '/'.join(str(e) for e in sorted(estados)),
+        'repeticiones': repeticiones,
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'consultas': max(consultas),
+        'sql_ms': round(statistics.median(tiempos_sql), 2),
+        'memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def ejecutar(escenarios=ESCENARIOS, roles=ROLES, repeticiones=REPETICIONES, calentamiento=CALENTAMIENTO,
+             password=None, progreso=None):
+    """
+    Mide todos los escenarios con cada rol; devuelve {'escenario:rol': métricas}.
+    login_post solo se mide si se da la contraseña de los usuarios.
+    """
+    objetos = objetos_de_muestra()
+    usuarios = usuarios_por_rol(roles)
+    resultados = {}
+    for escenario in escenarios:
+        if escenario.anonimo:
+            if escenario.datos and password is None:
+                continue
+            # Anónimo: una sola medición, el rol es el del usuario que inicia sesión
+            usuario = usuarios[roles[0]]
+            objetos['login'] = (usuario.get_username(), password)
+            pares = [('anonimo', None)]
+        else:
+            pares = [(rol, usuarios[rol]) for rol in roles if rol in escenario.roles]
+        for rol, usuario in pares:
+            metricas = medir(escenario, usuario, objetos, repeticiones, calentamiento)
+            resultados[f'{escenario.nombre}:{rol}'] = metricas
+            if progreso:
+                progreso(escenario.nombre, rol, metricas)
+    return resultados
+
+
+# ============ LOGIN ============
+def medir_login(usuario, password, repeticiones=REPETICIONES):
+    """
+    Latencia del POST de login por caso (lo usa el comando benchmark_login):
+      hash       una verificación de contraseña sola (la unidad de costo),
+      correcto   login con la contraseña correcta,
+      fallido    contraseña incorrecta (todavía sin bloqueo),
+      bloqueado  con los fallos al límite: se rechaza sin calcular el hash.
+    Cada caso devuelve p50/p95 en ms, logins por segundo por núcleo (1000 / p50) y
+    'hashes' = p50 / p50 del hash: cuántas verificaciones cuesta cada login.
+    """
+    url = reverse('login')
+    nombre = usuario.get_username()
+    ip = '127.0.0.1'  # REMOTE_ADDR del cliente de pruebas
+
+    def limpiar():
+        acceso.reiniciar(nombre, ip)
+
+    def bloquear():
+        limpiar()
+        for _ in range(acceso._config('INTENTOS_USUARIO', acceso.INTENTOS_USUARIO)):
+            acceso.registrar_fallo(nombre, ip)
+
+    def post(clave):
+        with transaction.atomic():
+            respuesta = Client().post(url, {'username': nombre, 'password': clave})
+            transaction.set_rollback(True)
+        return respuesta
+
+    casos = {
+        'hash': (limpiar, lambda: usuario.check_password(password)),
+        'correcto': (limpiar, lambda: post(password)),
+        'fallido': (limpiar, lambda: post(password + '-incorrecta')),
+        'bloqueado': (bloquear, lambda: post(password)),
+    }
+    resultados = {}
+    try:
+        for caso, (preparar, accion) in casos.items():
+            latencias = []
+            for _ in range(repeticiones + 1):  # La primera es de calentamiento
+                preparar()
+                inicio = time.perf_counter()
+                accion()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            latencias = sorted(latencias[1:])
+            resultados[caso] = {'p50_ms': round(percentil(latencias, 50), 2),
+                                'p95_ms': round(percentil(latencias, 95), 2)}
+    finally:
+        limpiar()
+
+    unidad = resultados['hash']['p50_ms'] or 1
+    for metricas in resultados.values():
+        metricas['por_segundo'] = round(1000 / metricas['p50_ms'], 1) if metricas['p50_ms'] else 0.0
+        metricas['hashes'] = round(metricas['p50_ms'] / unidad, 2)
+    return resultados
+
+
+# ============ CONCURRENCIA (WSGI CONTRA ASGI) ============
+CONCURRENCIAS = (1, 4, 16)
+PETICIONES_CONCURRENCIA = 40  # Por nivel de concurrencia, repartidas entre los clientes
+
+
+def _resumen_concurrencia(latencias, estados, segundos):
+    latencias.sort()
+    return {
+        'estado': '/'.join(str(e) for e in sorted(estados)),
+        'peticiones': len(latencias),
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'por_segundo': round(len(latencias) / segundos, 1) if segundos else 0.0,
+    }
+
+
+def _concurrencia_wsgi(url, usuario, concurrencia, peticiones):
+    """Un hilo por cliente, como un servidor WSGI con hilos (gunicorn --threads)"""
+    latencias, estados = [], set()
+    clientes = []
+    for _ in range(concurrencia):
+        c = Client()
+        c.force_login(usuario)
+        clientes.append(c)
+    clientes[0].get(url)  # Calentamiento
+
+    def trabajar(cliente, cuantas):
+        try:
+            for _ in range(cuantas):
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                estados.add(respuesta.status_code)
+        finally:
+            close_old_connections()  # La conexión de este hilo
+
+    hilos = [threading.Thread(target=trabajar, args=(c, len(range(i, peticiones, concurrencia))))
+             for i, c in enumerate(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return _resumen_concurrencia(latencias, estados, time.perf_counter() - inicio)
+
+
+async def _concurrencia_asgi(url, usuario, concurrencia, peticiones):
+    """Una corrutina por cliente en un solo event loop, como un servidor ASGI (uvicorn)"""
+    latencias, estados = [], set()
+    clientes = []
+    for _ in range(concurrencia):
+        c = AsyncClient()
+        await c.aforce_login(usuario)
+        clientes.append(c)
+    async with ThreadSensitiveContext():
+        await clientes[0].get(url)  # Calentamiento
+
+    async def trabajar(cliente, cuantas):
+        for _ in range(cuantas):
+            # Como ASGIHandler: el código síncrono de cada petición va a su propio hilo
+            # (el cliente de pruebas no abre este contexto y las serializaría en uno solo)
+            async with ThreadSensitiveContext():
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(url)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            estados.add(respuesta.status_code)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajar(c, len(range(i, peticiones, concurrencia))) for i, c in enumerate(clientes)))
+    return _resumen_concurrencia(latencias, estados, time.perf_counter() - inicio)
+
+
+def medir_concurrencia(url, usuario, modo, concurrencias=CONCURRENCIAS, peticiones=PETICIONES_CONCURRENCIA,
+                       progreso=None):
+    """
+    GETs a `url` con `concurrencia` clientes a la vez (lo usa el comando benchmark_concurrencia).
+    modo 'wsgi': hilos con el Client síncrono; 'asgi': corrutinas con AsyncClient, que
+    pasan por ASGIHandler y ejecutan las vistas async sin hilo intermedio.
+    Devuelve {concurrencia: {estado, peticiones, p50_ms, p95_ms, por_segundo}}; cada
+    nivel empieza con una petición sin medir para llenar las cachés.
+    """
+    resultados = {}
+    for concurrencia in concurrencias:
+        if modo == 'asgi':
+            resultados[concurrencia] = async_to_sync(_concurrencia_asgi)(url, usuario, concurrencia, peticiones)
+        else:
+            resultados[concurrencia] = _concurrencia_wsgi(url, usuario, concurrencia, peticiones)
+        if progreso:
+            progreso(concurrencia, resultados[concurrencia])
+    return resultados
+
+
+# ============ LÍNEA BASE ============
+def conteo_de_filas():
+    """Tamaño de la base medida: las líneas base solo son comparables con datos del mismo tamaño"""
+    return {modelo._meta.model_name: modelo._base_manager.count()
+            for modelo in (Producto, Categoria, Proveedor, Cliente, Venta, User)}
+
+
+def guardar_linea_base(ruta, resultados):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'motor': connection.vendor,
+            'filas': conteo_de_filas(),
+            'resultados': resultados,
+        }, archivo, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def cargar_linea_base(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def en_alcance(clave, solo=None, roles=ROLES, password=None):
+    """¿Debía medir esta corrida la clave 'escenario:rol' de la línea base? (mismos filtros que ejecutar)"""
+    nombre, rol = clave.rsplit(':', 1)
+    if solo and solo not in nombre:
+        return False
+    if rol == 'anonimo':
+        escenario = next((e for e in ESCENARIOS if e.nombre == nombre), None)
+        return password is not None or escenario is None or not escenario.datos
+    return rol in roles
+
+
+def comparar(resultados, base, tolerancia=TOLERANCIA, alcance=en_alcance):
+    """
+    Lista de (clave, métrica, base, actual) que empeoraron respecto a la línea base.
+    También es regresión un estado HTTP distinto (p. ej. 200 → 200/500) y un escenario
+    de la línea base que la corrida debía medir (según alcance(clave)) y no midió.
+    """
+    regresiones = []
+    for clave, anterior in base['resultados'].items():
+        if clave not in resultados and alcance(clave):
+            regresiones.append((clave, 'medición', anterior['estado'], 'falta'))
+    for clave, actual in resultados.items():
+        anterior = base['resultados'].get(clave)
+        if anterior is None:
+            continue  # Escenario nuevo: todavía no hay con qué comparar
+        if actual['estado'] != anterior['estado']:
+            regresiones.append((clave, 'estado', anterior['estado'], actual['estado']))
+        if actual['consultas'] > anterior['consultas']:
+            regresiones.append((clave, 'consultas', anterior['consultas'], actual['consultas']))
+        for metrica, margen in (('p95_ms', TOLERANCIA_MS), ('memoria_kb', TOLERANCIA_KB)):
+            limite = max(anterior[metrica] * (1 + tolerancia), anterior[metrica] + margen)
+            if actual[metrica] > limite:
+                regresiones.append((clave, metrica, anterior[metrica], actual[metrica]))
+    return regresiones
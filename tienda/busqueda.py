@@ -0,0 +1,174 @@
+# tienda/busqueda.py
+# Búsqueda de productos con un índice invertido de trigramas.
+#
+# Cada producto se descompone en trigramas (grupos de 3 letras) de su nombre,
+# su descripción y el nombre de su categoría; cada trigrama se guarda como una
+# fila de IndiceBusqueda con un peso. Buscar consiste en descomponer el texto
+# buscado igual y sumar los pesos de los trigramas que coinciden:
+#   - el orden por la suma da resultados rankeados,
+#   - una letra equivocada solo rompe ~3 trigramas, así que tolera errores,
+#   - los trigramas iniciales ("  l", " la", "lap") permiten buscar por prefijo.
+# Es SQL estándar (IN + GROUP BY sobre un índice), así que funciona igual en
+# MySQL que en SQLite para pruebas locales.
+import math
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import IndiceBusqueda, Producto
+
+# Peso de cada campo en el ranking: el nombre vale más que la descripción
+PESO_NOMBRE = 4
+PESO_CATEGORIA = 2
+PESO_DESCRIPCION = 1
+
+# Fracción mínima de trigramas de la búsqueda que debe tener un producto para
+# aparecer en los resultados (0.3 deja pasar ~1 error por palabra de 6 letras)
+SIMILITUD_MINIMA = 0.3
+
+LOTE_INDEXADO = 500  # Filas por INSERT al reindexar
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y solo letras/números separados por espacios"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))  # "Electrónica" -> "Electronica"
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def trigramas(texto, prefijo=False):
+    """
+    Devuelve el conjunto de trigramas de un texto.
+
+    Cada palabra se rellena con dos espacios al inicio y uno al final (como
+    pg_trgm), así las palabras cortas también generan trigramas. Con
+    prefijo=True la última palabra no lleva el espacio final, para que "lap"
+    encuentre "laptop".
+    """
+    palabras = normalizar(texto).split()
+    resultado = set()
+    for i, palabra in enumerate(palabras):
+        final = '' if (prefijo and i == len(palabras) - 1) else ' '
+        relleno = f'  {palabra}{final}'
+        for j in range(len(relleno) - 2):
+            resultado.add(relleno[j:j + 3])
+    return resultado
+
+
+def _filas_de(producto_id, nombre, descripcion, categoria_nombre):
+    """Tuplas (trigrama, producto_id, peso) de un producto: un trigrama = una fila, pesos sumados"""
+    pesos = {}
+    for texto, peso in ((nombre, PESO_NOMBRE), (categoria_nombre, PESO_CATEGORIA), (descripcion, PESO_DESCRIPCION)):
+        for trigrama in trigramas(texto):
+            pesos[trigrama] = pesos.get(trigrama, 0) + peso
+    return [(t, producto_id, p) for t, p in pesos.items()]
+
+
+def _insertar(filas):
+    """
+    INSERT directo con executemany.
+
+    Un producto genera decenas de filas; construir un objeto de modelo por
+    fila para bulk_create costaba más que el propio INSERT.
+    """
+    if not filas:
+        return
+    q = connection.ops.quote_name
+    meta = IndiceBusqueda._meta
+    columnas = ', '.join(q(meta.get_field(c).column) for c in ('trigrama', 'producto', 'peso'))
+    sql = f'INSERT INTO {q(meta.db_table)} ({columnas}) VALUES (%s, %s, %s)'
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(filas), LOTE_INDEXADO * 20):
+            cursor.executemany(sql, filas[inicio:inicio + LOTE_INDEXADO * 20])
+
+
+# ============ MANTENIMIENTO DEL ÍNDICE ============
+def indexar_productos(producto_ids):
+    """Reconstruye las filas del índice de los productos indicados (en lotes)"""
+    producto_ids = list(producto_ids)
+    for inicio in range(0, len(producto_ids), LOTE_INDEXADO):
+        lote = producto_ids[inicio:inicio + LOTE_INDEXADO]
+        datos = Producto._base_manager.filter(pk__in=lote).values_list(
+            'id', 'nombre', 'descripcion', 'categoria__nombre',
+        )
+        filas = []
+        for producto_id, nombre, descripcion, categoria_nombre in datos:
+            filas.extend(_filas_de(producto_id, nombre, descripcion, categoria_nombre))
+        with transaction.atomic():
+            IndiceBusqueda.objects.filter(producto_id__in=lote).delete()
+            _insertar(filas)
+
+
+def indexar_producto(producto):
+    """Atajo para reindexar un solo producto después de guardarlo"""
+    indexar_productos([producto.pk])
+
+
+def reindexar_todo(lote=LOTE_INDEXADO, progreso=None, desde_id=0):
+    """
+    Recorre todos los productos por PK en lotes y los reindexa.
+
+    Se usa después de migrar o de cargas masivas que no pasan por save();
+    con `desde_id` solo se procesan los productos con PK mayor (los recién
+    importados). `progreso` es una función opcional que recibe el número de
+    productos procesados.
+    """
+    procesados = 0
+    ultimo_id = desde_id
+    while True:
+        ids = list(
+            Producto._base_manager.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        indexar_productos(ids)
+        procesados += len(ids)
+        ultimo_id = ids[-1]
+        if progreso:
+            progreso(procesados)
+    return procesados
+
+
+# ============ CONSULTA ============
+def buscar_ids(texto, limite=50, desde=0, solo_activos=True):
+    """
+    Devuelve una lista de (producto_id, puntaje) ordenada por relevancia.
+
+    Toda la agregación ocurre en la base de datos sobre el índice
+    (trigrama, producto, peso); Python solo prepara los trigramas. Con solo_activos
+    los productos desactivados se descartan en la misma consulta, antes de cortar en
+    `limite` (una página nunca sale incompleta por ellos). `desde` salta los primeros
+    resultados, para las páginas siguientes.
+    """
+    consulta = trigramas(texto, prefijo=True)
+    if not consulta:
+        return []
+    # Al menos 2 trigramas en común: con uno solo "lap" coincidiría con cualquier palabra que empiece por "l"
+    minimo = max(min(2, len(consulta)), math.ceil(len(consulta) * SIMILITUD_MINIMA))
+    filas = IndiceBusqueda.objects.filter(trigrama__in=consulta)
+    if solo_activos:
+        filas = filas.filter(producto__activo__in=[True])  # JOIN por PK con cada candidato
+    filas = (
+        filas.values('producto_id')
+        .annotate(puntaje=Sum('peso'), coincidencias=Count('trigrama'))
+        .filter(coincidencias__gte=minimo)
+        .order_by('-coincidencias', '-puntaje', 'producto_id')[desde:desde + limite]
+    )
+    return [(fila['producto_id'], fila['puntaje']) for fila in filas]
+
+
+def buscar_productos(texto, queryset=None, limite=50, desde=0):
+    """Productos activos que coinciden con `texto`, ya ordenados por relevancia"""
+    resultados = buscar_ids(texto, limite=limite, desde=desde)
+    if not resultados:
+        return []
+    if queryset is None:
+        queryset = Producto.objects.all()
+    posicion = {producto_id: i for i, (producto_id, _) in enumerate(resultados)}
+    productos = list(queryset.filter(pk__in=posicion))
+    productos.sort(key=lambda p: posicion[p.pk])  # Respetamos el ranking calculado por la BD
+    return productos
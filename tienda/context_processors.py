@@ -0,0 +1,8 @@
+# tienda/context_processors.py
+# Variables disponibles en todas las plantillas (ver TEMPLATES en settings.py).
+from . import roles
+
+
+def rol_usuario(request):
+    """Expone el rol resuelto como {{ rol_usuario }} (p. ej. rol_usuario.puede_gestionar)"""
+    return {'rol_usuario': roles.rol_de_request(request)}
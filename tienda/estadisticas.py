@@ -0,0 +1,189 @@
+# tienda/estadisticas.py
+# Estadísticas del dashboard (vista home) calculadas en una sola consulta y cacheadas.
+# La vista async usa aobtener_estadisticas(): ante un fallo de caché lanza cada conteo
+# en su propia conexión al mismo tiempo, en lugar de un SELECT que los hace en serie.
+#
+# Cada número vive en su propia clave de caché para que las señales de
+# tienda/signals.py puedan sumar o restar (cache.incr/decr) al crear, desactivar o
+# borrar registros, sin recontar toda la tabla. Solo se cuentan las filas activas. Si falta alguna clave (caché vacía,
+# reinicio, expiración) se recalcula todo con un único SELECT de subconsultas.
+import datetime
+import functools
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from . import asincrono
+from .models import Categoria, Cliente, Producto, Proveedor, VentaDiaria
+
+PREFIJO = 'tienda:stats'
+# Red de seguridad: aunque las señales mantengan los contadores, se recalculan
+# cada cierto tiempo por si algún cambio no pasó por el ORM (SQL manual, update())
+ESTADISTICAS_TTL = 300
+
+# Modelos contados en el dashboard -> nombre de la estadística
+MODELOS_CONTADOS = {
+    Producto: 'total_productos',
+    Categoria: 'total_categorias',
+    Proveedor: 'total_proveedores',
+    Cliente: 'total_clientes',
+}
+
+
+def _clave(nombre):
+    return f'{PREFIJO}:{nombre}'
+
+
+def _claves_ventas(fecha):
+    """Claves de las ventas de un día; el total se guarda en centavos para poder usar incr()"""
+    return _clave(f'ventas:{fecha.isoformat()}:conteo'), _clave(f'ventas:{fecha.isoformat()}:centavos')
+
+
+def rango_del_dia(fecha):
+    """(inicio, fin) del día local como datetimes aware: permite filtrar con >= y < sobre el índice"""
+    inicio = timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+    return inicio, inicio + datetime.timedelta(days=1)
+
+
+# ============ CÁLCULO COMPLETO (UNA SOLA CONSULTA) ============
+def _subconsultas(fecha):
+    """[(estadística, SQL escalar, parámetros)]: un COUNT por modelo y las ventas del día"""
+    q = connection.ops.quote_name
+    resumen = q(VentaDiaria._meta.db_table)
+    fecha_col = q(VentaDiaria._meta.get_field('fecha').column)
+    conteo_col = q(VentaDiaria._meta.get_field('num_ventas').column)
+    total_col = q(VentaDiaria._meta.get_field('total').column)
+    dia = connection.ops.adapt_datefield_value(fecha)
+
+    # Solo las filas activas (eliminación lógica, ver tienda/papelera.py); IN y no = para usar el índice
+    subconsultas = [(nombre, f'SELECT COUNT(*) FROM {q(modelo._meta.db_table)} '
+                             f'WHERE {q(modelo._meta.get_field("activo").column)} IN (%s)', [True])
+                    for modelo, nombre in MODELOS_CONTADOS.items()]
+    # Las ventas de hoy salen del resumen diario (pocas filas, igualdad sobre el índice)
+    subconsultas.append(('conteo_ventas_hoy',
+                         f'SELECT COALESCE(SUM({conteo_col}), 0) FROM {resumen} WHERE {fecha_col} = %s', [dia]))
+    subconsultas.append(('total_ventas_hoy',
+                         f'SELECT COALESCE(SUM({total_col}), 0) FROM {resumen} WHERE {fecha_col} = %s', [dia]))
+    return subconsultas
+
+
+def _valores(fila):
+    """{estadística: valor} desde los resultados en el orden de _subconsultas()"""
+    valores = dict(zip(MODELOS_CONTADOS.values(), fila))
+    valores['conteo_ventas_hoy'] = fila[-2]
+    valores['total_ventas_hoy'] = Decimal(str(fila[-1] or 0)).quantize(Decimal('0.01'))
+    return valores
+
+
+def _calcular(fecha):
+    """Ejecuta todos los conteos en un solo SELECT con subconsultas escalares"""
+    subconsultas = _subconsultas(fecha)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(f'({sql})' for _, sql, _ in subconsultas),
+                       [p for _, _, params in subconsultas for p in params])
+        return _valores(cursor.fetchone())
+
+
+def _escalar(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+async def _acalcular(fecha):
+    """Los mismos conteos, cada uno en su propia conexión y al mismo tiempo (vista home async)"""
+    subconsultas = _subconsultas(fecha)
+    resultados = await asincrono.en_paralelo(**{
+        nombre: functools.partial(_escalar, sql, params) for nombre, sql, params in subconsultas
+    })
+    return _valores([resultados[nombre] for nombre, _, _ in subconsultas])
+
+
+def _claves_estadisticas(fecha):
+    """{clave de caché: estadística} del dashboard del día"""
+    clave_conteo, clave_centavos = _claves_ventas(fecha)
+    claves = {_clave(nombre): nombre for nombre in MODELOS_CONTADOS.values()}
+    claves[clave_conteo] = 'conteo_ventas_hoy'
+    claves[clave_centavos] = 'centavos_ventas_hoy'
+    return claves
+
+
+def _desde_cache(claves, en_cache):
+    """Las estadísticas si están todas en la caché; None si falta alguna"""
+    if len(en_cache) != len(claves):
+        return None
+    valores = {claves[k]: v for k, v in en_cache.items()}
+    valores['total_ventas_hoy'] = (Decimal(valores.pop('centavos_ventas_hoy')) / 100).quantize(Decimal('0.01'))
+    return valores
+
+
+def _para_cache(fecha, valores):
+    clave_conteo, clave_centavos = _claves_ventas(fecha)
+    nuevos = {_clave(nombre): valores[nombre] for nombre in MODELOS_CONTADOS.values()}
+    nuevos[clave_conteo] = valores['conteo_ventas_hoy']
+    nuevos[clave_centavos] = int(valores['total_ventas_hoy'] * 100)
+    return nuevos
+
+
+def obtener_estadisticas(fecha=None):
+    """
+    Devuelve el diccionario de estadísticas del dashboard.
+
+    Lee todas las claves con un solo get_many(); solo si falta alguna se
+    consulta la base de datos (una vez) y se vuelven a guardar.
+    """
+    fecha = fecha or timezone.localdate()
+    claves = _claves_estadisticas(fecha)
+    valores = _desde_cache(claves, cache.get_many(list(claves)))
+    if valores is None:
+        valores = _calcular(fecha)
+        cache.set_many(_para_cache(fecha, valores), ESTADISTICAS_TTL)
+    return valores
+
+
+async def aobtener_estadisticas(fecha=None):
+    """obtener_estadisticas() para la vista async: sin caché, los conteos corren en paralelo"""
+    fecha = fecha or timezone.localdate()
+    claves = _claves_estadisticas(fecha)
+    valores = _desde_cache(claves, await cache.aget_many(list(claves)))
+    if valores is None:
+        valores = await _acalcular(fecha)
+        await cache.aset_many(_para_cache(fecha, valores), ESTADISTICAS_TTL)
+    return valores
+
+
+# ============ ACTUALIZACIÓN INCREMENTAL (USADA POR LAS SEÑALES) ============
+def _sumar(clave, delta):
+    """incr/decr atómico; si la clave no existe no hace nada (se recalculará al leer)"""
+    try:
+        cache.incr(clave, delta)
+    except ValueError:
+        pass
+
+
+def ajustar_conteo(modelo, delta):
+    """Suma `delta` (+1 al crear o reactivar, -1 al desactivar o borrar) al contador del modelo"""
+    nombre = MODELOS_CONTADOS.get(modelo)
+    if nombre:
+        _sumar(_clave(nombre), delta)
+
+
+def invalidar_conteo(modelo):
+    """Descarta el contador de un modelo tras cambios masivos (bulk_create/update no envían señales)"""
+    nombre = MODELOS_CONTADOS.get(modelo)
+    if nombre:
+        cache.delete(_clave(nombre))
+
+
+def ajustar_ventas(venta, signo):
+    """Suma (signo=+1) o resta (signo=-1) una venta a los acumulados de su día"""
+    clave_conteo, clave_centavos = _claves_ventas(timezone.localdate(venta.fecha_venta))
+    _sumar(clave_conteo, signo)
+    _sumar(clave_centavos, signo * int(Decimal(venta.total) * 100))
+
+
+def invalidar_ventas(fecha):
+    """Descarta los acumulados de un día (p. ej. si se editó el total de una venta)"""
+    cache.delete_many(_claves_ventas(fecha))
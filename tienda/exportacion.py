@@ -0,0 +1,116 @@
+# tienda/exportacion.py
+# Exportación de listas a CSV/XLSX sin cargar la tabla completa en memoria.
+#
+# Las filas se leen en bloques por cursor (WHERE id > ultimo ORDER BY id LIMIT n):
+# cada bloque es una consulta corta que usa la llave primaria (u otro índice, ver
+# iterar_en_bloques). No se usa
+# QuerySet.iterator() porque con MySQL (mysqlclient) el controlador descarga
+# el resultado completo antes de entregar la primera fila.
+#
+# - CSV: StreamingHttpResponse; cada fila se envía al cliente en cuanto se genera.
+# - XLSX: openpyxl en modo write_only escribe a un archivo temporal en disco
+#   y se envía con FileResponse. openpyxl es opcional; sin él solo hay CSV.
+import csv
+import datetime
+import tempfile
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+
+from .paginacion import filtro_despues_de
+
+TAMANO_BLOQUE = 2000  # Filas por consulta al exportar
+
+FORMATOS = ('csv', 'xlsx')
+
+
+def iterar_en_bloques(queryset, campos, tamano=TAMANO_BLOQUE, orden=('pk',)):
+    """
+    Genera tuplas con los `campos` de cada fila, recorriendo el queryset en bloques
+    por cursor sobre `orden` (por defecto la PK).
+
+    Los campos de `orden` se piden como primeras columnas para avanzar el cursor y
+    se descartan en la salida. Si el queryset filtra por un rango (p. ej. fechas),
+    conviene ordenar por ese campo y la PK, p. ej. ('fecha_venta', 'pk'): así el
+    índice del filtro entrega las filas ya ordenadas y no hay que ordenar en memoria.
+    El último campo de `orden` debe ser único.
+    """
+    orden = tuple(orden)
+    n = len(orden)
+    ultimo = None
+    qs = queryset.order_by(*orden).values_list(*orden, *campos)
+    while True:
+        bloque = list((qs.filter(filtro_despues_de(orden, ultimo)) if ultimo is not None else qs)[:tamano])
+        if not bloque:
+            return
+        for fila in bloque:
+            yield fila[n:]
+        if len(bloque) < tamano:
+            return  # Bloque incompleto: era el último, nos ahorramos la consulta vacía
+        ultimo = bloque[-1][:n]
+
+
+def _celda(valor):
+    """Normaliza valores para CSV/XLSX: fechas en hora local y sin zona horaria"""
+    if isinstance(valor, datetime.datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).replace(tzinfo=None)
+    return valor
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def respuesta_csv(nombre, encabezados, filas):
+    escritor = csv.writer(_Eco())
+
+    def contenido():
+        yield '\ufeff'  # BOM para que Excel detecte UTF-8 (acentos)
+        yield escritor.writerow(encabezados)
+        for fila in filas:
+            yield escritor.writerow([_celda(v) for v in fila])
+
+    respuesta = StreamingHttpResponse(contenido(), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+    return respuesta
+
+
+def respuesta_xlsx(nombre, encabezados, filas):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise Http404('La exportación a Excel requiere el paquete openpyxl')
+
+    libro = Workbook(write_only=True)  # write_only: las filas van a disco, no se acumulan en memoria
+    hoja = libro.create_sheet(title=nombre[:31])
+    hoja.append(list(encabezados))
+    for fila in filas:
+        hoja.append([_celda(v) for v in fila])
+    temporal = tempfile.TemporaryFile()
+    libro.save(temporal)
+    temporal.seek(0)
+    return FileResponse(
+        temporal, as_attachment=True, filename=f'{nombre}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def exportar(request, nombre, queryset, columnas, orden=('pk',)):
+    """
+    Respuesta de exportación según ?formato=csv|xlsx.
+
+    `columnas` es una lista de (campo para values_list, encabezado); `orden`, el
+    cursor de iterar_en_bloques().
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        formato = 'csv'
+    campos = [campo for campo, _ in columnas]
+    encabezados = [titulo for _, titulo in columnas]
+    filas = iterar_en_bloques(queryset, campos, orden=orden)
+    if formato == 'xlsx':
+        return respuesta_xlsx(nombre, encabezados, filas)
+    return respuesta_csv(nombre, encabezados, filas)
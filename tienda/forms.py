@@ -1,16 +1,43 @@
 # tienda/forms.py
 # Importamos forms de Django para crear formularios
 from django import forms
+from django.core.exceptions import ValidationError
 from .models import Producto, Categoria, Proveedor, Cliente, Venta
 
+
+# ============ STOCK COMO AJUSTE ============
+class StockMostradoMixin:
+    """
+    El campo 'stock' viaja con una copia oculta del valor que vio el usuario
+    (show_hidden_initial). Al guardar, inventario.guardar_producto() aplica solo
+    la diferencia entre lo capturado y lo mostrado, así las ventas hechas
+    mientras el formulario estaba abierto no se pierden.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'stock' in self.fields:
+            self.fields['stock'].show_hidden_initial = True
+
+    def stock_mostrado(self):
+        """Stock que el usuario tenía en pantalla (o el actual si el formulario no lo envió)"""
+        campo = self.fields['stock']
+        valor = campo.hidden_widget().value_from_datadict(self.data, self.files, self.add_initial_prefix('stock'))
+        if valor in (None, ''):
+            return self.initial.get('stock')
+        try:
+            return campo.to_python(valor)
+        except ValidationError:
+            return self.initial.get('stock')
+
 # ============ FORMULARIO PARA PRODUCTOS ============
-class ProductoForm(forms.ModelForm):
+class ProductoForm(StockMostradoMixin, forms.ModelForm):
     """Formulario para crear y editar productos"""
     
     # Meta clase define la configuración del formulario
     class Meta:
         model = Producto  # El modelo que usará este formulario
-        fields = ['nombre', 'descripcion', 'precio_venta', 'stock', 'categoria', 'activo']
+        fields = ['nombre', 'descripcion', 'precio_venta', 'stock', 'stock_minimo', 'categoria', 'activo']
         
         # Widgets: personalización de cómo se muestran los campos en HTML
         widgets = {
@@ -34,6 +61,11 @@ class ProductoForm(forms.ModelForm):
                 'min': '0',
                 'placeholder': '0'
             }),
+            'stock_minimo': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'placeholder': 'Vacío: usar el de la categoría'
+            }),
             # Select para la categoría (combobox con las opciones de categorías)
             'categoria': forms.Select(attrs={
                 'class': 'form-control'
@@ -50,6 +82,7 @@ class ProductoForm(forms.ModelForm):
             'descripcion': 'Descripción',
             'precio': 'Precio ($)',
             'stock': 'Cantidad en Stock',
+            'stock_minimo': 'Stock Mínimo (reorden)',
             'categoria': 'Categoría',
             'activo': '¿Producto Activo?',
         }
@@ -61,7 +94,7 @@ class CategoriaForm(forms.ModelForm):
     
     class Meta:
         model = Categoria
-        fields = ['nombre', 'descripcion']  # Solo nombre y descripción
+        fields = ['nombre', 'descripcion', 'stock_minimo']
         
         widgets = {
             'nombre': forms.TextInput(attrs={
@@ -73,11 +106,16 @@ class CategoriaForm(forms.ModelForm):
                 'rows': 3,
                 'placeholder': 'Ingrese una descripción (opcional)'
             }),
+            'stock_minimo': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0'
+            }),
         }
         
         labels = {
             'nombre': 'Nombre de la Categoría',
             'descripcion': 'Descripción',
+            'stock_minimo': 'Stock Mínimo de sus Productos',
         }
 
 
@@ -162,9 +200,50 @@ class ClienteForm(forms.ModelForm):
             'direccion': 'Dirección',
         }
 
+    def validate_unique(self):
+        super().validate_unique()
+        # Django busca el email repetido con el manager por defecto, que no ve a los clientes
+        # desactivados (ver tienda/papelera.py): sin esto el duplicado llegaría a la base como IntegrityError
+        email = self.cleaned_data.get('email')
+        if email and 'email' not in self.errors and (
+                Cliente._base_manager.filter(email=email).exclude(pk=self.instance.pk).exists()):
+            self.add_error('email', 'Ya existe un cliente desactivado con este correo; puede reactivarse desde el administrador.')
 
-# Formulario de Venta (Simplificado)
+
+# ============ FORMULARIOS PARA VENTAS ============
 class VentaForm(forms.ModelForm):
+    """Encabezado de la venta: el total se calcula a partir de los renglones"""
+
     class Meta:
         model = Venta
-        fields = ['cliente', 'total'] # Define los campos esenciales para registrar una venta.
\ No newline at end of file
+        fields = ['cliente'] # El total ya no se captura: lo calcula tienda/ventas.py.
+
+        widgets = {
+            'cliente': forms.Select(attrs={
+                'class': 'form-control'
+            }),
+        }
+
+        labels = {
+            'cliente': 'Cliente (opcional)',
+        }
+
+
+class DetalleVentaForm(forms.Form):
+    """Un renglón del carrito: código de producto (su ID) y cantidad"""
+    producto = forms.IntegerField(
+        min_value=1,
+        label='Código de producto',
+        # Campo numérico en lugar de un select: con miles de productos la lista sería enorme
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Código'}),
+    )
+    cantidad = forms.IntegerField(
+        min_value=1,
+        initial=1,
+        label='Cantidad',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
+    )
+
+
+# Conjunto de renglones del carrito (5 vacíos por defecto; los vacíos se ignoran)
+DetalleVentaFormSet = forms.formset_factory(DetalleVentaForm, extra=5)
\ No newline at end of file
@@ -0,0 +1,348 @@
+# tienda/generador.py
+# Datos sintéticos a escala para pruebas de carga (lo usa el comando generar_datos).
+#
+# - Tamaño: cada tabla crece con un factor de escala (escala=1 son 100 mil ventas;
+#   escala=0.01 unas mil; escala=100, diez millones).
+# - Distribuciones sesgadas como en la tienda real: pocos productos y clientes
+#   concentran la mayoría de las ventas (Zipf), hay más ventas en fin de semana,
+#   en noviembre-diciembre y a mediodía/tarde, y el negocio crece con el tiempo.
+# - Reproducible: la misma semilla genera exactamente los mismos datos.
+# - Rápido: bulk_create por lotes con PKs explícitas (MySQL no devuelve las PKs de
+#   bulk_create; así los renglones de venta pueden apuntar a su venta sin releerla)
+#   y una sola contraseña hasheada para todos los usuarios (make_password tarda
+#   cientos de milisegundos a propósito).
+import bisect
+import datetime
+import itertools
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Categoria, Cliente, DetalleVenta, PerfilUsuario, Producto, Proveedor, Venta
+
+LOTE_GENERACION = 5000  # Filas por INSERT
+PREFIJO_USUARIO = 'gen_'  # Usuarios generados: se reconocen (y se borran) por este prefijo
+PASSWORD_GENERADA = 'tienda123'
+
+# Filas con escala=1 y mínimo con cualquier escala
+TAMANOS = {
+    'categorias': (25, 5),
+    'proveedores': (60, 5),
+    'usuarios': (40, 3),
+    'productos': (5000, 50),
+    'clientes': (20000, 50),
+    'ventas': (100000, 100),
+}
+
+ZIPF_PRODUCTOS = 1.1  # Exponente: cuanto mayor, más concentradas las ventas en pocos SKUs
+ZIPF_CLIENTES = 0.9
+ZIPF_VENDEDORES = 0.4
+VENTAS_SIN_CLIENTE = 0.35  # Ventas de mostrador sin cliente registrado
+
+# Peso relativo por mes (Buen Fin en noviembre, Navidad en diciembre, cuesta de enero)
+TEMPORADA = {1: 0.75, 2: 0.8, 3: 0.9, 4: 0.95, 5: 1.1, 6: 0.95,
+             7: 1.0, 8: 1.05, 9: 0.9, 10: 1.0, 11: 1.35, 12: 1.8}
+# Peso relativo por día de la semana (lunes=0)
+DIA_SEMANA = {0: 0.85, 1: 0.85, 2: 0.9, 3: 0.95, 4: 1.15, 5: 1.45, 6: 1.25}
+CRECIMIENTO = 0.3  # Las ventas del último día son un 30% más que las del primero
+HORAS_PICO = (13.5, 18.5)  # Comida y salida del trabajo
+HORA_APERTURA, HORA_CIERRE = 9, 21
+
+CATEGORIAS = ['Electrónica', 'Ropa', 'Alimentos', 'Hogar', 'Deportes', 'Juguetes', 'Papelería',
+              'Ferretería', 'Belleza', 'Mascotas', 'Farmacia', 'Bebidas', 'Limpieza', 'Jardín',
+              'Automotriz', 'Libros', 'Música', 'Oficina', 'Bebés', 'Cocina']
+PRODUCTOS = ['Cable', 'Camisa', 'Café', 'Lámpara', 'Balón', 'Muñeca', 'Cuaderno', 'Martillo', 'Crema',
+             'Croquetas', 'Jarabe', 'Refresco', 'Detergente', 'Maceta', 'Aceite', 'Novela', 'Audífonos',
+             'Silla', 'Pañales', 'Sartén', 'Mochila', 'Toalla', 'Galletas', 'Cargador', 'Tenis']
+ADJETIVOS = ['Básico', 'Premium', 'Clásico', 'Deluxe', 'Compacto', 'Grande', 'Mini', 'Pro',
+             'Ecológico', 'Familiar', 'Económico', 'Plus']
+NOMBRES = ['María', 'José', 'Juan', 'Guadalupe', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Rosa', 'Jorge',
+           'Laura', 'Miguel', 'Sofía', 'Pedro', 'Elena', 'Fernando', 'Lucía', 'Ricardo', 'Paula', 'Andrés']
+APELLIDOS = ['García', 'Hernández', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+             'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Reyes', 'Jiménez', 'Torres',
+             'Díaz', 'Gutiérrez', 'Ruiz', 'Mendoza', 'Aguilar', 'Ortiz', 'Castillo', 'Romero']
+EMPRESAS = ['Distribuidora', 'Comercializadora', 'Importadora', 'Abarrotes', 'Grupo', 'Industrias']
+CALLES = ['Av. Juárez', 'Calle Morelos', 'Av. Hidalgo', 'Calle Allende', 'Av. Reforma', 'Calle Madero']
+
+
+def tamanos(escala):
+    """Filas a generar por tabla para un factor de escala"""
+    return {tabla: max(minimo, int(base * escala)) for tabla, (base, minimo) in TAMANOS.items()}
+
+
+@contextmanager
+def sin_auto_now_add(*modelos):
+    """
+    Desactiva auto_now_add mientras dura el bloque: bulk_create llama a pre_save()
+    y sobrescribiría las fechas generadas con la hora actual.
+    """
+    campos = [f for modelo in modelos for f in modelo._meta.concrete_fields if getattr(f, 'auto_now_add', False)]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+class Zipf:
+    """Elige elementos con probabilidad proporcional a 1/rango^s (el rango se sortea una vez)"""
+
+    def __init__(self, elementos, s, rng):
+        self.elementos = list(elementos)
+        rng.shuffle(self.elementos)  # Los más vendidos no son siempre los de id más bajo
+        acumulado = 0.0
+        self.acumulados = []
+        for rango in range(1, len(self.elementos) + 1):
+            acumulado += 1 / rango ** s
+            self.acumulados.append(acumulado)
+        self.rng = rng
+
+    def elegir(self):
+        punto = self.rng.random() * self.acumulados[-1]
+        return self.elementos[bisect.bisect(self.acumulados, punto)]
+
+
+class Generador:
+    """
+    Llena Categoria, Proveedor, User/PerfilUsuario, Producto, Cliente, Venta y
+    DetalleVenta. Las ventas cubren los últimos `dias` días hasta hoy.
+
+        Generador(escala=0.5, semilla=7).generar()
+
+    No actualiza el resumen diario, el índice de búsqueda ni la bandera de reorden
+    (bulk_create no pasa por save() ni por señales): eso lo hace el comando.
+    """
+
+    def __init__(self, escala=1.0, semilla=42, dias=365, lote=LOTE_GENERACION,
+                 password=PASSWORD_GENERADA, progreso=None):
+        self.tamanos = tamanos(escala)
+        self.rng = random.Random(semilla)
+        self.dias = dias
+        self.lote = lote
+        self.password = password
+        self.progreso = progreso or (lambda tabla, n: None)
+        self.hasta = timezone.localdate()
+        self.desde = self.hasta - datetime.timedelta(days=dias - 1)
+
+    # ---------- Utilidades ----------
+    @staticmethod
+    def _siguiente_pk(modelo):
+        return (modelo._base_manager.aggregate(m=Max('pk'))['m'] or 0) + 1
+
+    def _insertar(self, tabla, modelo, filas):
+        """bulk_create en lotes, cada lote en su propia transacción"""
+        for inicio in range(0, len(filas), self.lote):
+            with transaction.atomic():
+                modelo._base_manager.bulk_create(filas[inicio:inicio + self.lote])
+        self.progreso(tabla, len(filas))
+
+    def _momentos(self, n, dias_atras):
+        """`n` datetimes crecientes repartidos entre hace `dias_atras` días y el inicio del periodo"""
+        inicio = timezone.make_aware(datetime.datetime.combine(self.desde - datetime.timedelta(days=dias_atras),
+                                                               datetime.time(HORA_APERTURA)))
+        segundos = dias_atras * 86400
+        return [inicio + datetime.timedelta(seconds=(i + self.rng.random()) * segundos / n) for i in range(n)]
+
+    def _persona(self):
+        return self.rng.choice(NOMBRES), f'{self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}'
+
+    def _telefono(self):
+        return f'55{self.rng.randrange(10 ** 8):08d}'
+
+    def _direccion(self):
+        return f'{self.rng.choice(CALLES)} {self.rng.randint(1, 999)}, Col. Centro'
+
+    # ---------- Catálogos ----------
+    def categorias(self):
+        pk = self._siguiente_pk(Categoria)
+        filas = []
+        for i, momento in enumerate(self._momentos(self.tamanos['categorias'], 2 * self.dias)):
+            vuelta, base = divmod(i, len(CATEGORIAS))
+            filas.append(Categoria(
+                pk=pk + i, nombre=CATEGORIAS[base] + (f' {vuelta + 1}' if vuelta else ''),
+                descripcion=f'Productos de {CATEGORIAS[base].lower()}', fecha_creacion=momento,
+                stock_minimo=self.rng.choice((5, 10, 10, 20, 50)),
+            ))
+        self._insertar('categorias', Categoria, filas)
+        return [c.pk for c in filas]
+
+    def proveedores(self):
+        pk = self._siguiente_pk(Proveedor)
+        filas = []
+        for i in range(self.tamanos['proveedores']):
+            nombre, apellido = self._persona()
+            filas.append(Proveedor(
+                pk=pk + i, nombre=f'{nombre} {apellido}',
+                empresa=f'{self.rng.choice(EMPRESAS)} {apellido.split()[0]} {pk + i}',
+                telefono=self._telefono(), email=f'proveedor{pk + i}@ejemplo.com', direccion=self._direccion(),
+            ))
+        self._insertar('proveedores', Proveedor, filas)
+        return [p.pk for p in filas]
+
+    def usuarios(self):
+        """Un administrador, un gerente por cada 8 usuarios y el resto vendedores; devuelve los que venden"""
+        pk = self._siguiente_pk(User)
+        clave = make_password(self.password)  # Una sola vez: el mismo hash sirve para todos
+        inicio = self.hasta - datetime.timedelta(days=2 * self.dias)
+        usuarios, perfiles, vendedores = [], [], []
+        for i in range(self.tamanos['usuarios']):
+            rol = 'administrador' if i == 0 else 'gerente' if i % 8 == 1 else 'vendedor'
+            nombre, apellido = self._persona()
+            usuarios.append(User(
+                pk=pk + i, username=f'{PREFIJO_USUARIO}{rol}{pk + i}', password=clave,
+                first_name=nombre, last_name=apellido, email=f'{rol}{pk + i}@ejemplo.com',
+                is_staff=rol == 'administrador',
+            ))
+            perfiles.append(PerfilUsuario(
+                user_id=pk + i, rol=rol, telefono=self._telefono(), departamento='Ventas',
+                fecha_contratacion=inicio + datetime.timedelta(days=self.rng.randrange(2 * self.dias)),
+            ))
+            if rol != 'administrador':
+                vendedores.append(pk + i)
+        self._insertar('usuarios', User, usuarios)
+        self._insertar('perfiles', PerfilUsuario, perfiles)
+        return vendedores
+
+    def productos(self, categorias, proveedores, creadores):
+        """Devuelve {pk: precio} para calcular los totales de las ventas"""
+        pk = self._siguiente_pk(Producto)
+        filas = []
+        for i, momento in enumerate(self._momentos(self.tamanos['productos'], self.dias)):
+            # Precios log-normales: muchos productos baratos y pocos muy caros (mediana ~$150)
+            precio = Decimal(str(round(min(max(self.rng.lognormvariate(5, 1), 5), 50000), 2)))
+            filas.append(Producto(
+                pk=pk + i,
+                nombre=f'{self.rng.choice(PRODUCTOS)} {self.rng.choice(ADJETIVOS)} {pk + i}',
+                descripcion=f'Producto generado {pk + i}', precio_venta=precio,
+                stock=int(self.rng.expovariate(1 / 60)), categoria_id=self.rng.choice(categorias),
+                proveedor_id=self.rng.choice(proveedores) if self.rng.random() < 0.9 else None,
+                creado_por_id=self.rng.choice(creadores), fecha_creacion=momento,
+                activo=self.rng.random() < 0.95,
+            ))
+        self._insertar('productos', Producto, filas)
+        return {p.pk: p.precio_venta for p in filas}
+
+    def clientes(self):
+        pk = self._siguiente_pk(Cliente)
+        filas = []
+        for i, momento in enumerate(self._momentos(self.tamanos['clientes'], self.dias)):
+            nombre, apellido = self._persona()
+            filas.append(Cliente(
+                pk=pk + i, nombre=nombre, apellido=apellido, email=f'cliente{pk + i}@ejemplo.com',
+                telefono=self._telefono(), direccion=self._direccion(), fecha_registro=momento,
+            ))
+        self._insertar('clientes', Cliente, filas)
+        return [c.pk for c in filas]
+
+    # ---------- Ventas ----------
+    def _peso_dia(self, fecha):
+        transcurrido = (fecha - self.desde).days / max(self.dias - 1, 1)
+        return TEMPORADA[fecha.month] * DIA_SEMANA[fecha.weekday()] * (1 + CRECIMIENTO * transcurrido)
+
+    def _ventas_por_dia(self):
+        """Reparte el total de ventas entre los días según su peso (el resto se sortea)"""
+        fechas = [self.desde + datetime.timedelta(days=i) for i in range(self.dias)]
+        pesos = [self._peso_dia(f) for f in fechas]
+        suma = sum(pesos)
+        for fecha, peso in zip(fechas, pesos):
+            esperado = self.tamanos['ventas'] * peso / suma
+            n = int(esperado) + (self.rng.random() < esperado % 1)
+            yield fecha, n
+
+    def _hora(self):
+        """Hora del día en segundos: dos picos alrededor de HORAS_PICO, dentro del horario"""
+        hora = self.rng.gauss(self.rng.choice(HORAS_PICO), 1.75)
+        return int(min(max(hora, HORA_APERTURA), HORA_CIERRE - 1e-3) * 3600)
+
+    def _renglones(self, productos):
+        """{producto_id: cantidad} de una venta: casi siempre 1-3 productos, pocas piezas"""
+        n = 1
+        while n < 10 and self.rng.random() < 0.45:
+            n += 1
+        renglones = {}
+        for _ in range(n):
+            producto_id = productos.elegir()
+            renglones[producto_id] = renglones.get(producto_id, 0) + self.rng.choice((1, 1, 1, 1, 2, 2, 3, 5))
+        return renglones
+
+    def ventas(self, precios, clientes, vendedores):
+        """Ventas en orden cronológico (los ids crecen con la fecha, como en producción)"""
+        productos = Zipf(precios, ZIPF_PRODUCTOS, self.rng)
+        compradores = Zipf(clientes, ZIPF_CLIENTES, self.rng)
+        cajeros = Zipf(vendedores, ZIPF_VENDEDORES, self.rng)
+        pk = itertools.count(self._siguiente_pk(Venta))
+        ventas, detalles = [], []
+        total_ventas = total_detalles = 0
+
+        def escribir():
+            nonlocal total_ventas, total_detalles
+            total_ventas += len(ventas)
+            total_detalles += len(detalles)
+            with transaction.atomic():
+                Venta.objects.bulk_create(ventas)
+                DetalleVenta.objects.bulk_create(detalles)
+            ventas.clear()
+            detalles.clear()
+            self.progreso('ventas', total_ventas)
+
+        ahora = timezone.now()
+        for fecha, n in self._ventas_por_dia():
+            inicio = timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+            for segundos in sorted(self._hora() for _ in range(n)):
+                momento = inicio + datetime.timedelta(seconds=segundos)
+                if momento > ahora:
+                    break  # Hoy solo hasta la hora actual
+                venta_id = next(pk)
+                total = Decimal('0.00')
+                for producto_id, cantidad in self._renglones(productos).items():
+                    subtotal = precios[producto_id] * cantidad
+                    total += subtotal
+                    detalles.append(DetalleVenta(venta_id=venta_id, producto_id=producto_id, cantidad=cantidad,
+                                                 precio_unitario=precios[producto_id], subtotal=subtotal))
+                ventas.append(Venta(
+                    pk=venta_id, fecha_venta=momento,
+                    total=total, vendido_por_id=cajeros.elegir(),
+                    cliente_id=None if self.rng.random() < VENTAS_SIN_CLIENTE else compradores.elegir(),
+                ))
+                if len(ventas) >= self.lote:
+                    escribir()
+        if ventas:
+            escribir()
+        return total_ventas, total_detalles
+
+    # ---------- Todo junto ----------
+    def generar(self):
+        """Genera todas las tablas; devuelve {tabla: filas creadas}"""
+        with sin_auto_now_add(Categoria, Producto, Cliente, Venta, PerfilUsuario):
+            categorias = self.categorias()
+            proveedores = self.proveedores()
+            vendedores = self.usuarios()
+            precios = self.productos(categorias, proveedores, vendedores)
+            clientes = self.clientes()
+            num_ventas, num_detalles = self.ventas(precios, clientes, vendedores)
+        reiniciar_secuencias()
+        return {
+            'categorias': len(categorias), 'proveedores': len(proveedores),
+            'usuarios': self.tamanos['usuarios'], 'productos': len(precios), 'clientes': len(clientes),
+            'ventas': num_ventas, 'detalles': num_detalles,
+        }
+
+
+def reiniciar_secuencias():
+    """
+    Ajusta las secuencias de PK tras insertar con PKs explícitas (PostgreSQL las
+    necesita; MySQL y SQLite avanzan su AUTO_INCREMENT solos y no generan SQL).
+    """
+    modelos = [Categoria, Proveedor, User, PerfilUsuario, Producto, Cliente, Venta, DetalleVenta]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+            cursor.execute(sql)
@@ -0,0 +1,96 @@
+# tienda/hashing.py
+# Hash de contraseñas en paralelo para operaciones masivas (rehashear_passwords,
+# provisionar_usuarios).
+#
+# PBKDF2 con las iteraciones por defecto de Django cuesta cientos de ms de CPU por
+# contraseña: mil usuarios en serie son minutos en un solo núcleo. hashear() reparte
+# las contraseñas en lotes entre un pool de procesos (uno por núcleo) y devuelve los
+# hashes en el mismo orden, listos para asignar a User.password y escribir con
+# bulk_update/bulk_create.
+#
+# Las funciones que corren en los procesos hijos son de nivel de módulo (se pasan por
+# pickle) y configuran Django al arrancar, para que funcione también con 'spawn'.
+import csv
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+
+LOTE_HASH = 16  # Contraseñas por tarea enviada al pool (amortiza el pickle sin desbalancear)
+MINIMO_PARALELO = 4  # Con menos contraseñas no vale la pena arrancar procesos
+
+
+def _iniciar_proceso(settings_module):
+    # Con 'fork' el hijo ya hereda Django configurado; con 'spawn' hay que configurarlo
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hashear_lote(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def procesos_por_defecto():
+    return os.cpu_count() or 1
+
+
+def hashear(passwords, procesos=None, progreso=None):
+    """
+    Hashes de `passwords` con el hasher preferido (PASSWORD_HASHERS[0]), en el mismo
+    orden. progreso(hechos, total, segundos) se llama al terminar cada lote.
+    """
+    passwords = list(passwords)
+    total = len(passwords)
+    procesos = procesos or procesos_por_defecto()
+    inicio = time.perf_counter()
+    lotes = [passwords[i:i + LOTE_HASH] for i in range(0, total, LOTE_HASH)]
+    hashes = []
+
+    if procesos == 1 or total < MINIMO_PARALELO:
+        resultados = map(_hashear_lote, lotes)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(procesos, len(lotes)), initializer=_iniciar_proceso,
+                                   initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),))
+        resultados = pool.map(_hashear_lote, lotes)  # Conserva el orden de los lotes
+    try:
+        for lote in resultados:
+            hashes.extend(lote)
+            if progreso:
+                progreso(len(hashes), total, time.perf_counter() - inicio)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return hashes
+
+
+def hash_desactualizado(encoded):
+    """
+    True si el hash no es del hasher preferido o le faltan iteraciones (Django lo
+    actualizaría en el próximo login). Las contraseñas inutilizables no cuentan.
+    """
+    if not encoded or encoded.startswith('!'):
+        return False
+    preferido = get_hasher()
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return True  # Formato desconocido: nadie puede entrar con él
+    return hasher.algorithm != preferido.algorithm or preferido.must_update(encoded)
+
+
+def password_temporal():
+    return secrets.token_urlsafe(12)
+
+
+def escribir_credenciales(ruta, pares):
+    """CSV username,password legible solo por el dueño (contraseñas temporales); lanza OSError"""
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(descriptor, 0o600)  # También si el archivo ya existía con otros permisos
+    with open(descriptor, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(['username', 'password'])
+        escritor.writerows(pares)
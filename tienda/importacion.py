@@ -0,0 +1,231 @@
+# tienda/importacion.py
+# Importación masiva de productos, clientes y proveedores desde CSV o JSONL.
+# Lo usa el comando: python manage.py importar_datos <modelo> <archivo>
+#
+# - El archivo se lee renglón por renglón (nunca completo en memoria).
+# - Cada renglón se valida con las mismas reglas de ProductoForm/ClienteForm/ProveedorForm.
+# - Categoría y proveedor se resuelven con un diccionario nombre -> id cargado una vez,
+#   en lugar de una consulta por renglón.
+# - Los renglones válidos se acumulan en lotes y se escriben con bulk_create
+#   (clientes: upsert por email), una transacción por lote.
+# - Los errores se reportan por renglón y no detienen la importación.
+import csv
+import io
+import json
+
+from django.db import connection, transaction
+
+from . import busqueda, estadisticas, reorden, versiones
+from .forms import ClienteForm, ProductoForm, ProveedorForm
+from .models import Categoria, Cliente, Producto, Proveedor
+
+LOTE_IMPORTACION = 1000
+
+
+# ============ FORMULARIOS DE IMPORTACIÓN ============
+# Reutilizan los campos, widgets y validaciones de los formularios de la interfaz;
+# solo cambian lo que haría una consulta por renglón.
+class ProductoImportForm(ProductoForm):
+    class Meta(ProductoForm.Meta):
+        # 'categoria' se resuelve con el mapa nombre -> id (un ModelChoiceField haría un SELECT por renglón)
+        fields = ['nombre', 'descripcion', 'precio_venta', 'stock', 'stock_minimo', 'activo']
+
+
+class ClienteImportForm(ClienteForm):
+    def validate_unique(self):
+        # El email repetido no es un error al importar: el upsert actualiza al cliente existente
+        pass
+
+
+class ProveedorImportForm(ProveedorForm):
+    pass
+
+
+def _clave(nombre):
+    return (nombre or '').strip().lower()
+
+
+# ============ LECTURA EN STREAMING ============
+def leer_renglones(archivo, formato):
+    """Genera (numero_renglon, dict) desde un archivo de texto abierto, sin cargarlo completo"""
+    if formato == 'csv':
+        for numero, renglon in enumerate(csv.DictReader(archivo), start=2):  # renglón 1 = encabezados
+            yield numero, renglon
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError as exc:
+                yield numero, exc  # El importador lo reporta como error del renglón
+                continue
+            yield numero, datos
+    elif formato == 'json':
+        # Un arreglo de objetos: se carga completo (listas cortas, como una plantilla de personal)
+        datos = json.load(archivo)
+        if not isinstance(datos, list):
+            raise ValueError('El JSON debe ser un arreglo de objetos')
+        yield from enumerate(datos, start=1)
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def _texto(valor):
+    """Valores de JSON (números, booleanos) a texto, como llegarían de un formulario"""
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    return str(valor)
+
+
+def _objeto(datos):
+    """El renglón si es un objeto; un renglón JSONL como [1, 2] o 5 es un ValueError del renglón"""
+    if not isinstance(datos, dict):
+        raise ValueError(f'se esperaba un objeto, no {type(datos).__name__}')
+    return datos
+
+
+# ============ IMPORTADORES ============
+class Importador:
+    """Base: valida renglones con `form_class`, acumula en lotes y los guarda con guardar_lote()"""
+    modelo = None
+    form_class = None
+
+    def __init__(self, lote=LOTE_IMPORTACION, reportar_error=None):
+        self.lote = lote
+        self.reportar_error = reportar_error or (lambda numero, mensaje: None)
+        self.importados = 0
+        self.errores = 0
+
+    def preparar(self):
+        """Carga lo que se necesita antes de empezar (mapas de llaves foráneas)"""
+
+    def construir(self, datos):
+        """Valida un renglón y devuelve la instancia sin guardar (o lanza ValueError con el mensaje)"""
+        form = self.form_class(data={k: _texto(v) for k, v in _objeto(datos).items()})
+        if not form.is_valid():
+            raise ValueError('; '.join(f'{campo}: {" ".join(msgs)}' for campo, msgs in form.errors.items()))
+        return form.save(commit=False)
+
+    def guardar_lote(self, instancias):
+        self.modelo.objects.bulk_create(instancias, batch_size=self.lote)
+
+    def terminar(self):
+        """Trabajo posterior a la carga (índices, contadores)"""
+        # bulk_create no dispara señales
+        estadisticas.invalidar_conteo(self.modelo)
+        versiones.cambiar(self.modelo)
+
+    def importar(self, renglones):
+        self.preparar()
+        pendientes = []
+        for numero, datos in renglones:
+            try:
+                if isinstance(datos, Exception):
+                    raise ValueError(f'JSON inválido: {datos}')
+                pendientes.append(self.construir(datos))
+            except ValueError as exc:
+                self.errores += 1
+                self.reportar_error(numero, str(exc))
+                continue
+            if len(pendientes) >= self.lote:
+                self._escribir(pendientes)
+                pendientes = []
+        if pendientes:
+            self._escribir(pendientes)
+        self.terminar()
+        return self.importados, self.errores
+
+    def _escribir(self, instancias):
+        with transaction.atomic():
+            self.guardar_lote(instancias)
+        self.importados += len(instancias)
+
+
+class ImportadorProductos(Importador):
+    modelo = Producto
+    form_class = ProductoImportForm
+
+    def __init__(self, *args, crear_categorias=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.crear_categorias = crear_categorias
+
+    def preparar(self):
+        # Mapas nombre -> id: una consulta por tabla para todo el archivo
+        self.categorias = {_clave(n): pk for pk, n in Categoria.objects.values_list('pk', 'nombre')}
+        self.proveedores = {}
+        for pk, nombre, empresa in Proveedor.objects.values_list('pk', 'nombre', 'empresa'):
+            self.proveedores.setdefault(_clave(nombre), pk)
+            if empresa:
+                self.proveedores[_clave(empresa)] = pk  # La empresa tiene prioridad sobre el contacto
+        # Los productos nuevos tendrán PK mayor que la actual: así se indexan al final sin
+        # depender de que bulk_create devuelva las PK (MySQL no lo hace)
+        ultimo = Producto._base_manager.order_by('-pk').values_list('pk', flat=True).first()
+        self.ultimo_id = ultimo or 0
+
+    def construir(self, datos):
+        datos = dict(_objeto(datos))
+        if _texto(datos.get('activo')).strip() == '':
+            datos['activo'] = 'true'  # Sin columna 'activo' el checkbox se leería como False
+        elif _texto(datos['activo']).strip().lower() in ('0', 'no', 'n', 'falso', 'false'):
+            datos['activo'] = 'false'
+        producto = super().construir(datos)
+
+        nombre_categoria = _texto(datos.get('categoria'))
+        categoria_id = self.categorias.get(_clave(nombre_categoria))
+        if categoria_id is None:
+            if not (self.crear_categorias and nombre_categoria.strip()):
+                raise ValueError(f'categoria: no existe "{nombre_categoria}"')
+            categoria_id = Categoria.objects.create(nombre=nombre_categoria.strip()).pk
+            self.categorias[_clave(nombre_categoria)] = categoria_id
+        producto.categoria_id = categoria_id
+
+        nombre_proveedor = _texto(datos.get('proveedor'))
+        if nombre_proveedor.strip():
+            proveedor_id = self.proveedores.get(_clave(nombre_proveedor))
+            if proveedor_id is None:
+                raise ValueError(f'proveedor: no existe "{nombre_proveedor}"')
+            producto.proveedor_id = proveedor_id
+        return producto
+
+    def terminar(self):
+        super().terminar()
+        busqueda.reindexar_todo(desde_id=self.ultimo_id)
+        reorden.actualizar(Producto._base_manager.filter(pk__gt=self.ultimo_id))  # bulk_create no dispara señales
+
+
+class ImportadorClientes(Importador):
+    modelo = Cliente
+    form_class = ClienteImportForm
+    CAMPOS_ACTUALIZABLES = ['nombre', 'apellido', 'telefono', 'direccion']
+
+    def guardar_lote(self, instancias):
+        # Upsert por email: si el cliente ya existe se actualizan sus datos (y se reactiva
+        # si estaba desactivado). Dentro del lote gana el último renglón con el mismo email.
+        por_email = {c.email.lower(): c for c in instancias}
+        # `modificado` también: bulk_create le pone la hora actual (auto_now) y el upsert debe conservarla
+        kwargs = {'update_conflicts': True, 'update_fields': self.CAMPOS_ACTUALIZABLES + ['activo', 'modificado']}
+        if connection.features.supports_update_conflicts_with_target:
+            kwargs['unique_fields'] = ['email']  # MySQL no acepta columnas objetivo (usa ON DUPLICATE KEY)
+        Cliente.objects.bulk_create(list(por_email.values()), batch_size=self.lote, **kwargs)
+
+
+class ImportadorProveedores(Importador):
+    modelo = Proveedor
+    form_class = ProveedorImportForm
+
+
+IMPORTADORES = {
+    'producto': ImportadorProductos,
+    'cliente': ImportadorClientes,
+    'proveedor': ImportadorProveedores,
+}
+
+
+def abrir_texto(ruta, stdin=None):
+    """Abre el archivo como texto UTF-8 (acepta BOM de Excel); '-' lee de la entrada estándar"""
+    if ruta == '-':
+        return io.TextIOWrapper(stdin.buffer, encoding='utf-8-sig', newline='')
+    return open(ruta, encoding='utf-8-sig', newline='')
@@ -0,0 +1,281 @@
+# tienda/inventario.py
+# Movimientos de inventario: cada cambio de stock queda en MovimientoInventario.
+#
+# - El stock nunca se sobrescribe: se aplica un delta con
+#       UPDATE producto SET stock = stock + n WHERE id = X [AND stock >= -n]
+#   así dos cambios simultáneos se suman en lugar de pisarse (el último ya no gana).
+# - Los deltas se agrupan por producto: 300 lecturas del mismo código de barras
+#   son un solo UPDATE y un solo bulk_create de movimientos.
+# - BufferMovimientos acumula lecturas de escáner y las escribe por lotes.
+# - stock_a_fecha() parte del último SnapshotInventario y suma los movimientos
+#   posteriores, sin recorrer el libro completo.
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import reorden, versiones
+from .exportacion import iterar_en_bloques
+from .models import MovimientoInventario, Producto, SnapshotInventario
+
+LOTE_MOVIMIENTOS = 500  # Movimientos acumulados antes de escribir
+INTERVALO_MOVIMIENTOS = 5.0  # Segundos máximos que un movimiento espera en el buffer
+LOTE_SNAPSHOT = 2000  # Productos por INSERT al tomar un snapshot
+
+
+class SinStock(ValueError):
+    """Un delta negativo dejaría el stock del producto por debajo de cero"""
+
+    def __init__(self, producto_id, delta):
+        self.producto_id = producto_id
+        self.delta = delta
+        super().__init__(f'Stock insuficiente para el producto {producto_id} ({delta:+d})')
+
+
+class ProductoInexistente(ValueError):
+    """El delta es para un producto que no existe"""
+
+    def __init__(self, producto_id):
+        self.producto_id = producto_id
+        super().__init__(f'No existe el producto {producto_id}')
+
+
+# ============ DELTAS ============
+def aplicar_deltas(deltas):
+    """
+    Suma {producto_id: delta} al stock con un UPDATE por producto, que también
+    actualiza la bandera de reorden (ver tienda/reorden.py).
+
+    Los deltas negativos son condicionales (stock >= -delta): si alguno no alcanza
+    se lanza SinStock; si el producto no existe, ProductoInexistente. Debe ejecutarse dentro de una transacción para que lo ya
+    aplicado se revierta. Los productos se recorren ordenados por id para que dos
+    transacciones bloqueen los renglones en el mismo orden (sin interbloqueos).
+    """
+    for producto_id in sorted(deltas):
+        delta = deltas[producto_id]
+        if not delta:
+            continue
+        filas = Producto._base_manager.filter(pk=producto_id)  # También los desactivados (devoluciones)
+        if delta < 0:
+            filas = filas.filter(stock__gte=-delta)
+        # La bandera va ANTES que stock: MySQL evalúa las asignaciones de izquierda a
+        # derecha con los valores ya cambiados; así todos los motores leen el stock anterior.
+        # update() no aplica auto_now: `modificado` se pone a mano (caché de la lista)
+        actualizados = filas.update(requiere_reorden=reorden.bandera(delta), stock=F('stock') + delta,
+                                    modificado=timezone.now())
+        if not actualizados:
+            # Cero renglones: se distingue (solo en este caso) falta de stock de id desconocido
+            if not Producto._base_manager.filter(pk=producto_id).exists():
+                raise ProductoInexistente(producto_id)
+            raise SinStock(producto_id, delta)
+    versiones.cambiar(Producto)  # update() no dispara señales
+
+
+def anotar(movimientos):
+    """Inserta movimientos ya aplicados al stock (un solo INSERT por lote)"""
+    MovimientoInventario.objects.bulk_create(movimientos, batch_size=LOTE_MOVIMIENTOS)
+
+
+def _sumar_por_producto(movimientos):
+    deltas = {}
+    for mov in movimientos:
+        deltas[mov.producto_id] = deltas.get(mov.producto_id, 0) + mov.cantidad
+    return deltas
+
+
+def registrar_movimientos(movimientos):
+    """Aplica y anota una lista de MovimientoInventario (sin guardar) en una transacción"""
+    if not movimientos:
+        return
+    with transaction.atomic():
+        aplicar_deltas(_sumar_por_producto(movimientos))
+        anotar(movimientos)
+
+
+def mover(producto_id, cantidad, tipo, usuario=None, nota=''):
+    """Registra un solo movimiento (p. ej. una recepción de mercancía)"""
+    registrar_movimientos([MovimientoInventario(
+        producto_id=producto_id, tipo=tipo, cantidad=cantidad, usuario=usuario, nota=nota,
+    )])
+
+
+def guardar_producto(form, usuario=None, ajustar_stock=True):
+    """
+    Guarda un ProductoForm sin sobrescribir el stock.
+
+    El stock capturado se convierte en un ajuste contra el valor que el usuario
+    vio al abrir el formulario (ver forms.StockMostradoMixin): si mientras tanto
+    se vendieron unidades, esas ventas se conservan. Si el ajuste dejaría el
+    stock negativo se lanza SinStock y no se guarda nada. Con ajustar_stock=False
+    se guardan los demás campos y el stock queda como está.
+    """
+    producto = form.save(commit=False)
+    with transaction.atomic():
+        if producto._state.adding:
+            producto.save()
+            if producto.stock:
+                anotar([MovimientoInventario(producto=producto, tipo='ajuste', cantidad=producto.stock,
+                                             usuario=usuario, nota='Stock inicial')])
+        else:
+            # Ni el stock ni su bandera de reorden se escriben desde el objeto en memoria
+            campos = [f.attname for f in Producto._meta.concrete_fields
+                      if not f.primary_key and f.name not in ('stock', 'requiere_reorden')]
+            producto.save(update_fields=campos)
+            delta = 0
+            if ajustar_stock and 'stock' in form.changed_data:
+                mostrado = form.stock_mostrado() if hasattr(form, 'stock_mostrado') else form.initial['stock']
+                delta = form.cleaned_data['stock'] - mostrado
+            if delta:
+                registrar_movimientos([MovimientoInventario(producto=producto, tipo='ajuste', cantidad=delta,
+                                                            usuario=usuario, nota='Edición de producto')])
+            # El objeto en memoria muestra el stock real después del ajuste
+            producto.stock = Producto._base_manager.filter(pk=producto.pk).values_list('stock', flat=True).get()
+        form.save_m2m()
+    return producto
+
+
+# ============ BUFFER PARA ESCÁNERES ============
+class BufferMovimientos:
+    """
+    Acumula movimientos y los escribe por lotes: al llegar a `tamano`, cuando el
+    primero pendiente lleva `intervalo` segundos (un temporizador los escribe
+    aunque no lleguen más lecturas) o al llamar a vaciar(). Se puede usar como
+    context manager (al salir se vacía). Es seguro entre hilos.
+
+    Los movimientos de un producto inexistente o sin stock suficiente no detienen
+    el lote: se apartan en `rechazados` como (referencia, error), donde referencia
+    es la que se pasó a agregar() (p. ej. el número de línea), y el resto se escribe.
+
+        with BufferMovimientos(usuario=request.user) as buffer:
+            for codigo in lecturas:
+                buffer.agregar(codigo, 1, 'entrada')
+    """
+
+    def __init__(self, tamano=LOTE_MOVIMIENTOS, intervalo=INTERVALO_MOVIMIENTOS, usuario=None):
+        self.tamano = tamano
+        self.intervalo = intervalo
+        self.usuario = usuario
+        self._pendientes = []
+        self._temporizador = None
+        self._lock = threading.Lock()
+        self.escritos = 0
+        self.rechazados = []
+
+    def agregar(self, producto_id, cantidad, tipo, nota='', referencia=None):
+        movimiento = MovimientoInventario(
+            producto_id=producto_id, tipo=tipo, cantidad=cantidad, usuario=self.usuario,
+            nota=nota, fecha=timezone.now(),
+        )
+        movimiento._referencia = referencia
+        with self._lock:
+            if self._temporizador is None:
+                self._temporizador = threading.Timer(self.intervalo, self._vencido)
+                self._temporizador.daemon = True
+                self._temporizador.start()
+            self._pendientes.append(movimiento)
+            lleno = len(self._pendientes) >= self.tamano
+        if lleno:
+            self.vaciar()
+
+    def _vencido(self):
+        # Hilo del temporizador: usa su propia conexión y la cierra al terminar
+        try:
+            self.vaciar()
+        except Exception:
+            pass  # Los movimientos siguen en el buffer: se reintentan en el siguiente vaciado
+        finally:
+            connection.close()
+
+    def vaciar(self):
+        """
+        Escribe lo pendiente y devuelve cuántos movimientos escribió. Si falla por
+        otra causa, los movimientos no escritos vuelven al buffer.
+        """
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, []
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+        aparte = []
+        escritos = 0
+        try:
+            while pendientes:
+                try:
+                    registrar_movimientos(pendientes)
+                except (SinStock, ProductoInexistente) as exc:
+                    # Sin ese producto se reintenta el lote; sus lecturas se prueban una por una
+                    aparte.extend(m for m in pendientes if m.producto_id == exc.producto_id)
+                    pendientes = [m for m in pendientes if m.producto_id != exc.producto_id]
+                else:
+                    escritos += len(pendientes)
+                    pendientes = []
+            while aparte:
+                try:
+                    registrar_movimientos(aparte[:1])
+                except (SinStock, ProductoInexistente) as exc:
+                    with self._lock:
+                        self.rechazados.append((aparte[0]._referencia, exc))
+                else:
+                    escritos += 1
+                aparte.pop(0)
+        except Exception:
+            with self._lock:
+                self._pendientes[:0] = pendientes + aparte  # Se reintentan en el siguiente vaciado
+            raise
+        finally:
+            with self._lock:
+                self.escritos += escritos
+        return escritos
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.vaciar()
+        elif self._temporizador is not None:
+            self._temporizador.cancel()
+
+
+# ============ SNAPSHOTS ============
+def tomar_snapshot(fecha=None, lote=LOTE_SNAPSHOT):
+    """Guarda el stock actual de todos los productos con la misma `fecha`; devuelve cuántos"""
+    fecha = fecha or timezone.now()
+    total = 0
+    with transaction.atomic():
+        bloque = []
+        for producto_id, stock in iterar_en_bloques(Producto._base_manager.all(), ['pk', 'stock']):
+            bloque.append(SnapshotInventario(producto_id=producto_id, fecha=fecha, stock=stock))
+            if len(bloque) >= lote:
+                SnapshotInventario.objects.bulk_create(bloque)
+                total += len(bloque)
+                bloque = []
+        SnapshotInventario.objects.bulk_create(bloque)
+        total += len(bloque)
+    return total
+
+
+def stock_a_fecha(producto_id, fecha):
+    """
+    Stock del producto en el momento `fecha`.
+
+    Con un snapshot anterior: su stock más los movimientos entre el snapshot y la
+    fecha. Sin snapshot: el stock actual menos los movimientos posteriores a la fecha.
+    """
+    snapshot = (SnapshotInventario.objects.filter(producto_id=producto_id, fecha__lte=fecha)
+                .order_by('-fecha').values_list('fecha', 'stock').first())
+    movimientos = MovimientoInventario.objects.filter(producto_id=producto_id)
+    if snapshot:
+        desde, stock = snapshot
+        suma = movimientos.filter(fecha__gt=desde, fecha__lte=fecha).aggregate(s=Sum('cantidad'))['s']
+        return stock + (suma or 0)
+    actual = Producto._base_manager.filter(pk=producto_id).values_list('stock', flat=True).first()
+    if actual is None:
+        return None
+    suma = movimientos.filter(fecha__gt=fecha).aggregate(s=Sum('cantidad'))['s']
+    return actual - (suma or 0)
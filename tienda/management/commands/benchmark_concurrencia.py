@@ -0,0 +1,69 @@
+# tienda/management/commands/benchmark_concurrencia.py
+# Compara WSGI contra ASGI con varios clientes a la vez sobre las vistas async (home,
+# reportes_ventas; ver tienda/asincrono.py y benchmark.medir_concurrencia).
+# Ejecutar con:
+#   python manage.py benchmark_concurrencia
+#   python manage.py benchmark_concurrencia --vista reportes --concurrencias 1 8 32 --sin-cache
+#
+# --sin-cache reemplaza la caché 'default' por DummyCache: cada petición recalcula las
+# estadísticas y los reportes, que es donde las consultas en paralelo se notan.
+#
+# Con servidores reales (la cifra que vale para producción), con una cookie de sesión
+# de un gerente y la misma base:
+#   gunicorn sistema_tienda.wsgi -w 4 --threads 4 -b :8000
+#   uvicorn sistema_tienda.asgi:application --workers 4 --port 8001
+#   hey -n 2000 -c 32 -H 'Cookie: sessionid=...' http://localhost:8000/reportes/
+#   hey -n 2000 -c 32 -H 'Cookie: sessionid=...' http://localhost:8001/reportes/
+# (o wrk -t4 -c32 -d30s con la misma cabecera). Bajo ASGI los middlewares síncronos
+# (métricas, perfilador) corren en un hilo por petición; las vistas async ahorran la
+# espera en serie de sus consultas, no el costo de la plantilla.
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from tienda import benchmark
+
+VISTAS = ('home', 'reportes')  # Nombres de URL
+
+
+class Command(BaseCommand):
+    help = 'Latencia p50/p95 y peticiones/s de las vistas async con N clientes a la vez, bajo WSGI y bajo ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vista', choices=VISTAS, default='home')
+        parser.add_argument('--concurrencias', type=int, nargs='+', default=list(benchmark.CONCURRENCIAS),
+                            help='Clientes simultáneos de cada corrida')
+        parser.add_argument('--peticiones', type=int, default=benchmark.PETICIONES_CONCURRENCIA,
+                            help='Peticiones por corrida, repartidas entre los clientes')
+        parser.add_argument('--modos', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--sin-cache', action='store_true',
+                            help="Caché 'default' deshabilitada: cada petición va a la base")
+
+    def handle(self, *args, **options):
+        if min(options['concurrencias']) < 1 or options['peticiones'] < 1:
+            raise CommandError('--concurrencias y --peticiones deben ser mayores que cero')
+        try:
+            usuario = benchmark.usuarios_por_rol(('gerente',))['gerente']  # Puede ver ambas vistas
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        url = reverse(options['vista'])
+
+        ajustes = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}  # Host del cliente de pruebas
+        if options['sin_cache']:
+            ajustes['CACHES'] = {**settings.CACHES,
+                                 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        self.stdout.write(f'{"modo":<6} {"clientes":>8} {"estado":>7} {"p50":>8} {"p95":>8} {"pet/s":>8}')
+        resultados = {}
+        with override_settings(**ajustes):
+            for modo in options['modos']:
+                def progreso(concurrencia, m, modo=modo):
+                    self.stdout.write(f'{modo:<6} {concurrencia:>8} {m["estado"]:>7} {m["p50_ms"]:>8.1f} '
+                                      f'{m["p95_ms"]:>8.1f} {m["por_segundo"]:>8.1f}')
+                resultados[modo] = benchmark.medir_concurrencia(
+                    url, usuario, modo, options['concurrencias'], options['peticiones'], progreso=progreso)
+
+        maxima = max(options['concurrencias'])
+        resumen = ', '.join(f'{modo} {r[maxima]["por_segundo"]:.1f} pet/s' for modo, r in resultados.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ {options["vista"]} con {maxima} clientes: {resumen}'))
@@ -0,0 +1,48 @@
+# tienda/management/commands/benchmark_login.py
+# Mide el costo del login: cuántas verificaciones de contraseña (PBKDF2) paga cada
+# intento y cuántos logins por segundo atiende un núcleo (ver benchmark.medir_login).
+# Ejecutar con:
+#   python manage.py benchmark_login --password tienda123
+#   python manage.py benchmark_login --usuario gen_vendedor3 --password tienda123 --repeticiones 50
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from tienda import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Latencia y logins/s del POST de login: correcto, fallido y bloqueado, contra el costo de un hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--password', required=True, help='Contraseña del usuario (la de generar_datos es tienda123)')
+        parser.add_argument('--usuario', help='Usuario que inicia sesión (por defecto, el primer vendedor activo)')
+        parser.add_argument('--repeticiones', type=int, default=benchmark.REPETICIONES)
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1')
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f'No existe el usuario {options["usuario"]!r}')
+        else:
+            try:
+                usuario = benchmark.usuarios_por_rol(('vendedor',))['vendedor']
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        if not usuario.check_password(options['password']):
+            raise CommandError(f'La contraseña no es la de {usuario.get_username()}')
+
+        # El cliente de pruebas usa el host 'testserver', que settings.ALLOWED_HOSTS no incluye
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            resultados = benchmark.medir_login(usuario, options['password'], options['repeticiones'])
+
+        self.stdout.write(f'{"caso":<12} {"p50":>8} {"p95":>8} {"logins/s":>9} {"hashes":>7}')
+        for caso, m in resultados.items():
+            self.stdout.write(f'{caso:<12} {m["p50_ms"]:>8.1f} {m["p95_ms"]:>8.1f} {m["por_segundo"]:>9.1f} '
+                              f'{m["hashes"]:>7.2f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Login de {usuario.get_username()}: {resultados["correcto"]["hashes"]:.2f} hashes por intento, '
+            f'{resultados["correcto"]["por_segundo"]:.1f} logins/s por núcleo'))
@@ -0,0 +1,81 @@
+# tienda/management/commands/benchmark_vistas.py
+# Mide las vistas de la tienda con cada rol y compara contra una línea base (ver tienda/benchmark.py).
+# Ejecutar con:
+#   python manage.py generar_datos --escala 1
+#   python manage.py benchmark_vistas --guardar-linea-base linea_base.json
+#   python manage.py benchmark_vistas --linea-base linea_base.json     (falla si hay regresiones)
+#   python manage.py benchmark_vistas --solo producto --roles gerente --repeticiones 50
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from tienda import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Latencia p50/p95/p99, consultas SQL y memoria de cada vista por rol; compara con una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=benchmark.REPETICIONES,
+                            help='Peticiones medidas por escenario y rol')
+        parser.add_argument('--calentamiento', type=int, default=benchmark.CALENTAMIENTO,
+                            help='Peticiones previas sin medir (llenan cachés)')
+        parser.add_argument('--roles', nargs='+', choices=benchmark.ROLES, default=list(benchmark.ROLES))
+        parser.add_argument('--solo', help='Solo los escenarios cuyo nombre contenga este texto')
+        parser.add_argument('--password', help='Contraseña de los usuarios, para medir el POST de login '
+                                               '(la de generar_datos es tienda123)')
+        parser.add_argument('--linea-base', help='JSON con el que comparar; termina con error si hay regresiones')
+        parser.add_argument('--guardar-linea-base', help='Guardar los resultados como nueva línea base')
+        parser.add_argument('--tolerancia', type=float, default=benchmark.TOLERANCIA,
+                            help='Aumento relativo permitido en p95 y memoria (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1 or options['calentamiento'] < 0:
+            raise CommandError('--repeticiones debe ser al menos 1 y --calentamiento no negativo')
+        escenarios = [e for e in benchmark.ESCENARIOS if not options['solo'] or options['solo'] in e.nombre]
+        if not escenarios:
+            raise CommandError(f'Ningún escenario contiene {options["solo"]!r}')
+        base = None
+        if options['linea_base']:
+            if not os.path.exists(options['linea_base']):
+                raise CommandError(f'No existe la línea base {options["linea_base"]}')
+            base = benchmark.cargar_linea_base(options['linea_base'])
+            if base['filas'] != benchmark.conteo_de_filas():
+                self.stderr.write(self.style.WARNING(
+                    'La base de datos no tiene el mismo tamaño que cuando se tomó la línea base; '
+                    'las latencias pueden no ser comparables'))
+
+        self.stdout.write(f'{"escenario":<28} {"rol":<14} {"estado":>7} {"p50":>8} {"p95":>8} {"p99":>8} '
+                          f'{"SQL":>5} {"ms SQL":>8} {"KB pico":>9}')
+
+        def progreso(nombre, rol, m):
+            self.stdout.write(f'{nombre:<28} {rol:<14} {m["estado"]:>7} {m["p50_ms"]:>8.1f} {m["p95_ms"]:>8.1f} '
+                              f'{m["p99_ms"]:>8.1f} {m["consultas"]:>5} {m["sql_ms"]:>8.1f} {m["memoria_kb"]:>9.0f}')
+
+        # El cliente de pruebas usa el host 'testserver', que settings.ALLOWED_HOSTS no incluye
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                resultados = benchmark.ejecutar(
+                    escenarios, roles=tuple(options['roles']), repeticiones=options['repeticiones'],
+                    calentamiento=options['calentamiento'], password=options['password'], progreso=progreso,
+                )
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        if options['guardar_linea_base']:
+            benchmark.guardar_linea_base(options['guardar_linea_base'], resultados)
+            self.stdout.write(f'  Línea base guardada en {options["guardar_linea_base"]}')
+
+        if base is not None:
+            # Lo que los filtros de esta corrida dejan fuera no cuenta como escenario faltante
+            regresiones = benchmark.comparar(resultados, base, options['tolerancia'], alcance=lambda clave: (
+                benchmark.en_alcance(clave, options['solo'], options['roles'], options['password'])))
+            for clave, metrica, anterior, actual in regresiones:
+                self.stderr.write(self.style.ERROR(f'  ✗ {clave}: {metrica} {anterior} → {actual}'))
+            if regresiones:
+                raise CommandError(f'{len(regresiones)} regresiones respecto a {options["linea_base"]}')
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(resultados)} mediciones sin regresiones'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(resultados)} mediciones'))
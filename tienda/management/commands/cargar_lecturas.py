@@ -0,0 +1,59 @@
+# tienda/management/commands/cargar_lecturas.py
+# Registra lecturas de escáner como movimientos de inventario, escribiendo por lotes.
+# Cada línea: producto_id[,cantidad[,tipo[,nota]]]  (cantidad 1 y tipo 'entrada' por defecto)
+# Ejecutar con: lector | python manage.py cargar_lecturas -   o   python manage.py cargar_lecturas lecturas.csv
+import csv
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda import inventario
+from tienda.importacion import abrir_texto
+from tienda.models import MovimientoInventario
+
+TIPOS = dict(MovimientoInventario.TIPOS)
+
+
+class Command(BaseCommand):
+    help = 'Registra lecturas de escáner (producto, cantidad, tipo) en el libro de inventario por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Archivo CSV sin encabezados, o '-' para leer de la entrada estándar")
+        parser.add_argument('--usuario', help='Usuario que registra los movimientos')
+        parser.add_argument('--lote', type=int, default=inventario.LOTE_MOVIMIENTOS,
+                            help='Movimientos acumulados antes de escribir')
+        parser.add_argument('--intervalo', type=float, default=inventario.INTERVALO_MOVIMIENTOS,
+                            help='Segundos máximos que una lectura espera antes de escribirse (aunque no lleguen más)')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"No existe el usuario {options['usuario']!r}")
+
+        errores = 0
+        buffer = inventario.BufferMovimientos(tamano=options['lote'], intervalo=options['intervalo'], usuario=usuario)
+        with abrir_texto(options['archivo'], stdin=sys.stdin) as archivo, buffer:
+            for numero, renglon in enumerate(csv.reader(archivo), start=1):
+                if not renglon or not renglon[0].strip():
+                    continue
+                try:
+                    producto_id = int(renglon[0])
+                    cantidad = int(renglon[1]) if len(renglon) > 1 and renglon[1].strip() else 1
+                    tipo = renglon[2].strip() if len(renglon) > 2 and renglon[2].strip() else 'entrada'
+                    if tipo not in TIPOS or tipo == 'venta':
+                        raise ValueError(f'tipo inválido {tipo!r}')
+                except ValueError as exc:
+                    errores += 1
+                    self.stderr.write(f'  Línea {numero}: {exc}')
+                    continue
+                nota = renglon[3].strip()[:200] if len(renglon) > 3 else ''
+                buffer.agregar(producto_id, cantidad, tipo, nota=nota, referencia=numero)
+
+        # Productos inexistentes o sin stock: solo esas lecturas se descartan, las demás se escribieron
+        for numero, exc in sorted(buffer.rechazados, key=lambda r: r[0]):
+            errores += 1
+            self.stderr.write(f'  Línea {numero}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'✓ {buffer.escritos} movimientos registrados, {errores} líneas con error'))
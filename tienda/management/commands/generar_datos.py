@@ -0,0 +1,90 @@
+# tienda/management/commands/generar_datos.py
+# Genera datos sintéticos a escala para pruebas de carga (ver tienda/generador.py).
+# Ejecutar con:
+#   python manage.py generar_datos --escala 0.01            (~1 mil ventas)
+#   python manage.py generar_datos --escala 10 --semilla 7  (~1 millón de ventas)
+#   python manage.py generar_datos --escala 1 --limpiar     (vacía las tablas de la tienda antes)
+import time
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tienda import estadisticas, generador, versiones
+from tienda.models import (Categoria, Cliente, DetalleVenta, IndiceBusqueda, MovimientoInventario, PerfilUsuario,
+                           Producto, Proveedor, SnapshotInventario, Venta, VentaDiaria)
+
+# Tablas que vacía --limpiar (los usuarios solo se borran si los creó el generador)
+TABLAS_TIENDA = [DetalleVenta, VentaDiaria, Venta, MovimientoInventario, SnapshotInventario, IndiceBusqueda,
+                 Producto, Cliente, Proveedor, Categoria]
+
+
+class Command(BaseCommand):
+    help = 'Llena la base con datos sintéticos realistas (sesgados) según un factor de escala'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help='Factor de escala: 1 = 100 mil ventas, 5 mil productos, 20 mil clientes')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria (mismos datos con la misma semilla)')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial de ventas hasta hoy')
+        parser.add_argument('--lote', type=int, default=generador.LOTE_GENERACION, help='Filas por INSERT')
+        parser.add_argument('--password', default=generador.PASSWORD_GENERADA,
+                            help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Vaciar antes las tablas de la tienda y los usuarios generados')
+        parser.add_argument('--no-input', action='store_false', dest='interactivo',
+                            help='No pedir confirmación para --limpiar')
+        parser.add_argument('--sin-indice', action='store_true',
+                            help='No reconstruir el índice de búsqueda (lo más lento a gran escala)')
+
+    def handle(self, *args, **options):
+        if options['escala'] <= 0 or options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--escala, --dias y --lote deben ser positivos')
+        if options['limpiar']:
+            self.limpiar(options['interactivo'])
+
+        tamanos = generador.tamanos(options['escala'])
+        self.stdout.write('Generando: ' + ', '.join(f'{n} {tabla}' for tabla, n in tamanos.items()))
+        inicio = time.monotonic()
+
+        def progreso(tabla, n):
+            self.stdout.write(f'  {tabla}: {n} ({time.monotonic() - inicio:.0f} s)')
+
+        creados = generador.Generador(
+            escala=options['escala'], semilla=options['semilla'], dias=options['dias'],
+            lote=options['lote'], password=options['password'], progreso=progreso,
+        ).generar()
+
+        # bulk_create no pasa por Venta.save() ni por las señales: se reconstruye todo lo derivado
+        self.stdout.write('Reconstruyendo datos derivados...')
+        call_command('recalcular_reorden', stdout=self.stdout)
+        call_command('reconstruir_ventas_diarias', stdout=self.stdout)
+        if not options['sin_indice']:
+            call_command('reindexar_busqueda', stdout=self.stdout)
+        for modelo in estadisticas.MODELOS_CONTADOS:
+            estadisticas.invalidar_conteo(modelo)
+        estadisticas.invalidar_ventas(timezone.localdate())
+        versiones.cambiar(Categoria, Proveedor, Producto, Cliente, Venta)
+
+        resumen = ', '.join(f'{n} {tabla}' for tabla, n in creados.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ Datos generados en {time.monotonic() - inicio:.0f} s: {resumen}'))
+        self.stdout.write(f"  Usuarios: {generador.PREFIJO_USUARIO}<rol><id>, contraseña '{options['password']}'")
+
+    def limpiar(self, interactivo):
+        if interactivo:
+            respuesta = input('Se BORRARÁN todos los productos, clientes, proveedores, categorías y ventas. '
+                              "Escriba 'si' para continuar: ")
+            if respuesta.strip().lower() not in ('si', 'sí'):
+                raise CommandError('Cancelado')
+        # TRUNCATE (o DELETE sin recorrer filas en SQLite): borrar millones de filas con el ORM tardaría horas
+        tablas = [modelo._meta.db_table for modelo in TABLAS_TIENDA]
+        with transaction.atomic():
+            sql = connection.ops.sql_flush(no_style(), tablas, reset_sequences=True, allow_cascade=False)
+            connection.ops.execute_sql_flush(sql)
+            generados = User.objects.filter(username__startswith=generador.PREFIJO_USUARIO)
+            PerfilUsuario.objects.filter(user__in=generados).delete()
+            generados.delete()
+        self.stdout.write('  Tablas vaciadas')
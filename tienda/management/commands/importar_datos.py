@@ -0,0 +1,66 @@
+# tienda/management/commands/importar_datos.py
+# Importa productos, clientes o proveedores desde un archivo CSV o JSONL.
+# Ejecutar con:
+#   python manage.py importar_datos producto catalogo.csv [--crear-categorias]
+#   python manage.py importar_datos cliente clientes.jsonl --lote 2000
+#   cat proveedores.csv | python manage.py importar_datos proveedor - --formato csv
+#
+# Columnas esperadas (las mismas que los formularios):
+#   producto:  nombre, descripcion, precio_venta, stock, activo, categoria (nombre), proveedor (empresa o nombre)
+#   cliente:   nombre, apellido, email, telefono, direccion   (si el email ya existe se actualiza y se reactiva)
+#   proveedor: nombre, empresa, telefono, email, direccion
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda import importacion
+
+
+class Command(BaseCommand):
+    help = 'Importa productos, clientes o proveedores desde CSV/JSONL en lotes, sin cargar el archivo en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(importacion.IMPORTADORES))
+        parser.add_argument('archivo', help="Ruta del archivo ('-' para la entrada estándar)")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help='Formato del archivo (por defecto se deduce de la extensión)')
+        parser.add_argument('--lote', type=int, default=importacion.LOTE_IMPORTACION,
+                            help='Renglones por INSERT/transacción')
+        parser.add_argument('--crear-categorias', action='store_true',
+                            help='Crear las categorías que no existan (solo productos)')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato']
+        if formato is None:
+            if archivo.endswith('.csv'):
+                formato = 'csv'
+            elif archivo.endswith(('.jsonl', '.ndjson')):
+                formato = 'jsonl'
+            else:
+                raise CommandError('No se pudo deducir el formato; use --formato csv|jsonl')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+
+        def reportar_error(numero, mensaje):
+            self.stderr.write(f'Renglón {numero}: {mensaje}')
+
+        kwargs = {'lote': options['lote'], 'reportar_error': reportar_error}
+        if options['modelo'] == 'producto':
+            kwargs['crear_categorias'] = options['crear_categorias']
+        importador = importacion.IMPORTADORES[options['modelo']](**kwargs)
+
+        inicio = time.perf_counter()
+        try:
+            with importacion.abrir_texto(archivo, stdin=sys.stdin) as entrada:
+                importados, errores = importador.importar(importacion.leer_renglones(entrada, formato))
+        except OSError as exc:
+            raise CommandError(f'No se pudo leer {archivo}: {exc}')
+        segundos = time.perf_counter() - inicio
+
+        estilo = self.style.SUCCESS if not errores else self.style.WARNING
+        self.stdout.write(estilo(
+            f'✓ {importados} registros importados, {errores} renglones con error '
+            f'({segundos:.1f} s, {importados / segundos if segundos else 0:.0f} renglones/s)'
+        ))
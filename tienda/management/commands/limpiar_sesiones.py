@@ -0,0 +1,31 @@
+# tienda/management/commands/limpiar_sesiones.py
+# Borra las sesiones vencidas de django_session por lotes (ver tienda/sesiones.py).
+# Ejecutar periódicamente (cron), p. ej. cada noche:
+#   python manage.py limpiar_sesiones --lote 1000 --pausa 0.1
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda import sesiones
+
+
+class Command(BaseCommand):
+    help = 'Borra las sesiones vencidas en lotes pequeños (sin bloquear la tabla de sesiones)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=sesiones.LOTE_LIMPIEZA, help='Sesiones por DELETE')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes (deja pasar a los logins)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['pausa'] < 0:
+            raise CommandError('--lote debe ser al menos 1 y --pausa no negativa')
+        if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.signed_cookies':
+            self.stdout.write('Las sesiones están en cookies firmadas; no hay nada que limpiar en la base.')
+            return
+
+        def progreso(total):
+            self.stdout.write(f'  {total} sesiones borradas...')
+
+        total = sesiones.borrar_vencidas(lote=options['lote'], pausa=options['pausa'],
+                                         progreso=progreso if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} sesiones vencidas borradas'))
@@ -0,0 +1,102 @@
+# tienda/management/commands/provisionar_usuarios.py
+# Da de alta (o actualiza) al personal desde una plantilla CSV, JSON o JSONL (ver tienda/personal.py).
+# Sustituye a crear_usuarios_con_roles.py para cargas grandes (p. ej. una sucursal nueva).
+# Ejecutar con:
+#   python manage.py provisionar_usuarios sucursal_norte.csv --simular       (solo muestra las diferencias)
+#   python manage.py provisionar_usuarios sucursal_norte.csv --salida temporales.csv
+#
+# Columnas: username, password, rol, departamento, telefono, activo, nombre, apellido, email.
+# Solo username es obligatorio. Los usuarios nuevos sin password reciben una temporal
+# (se escriben en --salida); a los existentes solo se les actualiza el perfil
+# (rol, departamento, telefono, activo) con las columnas que traigan valor, y is_staff
+# cuando cambia su rol (solo 'administrador' entra al admin).
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda import hashing, importacion, personal
+
+
+class Command(BaseCommand):
+    help = 'Alta masiva de usuarios con su perfil desde una plantilla; --simular muestra las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta de la plantilla ('-' para la entrada estándar)")
+        parser.add_argument('--formato', choices=['csv', 'json', 'jsonl'],
+                            help='Formato del archivo (por defecto se deduce de la extensión)')
+        parser.add_argument('--simular', action='store_true', help='No escribir nada: solo listar las diferencias')
+        parser.add_argument('--salida', help='CSV para las contraseñas temporales de los nuevos sin password')
+        parser.add_argument('--procesos', type=int, default=hashing.procesos_por_defecto(),
+                            help='Procesos que calculan hashes (por defecto, uno por núcleo)')
+        parser.add_argument('--lote', type=int, default=personal.LOTE_PROVISION, help='Filas por INSERT/UPDATE')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato']
+        if formato is None:
+            for extension, nombre in (('.csv', 'csv'), ('.json', 'json'), ('.jsonl', 'jsonl'), ('.ndjson', 'jsonl')):
+                if archivo.endswith(extension):
+                    formato = nombre
+            if formato is None:
+                raise CommandError('No se pudo deducir el formato; use --formato csv|json|jsonl')
+        if options['procesos'] < 1 or options['lote'] < 1:
+            raise CommandError('--procesos y --lote deben ser mayores que cero')
+
+        errores = []
+
+        def reportar_error(numero, mensaje):
+            errores.append(numero)
+            self.stderr.write(f'Renglón {numero}: {mensaje}')
+
+        try:
+            with importacion.abrir_texto(archivo, stdin=sys.stdin) as entrada:
+                renglones = personal.leer(importacion.leer_renglones(entrada, formato), reportar_error)
+        except OSError as exc:
+            raise CommandError(f'No se pudo leer {archivo}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'{archivo}: {exc}')
+
+        plan = personal.planear(renglones)
+        self.mostrar(plan)
+        resumen = (f'{len(plan.nuevos)} nuevos, {len(plan.sin_perfil)} perfiles por crear, '
+                   f'{len(plan.cambios)} perfiles con cambios, {plan.sin_cambios} sin cambios, '
+                   f'{len(errores)} renglones con error')
+        if options['simular'] or plan.vacio:
+            self.stdout.write(self.style.SUCCESS(f'✓ {"Simulación" if options["simular"] else "Nada que hacer"}: '
+                                                 f'{resumen}'))
+            return
+        sin_password = [r.username for r in plan.nuevos if not r.password]
+        if sin_password and not options['salida']:
+            raise CommandError(f'{len(sin_password)} usuarios nuevos sin password (p. ej. {sin_password[0]!r}); '
+                               f'use --salida para generarles contraseñas temporales')
+        # Primero el archivo: si no se puede escribir, nadie queda con una contraseña desconocida
+        temporales = personal.asignar_temporales(plan)
+        if temporales:
+            try:
+                hashing.escribir_credenciales(options['salida'], temporales)
+            except OSError as exc:
+                raise CommandError(f'No se pudo escribir {options["salida"]}: {exc}')
+
+        def progreso(hechos, total, segundos):
+            if hechos == total or hechos % (hashing.LOTE_HASH * options['procesos'] * 4) == 0:
+                self.stdout.write(f'  {hechos}/{total} hashes ({hechos / segundos if segundos else 0:.1f}/s)')
+
+        personal.aplicar(plan, procesos=options['procesos'], lote=options['lote'], progreso=progreso)
+        if temporales:
+            self.stdout.write(f'  {len(temporales)} contraseñas temporales en {options["salida"]}')
+        self.stdout.write(self.style.SUCCESS(f'✓ Personal actualizado: {resumen}'))
+
+    def mostrar(self, plan):
+        """Diferencias en formato diff: + alta, ~ cambio de perfil o de is_staff"""
+        for renglon in plan.nuevos:
+            rol = renglon.perfil.get('rol', personal.ROL_POR_DEFECTO)
+            detalle = ', '.join(f'{c}={v}' for c, v in renglon.perfil.items() if c != 'rol')
+            self.stdout.write(self.style.SUCCESS(f'+ {renglon.username} ({rol}{", " + detalle if detalle else ""})'))
+        for _, renglon in plan.sin_perfil:
+            self.stdout.write(self.style.SUCCESS(
+                f'+ {renglon.username}: perfil {renglon.perfil.get("rol", personal.ROL_POR_DEFECTO)}'))
+        for perfil, diferencias in plan.cambios:
+            cambios = '; '.join(f'{c}: {antes!r} → {despues!r}' for c, (antes, despues) in diferencias.items())
+            self.stdout.write(self.style.WARNING(f'~ {perfil.user.username}: {cambios}'))
+        for user in plan.staff:
+            self.stdout.write(self.style.WARNING(f'~ {user.username}: is_staff {not user.is_staff!r} → {user.is_staff!r}'))
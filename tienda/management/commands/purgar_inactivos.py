@@ -0,0 +1,60 @@
+# tienda/management/commands/purgar_inactivos.py
+# Borra de verdad los productos, clientes, proveedores y categorías desactivados hace
+# más de --dias días, en lotes cortos (ver tienda/papelera.py).
+# Ejecutar periódicamente (cron), p. ej. cada noche:
+#   python manage.py purgar_inactivos --dias 30 --lote 200 --pausa 0.1
+#   python manage.py purgar_inactivos --simular          (solo cuenta lo que se borraría)
+#   python manage.py purgar_inactivos --modelos producto
+#
+# Borrar un producto también borra su índice de búsqueda, su libro de inventario y sus
+# snapshots, y deja en NULL el producto de los renglones de venta (on_delete del modelo);
+# borrar un cliente deja sus ventas sin cliente.
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tienda import papelera
+
+MODELOS = {modelo._meta.model_name: modelo for modelo in papelera.MODELOS}
+
+
+class Command(BaseCommand):
+    help = 'Purga en lotes pequeños los registros desactivados (eliminación lógica) hace más de N días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30,
+                            help='Días desde el último cambio de un registro inactivo para purgarlo')
+        parser.add_argument('--lote', type=int, default=papelera.LOTE_PURGA, help='Registros por DELETE')
+        parser.add_argument('--pausa', type=float, default=papelera.PAUSA_PURGA,
+                            help='Segundos de espera entre lotes')
+        parser.add_argument('--modelos', nargs='+', choices=list(MODELOS), default=list(MODELOS),
+                            help='Tablas a purgar (siempre en el orden producto, cliente, proveedor, categoria)')
+        parser.add_argument('--simular', action='store_true', help='Solo contar lo que se purgaría')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1 or options['pausa'] < 0:
+            raise CommandError('--dias y --pausa no pueden ser negativos y --lote debe ser al menos 1')
+        antes = timezone.now() - datetime.timedelta(days=options['dias'])
+        total = 0
+        for nombre, modelo in MODELOS.items():
+            if nombre not in options['modelos']:
+                continue
+            if options['simular']:
+                cuantos = papelera.purgables(modelo, antes).count()
+                self.stdout.write(f'  {nombre}: {cuantos} por purgar')
+                total += cuantos
+                continue
+
+            def progreso(borrados, nombre=nombre):
+                self.stdout.write(f'  {nombre}: {borrados} borrados...')
+
+            borrados = papelera.purgar(modelo, antes, lote=options['lote'], pausa=options['pausa'],
+                                       progreso=progreso if options['verbosity'] > 1 else None)
+            self.stdout.write(f'  {nombre}: {borrados} borrados')
+            total += borrados
+
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} registros inactivos por purgar (simulación)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} registros inactivos purgados'))
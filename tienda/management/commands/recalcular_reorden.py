@@ -0,0 +1,20 @@
+# tienda/management/commands/recalcular_reorden.py
+# Recalcula la bandera requiere_reorden de todo el catálogo.
+# Solo hace falta si el stock o los umbrales se cambiaron por fuera de la aplicación (SQL directo).
+# Ejecutar con: python manage.py recalcular_reorden
+from django.core.management.base import BaseCommand
+
+from tienda import reorden
+from tienda.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Recalcula qué productos requieren reorden (stock <= stock mínimo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=reorden.LOTE_REORDEN, help='Productos por UPDATE')
+
+    def handle(self, *args, **options):
+        cambiados = reorden.actualizar_todo(lote=options['lote'])
+        marcados = Producto.objects.filter(**reorden.FILTRO_REORDEN).count()
+        self.stdout.write(self.style.SUCCESS(f'✓ {cambiados} productos corregidos, {marcados} requieren reorden'))
@@ -0,0 +1,56 @@
+# tienda/management/commands/reconstruir_ventas_diarias.py
+# Regenera el resumen diario de ventas (VentaDiaria) a partir de la tabla Venta.
+# Ejecutar con: python manage.py reconstruir_ventas_diarias [--desde 2025-01-01] [--hasta 2025-12-31]
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from tienda import resumenes
+from tienda.models import Venta
+
+
+def _fecha(texto):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {texto!r} (use AAAA-MM-DD)')
+
+
+def _primero_del_mes_siguiente(fecha):
+    return datetime.date(fecha.year + (fecha.month == 12), fecha.month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de ventas (backfill) mes por mes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='Primer día a reconstruir (por defecto, la primera venta)')
+        parser.add_argument('--hasta', type=_fecha, help='Último día a reconstruir, inclusive (por defecto, hoy)')
+        parser.add_argument('--lote', type=int, default=resumenes.LOTE_RECONSTRUCCION,
+                            help='Filas de resumen por INSERT')
+
+    def handle(self, *args, **options):
+        desde, hasta = options['desde'], options['hasta']
+        if desde is None or hasta is None:
+            extremos = Venta.objects.aggregate(primera=Min('fecha_venta'), ultima=Max('fecha_venta'))
+            if extremos['primera'] is None:
+                self.stdout.write('No hay ventas registradas; nada que reconstruir.')
+                return
+            desde = desde or timezone.localdate(extremos['primera'])
+            hasta = hasta or max(timezone.localdate(extremos['ultima']), timezone.localdate())
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        # Un mes por transacción: bloqueos cortos y progreso visible en historiales largos
+        total = 0
+        inicio = desde
+        fin_total = hasta + datetime.timedelta(days=1)
+        while inicio < fin_total:
+            fin = min(_primero_del_mes_siguiente(inicio), fin_total)
+            creadas = resumenes.reconstruir(inicio, fin, lote=options['lote'])
+            total += creadas
+            self.stdout.write(f'  {inicio:%Y-%m}: {creadas} grupos')
+            inicio = fin
+        self.stdout.write(self.style.SUCCESS(f'✓ Resumen diario reconstruido ({total} filas)'))
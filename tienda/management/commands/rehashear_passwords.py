@@ -0,0 +1,119 @@
+# tienda/management/commands/rehashear_passwords.py
+# Cambia contraseñas en masa con el hash calculado en paralelo (ver tienda/hashing.py).
+# Versión masiva de actualizar_passwords.py (que hace un set_password() + save() por usuario, en serie).
+# Ejecutar con:
+#   python manage.py rehashear_passwords --archivo credenciales.csv     (columnas username,password)
+#   python manage.py rehashear_passwords --politica                      (solo cuenta los hashes viejos)
+#   python manage.py rehashear_passwords --politica --restablecer --salida temporales.csv
+#
+# --politica elige a los usuarios cuyo hash no es del hasher preferido o tiene menos
+# iteraciones que las actuales. Sin la contraseña en claro no se pueden rehashear:
+# Django los actualiza solo en su próximo login. --restablecer les asigna contraseñas
+# temporales (p. ej. cuentas inactivas tras un cambio de política) y las escribe en
+# --salida, legible solo por el dueño. Cambiar la contraseña cierra las sesiones abiertas.
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tienda import hashing, importacion
+
+LOTE_ACTUALIZACION = 500  # Usuarios por UPDATE
+
+
+class Command(BaseCommand):
+    help = 'Establece o restablece contraseñas en masa: hash en paralelo y bulk_update por lotes'
+
+    def add_arguments(self, parser):
+        origen = parser.add_mutually_exclusive_group(required=True)
+        origen.add_argument('--archivo', help="CSV/JSONL con username y password ('-' para la entrada estándar)")
+        origen.add_argument('--politica', action='store_true',
+                            help='Usuarios con hash de un hasher anterior o con menos iteraciones')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Formato de --archivo (por la extensión)')
+        parser.add_argument('--restablecer', action='store_true',
+                            help='Con --politica: asignar contraseñas temporales (si no, solo se cuentan)')
+        parser.add_argument('--salida', help='Con --restablecer: CSV donde se escriben las contraseñas temporales')
+        parser.add_argument('--procesos', type=int, default=hashing.procesos_por_defecto(),
+                            help='Procesos que calculan hashes (por defecto, uno por núcleo)')
+        parser.add_argument('--lote', type=int, default=LOTE_ACTUALIZACION, help='Usuarios por UPDATE')
+
+    def handle(self, *args, **options):
+        if options['procesos'] < 1 or options['lote'] < 1:
+            raise CommandError('--procesos y --lote deben ser mayores que cero')
+        if options['restablecer'] and not options['politica']:
+            raise CommandError('--restablecer solo se usa con --politica')
+        if options['restablecer'] and not options['salida']:
+            raise CommandError('--restablecer necesita --salida para entregar las contraseñas temporales')
+
+        if options['archivo']:
+            credenciales = self.leer_credenciales(options['archivo'], options['formato'])
+            usuarios = User.objects.in_bulk(credenciales, field_name='username')
+            for username in credenciales.keys() - usuarios.keys():
+                self.stderr.write(self.style.WARNING(f'  ⚠ El usuario {username!r} no existe'))
+            usuarios = list(usuarios.values())
+            passwords = [credenciales[u.username] for u in usuarios]
+        else:
+            usuarios = [u for u in User.objects.only('pk', 'username', 'password').iterator(chunk_size=2000)
+                        if hashing.hash_desactualizado(u.password)]
+            if not options['restablecer']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {len(usuarios)} usuarios con hash desactualizado (se actualizan en su próximo login; '
+                    f'--restablecer les asigna contraseñas temporales)'))
+                return
+            passwords = [hashing.password_temporal() for _ in usuarios]
+
+        if not usuarios:
+            self.stdout.write(self.style.SUCCESS('✓ No hay contraseñas que cambiar'))
+            return
+
+        def progreso(hechos, total, segundos):
+            if hechos == total or hechos % (hashing.LOTE_HASH * options['procesos'] * 4) == 0:
+                self.stdout.write(f'  {hechos}/{total} hashes ({hechos / segundos if segundos else 0:.1f}/s)')
+
+        self.stdout.write(f'Calculando {len(usuarios)} hashes con {options["procesos"]} procesos...')
+        hashes = hashing.hashear(passwords, procesos=options['procesos'], progreso=progreso)
+        for usuario, encoded in zip(usuarios, hashes):
+            usuario.password = encoded
+
+        # Primero el archivo: si no se puede escribir, nadie queda con una contraseña desconocida
+        if options['salida']:
+            self.escribir_temporales(options['salida'], usuarios, passwords)
+        with transaction.atomic():
+            User.objects.bulk_update(usuarios, ['password'], batch_size=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(usuarios)} contraseñas actualizadas'))
+        if options['salida']:
+            self.stdout.write(f'  Contraseñas temporales en {options["salida"]}')
+
+    def leer_credenciales(self, archivo, formato):
+        """{username: password}; los renglones incompletos se reportan y se omiten"""
+        if formato is None:
+            if archivo.endswith('.csv'):
+                formato = 'csv'
+            elif archivo.endswith(('.jsonl', '.ndjson')):
+                formato = 'jsonl'
+            else:
+                raise CommandError('No se pudo deducir el formato; use --formato csv|jsonl')
+        credenciales = {}
+        try:
+            with importacion.abrir_texto(archivo, stdin=sys.stdin) as entrada:
+                for numero, datos in importacion.leer_renglones(entrada, formato):
+                    if isinstance(datos, Exception) or not isinstance(datos, dict):
+                        self.stderr.write(f'Renglón {numero}: no es un objeto válido')
+                        continue
+                    username = str(datos.get('username') or '').strip()
+                    password = str(datos.get('password') or '')
+                    if not username or not password:
+                        self.stderr.write(f'Renglón {numero}: faltan username o password')
+                        continue
+                    credenciales[username] = password  # Si se repite, gana el último renglón
+        except OSError as exc:
+            raise CommandError(f'No se pudo leer {archivo}: {exc}')
+        return credenciales
+
+    def escribir_temporales(self, ruta, usuarios, passwords):
+        try:
+            hashing.escribir_credenciales(ruta, ((u.username, p) for u, p in zip(usuarios, passwords)))
+        except OSError as exc:
+            raise CommandError(f'No se pudo escribir {ruta}: {exc}')
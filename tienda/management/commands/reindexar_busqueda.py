@@ -0,0 +1,21 @@
+# tienda/management/commands/reindexar_busqueda.py
+# Reconstruye el índice de trigramas de la búsqueda de productos.
+# Ejecutar con: python manage.py reindexar_busqueda [--lote 500]
+from django.core.management.base import BaseCommand
+
+from tienda import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda (trigramas) de todos los productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=busqueda.LOTE_INDEXADO,
+                            help='Productos procesados por transacción')
+
+    def handle(self, *args, **options):
+        def progreso(n):
+            self.stdout.write(f'  {n} productos indexados...')
+
+        total = busqueda.reindexar_todo(lote=options['lote'], progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f'✓ Índice de búsqueda reconstruido ({total} productos)'))
@@ -0,0 +1,17 @@
+# tienda/management/commands/snapshot_inventario.py
+# Guarda una foto del stock de todos los productos (SnapshotInventario).
+# Programar periódicamente (p. ej. cron diario): python manage.py snapshot_inventario
+from django.core.management.base import BaseCommand
+
+from tienda import inventario
+
+
+class Command(BaseCommand):
+    help = 'Guarda el stock actual de cada producto para consultar el stock a una fecha sin recorrer el libro'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=inventario.LOTE_SNAPSHOT, help='Productos por INSERT')
+
+    def handle(self, *args, **options):
+        total = inventario.tomar_snapshot(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Snapshot de inventario guardado ({total} productos)'))
@@ -0,0 +1,261 @@
+# tienda/metricas.py
+# Métricas por vista: latencia total, consultas SQL, tiempo en la base y en plantillas.
+#
+# - MetricasMiddleware mide cada petición y la suma a histogramas en memoria del
+#   proceso, agrupados por el nombre de la vista resuelta (producto_lista, home...).
+#   Observar es una búsqueda binaria y cuatro sumas bajo un lock: no hay E/S ni caché.
+# - Las consultas se cuentan con connection.execute_wrapper (funciona con DEBUG=False)
+#   y las plantillas con el backend PlantillasMedidas (ver TEMPLATES en settings.py).
+# - /metrics/ las expone en formato de texto de Prometheus, para usuarios staff o con
+#   el token de settings.TIENDA_METRICAS_TOKEN (Authorization: Bearer <token>).
+# - Con settings.TIENDA_SERVER_TIMING = True cada respuesta lleva el encabezado
+#   Server-Timing y el navegador muestra el desglose en la pestaña Network.
+#
+# Los middlewares funcionan igual bajo WSGI y ASGI (son sync y async). Bajo ASGI las
+# consultas no corren en el hilo del event loop sino en el hilo síncrono de la petición
+# (sync_to_async): las envolturas SQL se instalan allí (ver en_hilo_sincrono()).
+#
+# Los histogramas son por proceso: con varios workers cada uno cuenta sus propias
+# peticiones (Prometheus los suma si se raspa cada worker). En las respuestas en
+# streaming (exportaciones) solo se mide hasta que la vista devuelve la respuesta.
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+# Límites de las cubetas (segundos o número de consultas); el último es +Inf implícito
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# nombre -> (descripción, cubetas)
+METRICAS = {
+    'tienda_peticion_segundos': ('Duración total de la petición', CUBETAS_SEGUNDOS),
+    'tienda_peticion_sql_segundos': ('Tiempo en consultas SQL por petición', CUBETAS_SEGUNDOS),
+    'tienda_peticion_consultas': ('Consultas SQL por petición', CUBETAS_CONSULTAS),
+    'tienda_peticion_plantillas_segundos': ('Tiempo renderizando plantillas por petición', CUBETAS_SEGUNDOS),
+}
+VISTAS_EXCLUIDAS = {'metricas'}  # Raspar /metrics/ no cuenta como tráfico
+SIN_RUTA = '<sin_ruta>'  # 404 y peticiones que no llegaron a resolverse
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus (cubetas fijas, suma y cuenta)"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)  # La última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1  # le="x" incluye x
+        self.suma += valor
+        self.cuenta += 1
+
+
+class Registro:
+    """Histogramas por (métrica, vista), seguros entre hilos"""
+
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def observar(self, vista, valores):
+        """Suma {métrica: valor} de una petición en una sola toma del lock"""
+        with self._lock:
+            for metrica, valor in valores.items():
+                clave = (metrica, vista)
+                histograma = self._histogramas.get(clave)
+                if histograma is None:
+                    histograma = self._histogramas[clave] = Histograma(METRICAS[metrica][1])
+                histograma.observar(valor)
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def texto_prometheus(self):
+        """Formato de exposición de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            copia = {clave: (list(h.cubetas), h.suma, h.cuenta) for clave, h in self._histogramas.items()}
+        lineas = []
+        for metrica, (descripcion, limites) in METRICAS.items():
+            lineas.append(f'# HELP {metrica} {descripcion}')
+            lineas.append(f'# TYPE {metrica} histogram')
+            for (nombre, vista), (cubetas, suma, cuenta) in sorted(copia.items()):
+                if nombre != metrica:
+                    continue
+                etiqueta = f'vista="{_escapar(vista)}"'
+                acumulado = 0
+                for limite, n in zip((*limites, '+Inf'), cubetas):
+                    acumulado += n
+                    lineas.append(f'{metrica}_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+                lineas.append(f'{metrica}_sum{{{etiqueta}}} {suma:.6f}')
+                lineas.append(f'{metrica}_count{{{etiqueta}}} {cuenta}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
+
+
+# ============ MEDICIÓN DE UNA PETICIÓN ============
+class Medicion:
+    """Acumuladores de la petición en curso (los llenan el wrapper SQL y las plantillas)"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.plantillas = 0.0
+        self._lock = threading.Lock()  # Las vistas async consultan desde varios hilos a la vez
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: cuenta y cronometra cada consulta
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.consultas += 1
+                self.sql += time.perf_counter() - inicio
+
+
+_medicion = contextvars.ContextVar('tienda_medicion', default=None)
+
+
+@contextmanager
+def en_este_hilo():
+    """
+    Suma a la petición en curso las consultas hechas en este hilo. Lo usan el
+    middleware (en el hilo de la petición) y los hilos del pool de las vistas async
+    (tienda/asincrono.py); la medición llega por la ContextVar.
+    """
+    medicion = _medicion.get()
+    with ExitStack() as pila:
+        if medicion is not None:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion))
+        yield
+
+
+@asynccontextmanager
+async def en_hilo_sincrono(administrador):
+    """
+    Entra y sale del context manager `administrador` (p. ej. en_este_hilo()) en el hilo
+    donde corre el código síncrono de la petición. Bajo ASGI, sync_to_async con
+    thread_sensitive usa un mismo hilo para toda la petición: el de las vistas
+    síncronas, las plantillas y los middlewares que no son async.
+    """
+    await sync_to_async(administrador.__enter__)()
+    try:
+        yield
+    finally:
+        await sync_to_async(administrador.__exit__)(None, None, None)
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend DjangoTemplates que suma el tiempo de render a la petición en curso"""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name).template, self)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición (ver el encabezado del módulo). Va primero en MIDDLEWARE
+    para que la latencia incluya a los demás middlewares.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'TIENDA_SERVER_TIMING', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with en_este_hilo():
+                respuesta = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._registrar(request, respuesta, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            async with en_hilo_sincrono(en_este_hilo()):
+                respuesta = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._registrar(request, respuesta, medicion, time.perf_counter() - inicio)
+
+    def _registrar(self, request, respuesta, medicion, total):
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else SIN_RUTA
+        if vista not in VISTAS_EXCLUIDAS:
+            registro.observar(vista, {
+                'tienda_peticion_segundos': total,
+                'tienda_peticion_sql_segundos': medicion.sql,
+                'tienda_peticion_consultas': medicion.consultas,
+                'tienda_peticion_plantillas_segundos': medicion.plantillas,
+            })
+        if self.server_timing:
+            respuesta['Server-Timing'] = (
+                f'sql;dur={medicion.sql * 1000:.1f};desc="{medicion.consultas} consultas", '
+                f'tpl;dur={medicion.plantillas * 1000:.1f};desc="plantillas", '
+                f'total;dur={total * 1000:.1f}'
+            )
+        return respuesta
+
+
+# ============ ENDPOINT /metrics/ ============
+def _autorizado(request):
+    token = getattr(settings, 'TIENDA_METRICAS_TOKEN', '')
+    encabezado = request.headers.get('Authorization', '')
+    if token and encabezado.startswith('Bearer '):
+        return hmac.compare_digest(encabezado[7:].encode(), token.encode())
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def vista(request):
+    """Métricas en formato Prometheus (staff o token)"""
+    if not _autorizado(request):
+        respuesta = HttpResponse('No autorizado\n', status=401, content_type='text/plain; charset=utf-8')
+        respuesta['WWW-Authenticate'] = 'Bearer'
+        return respuesta
+    return HttpResponse(registro.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
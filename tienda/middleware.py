@@ -0,0 +1,29 @@
+# tienda/middleware.py
+# Middleware propios de la tienda (se registran en MIDDLEWARE en settings.py).
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from . import roles
+
+
+class RolUsuarioMiddleware:
+    """
+    Deja en request.rol el Rol del usuario (ver tienda/roles.py).
+
+    Debe ir después de AuthenticationMiddleware. Es perezoso: si la vista no
+    consulta el rol no se resuelve, y si lo consulta varias veces (decorador,
+    plantilla) se resuelve una sola vez. Sync y async: no consulta nada al pasar,
+    así que bajo ASGI no obliga a cambiar de hilo (el rol se resuelve donde se lea,
+    que en una vista async debe ser dentro de sync_to_async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.rol = SimpleLazyObject(lambda: roles.rol_de(request.user))
+        return self.get_response(request)  # Bajo ASGI, la corrutina que espera quien llamó
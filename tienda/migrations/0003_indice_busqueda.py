@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0002_remove_proveedor_contacto_proveedor_direccion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tienda.producto')),
+            ],
+            options={
+                'verbose_name': 'Entrada del índice de búsqueda',
+                'verbose_name_plural': 'Índice de búsqueda',
+                'indexes': [models.Index(fields=['trigrama', 'producto', 'peso'], name='busqueda_trigrama_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0004_venta_diaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetalleVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('producto', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='detalles_venta', to='tienda.producto')),
+                ('venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='tienda.venta')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Venta',
+                'verbose_name_plural': 'Detalles de Venta',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0005_detalle_venta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada (recepción)'), ('venta', 'Venta'), ('ajuste', 'Ajuste'), ('devolucion', 'Devolución')], max_length=20)),
+                ('cantidad', models.IntegerField()),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nota', models.CharField(blank=True, max_length=200)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='tienda.producto')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('venta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='tienda.venta')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Inventario',
+                'verbose_name_plural': 'Movimientos de Inventario',
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='movimiento_producto_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tienda.producto')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Inventario',
+                'verbose_name_plural': 'Snapshots de Inventario',
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='snapshot_producto_fecha_unico')],
+            },
+        ),
+    ]
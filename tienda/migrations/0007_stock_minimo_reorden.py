@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+def calcular_reorden(apps, schema_editor):
+    # Bandera inicial para los productos existentes (misma regla que tienda/reorden.py)
+    Producto = apps.get_model('tienda', 'Producto')
+    Categoria = apps.get_model('tienda', 'Categoria')
+    umbral = Coalesce(
+        'stock_minimo',
+        Subquery(Categoria.objects.filter(pk=OuterRef('categoria_id')).values('stock_minimo')[:1]),
+        output_field=IntegerField(),
+    )
+    Producto.objects.update(requiere_reorden=Case(When(stock__lte=umbral, then=Value(True)), default=Value(False)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0006_movimientos_inventario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='stock_minimo',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='requiere_reorden',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='stock_minimo',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['requiere_reorden', 'activo', 'proveedor'], name='producto_reorden_idx'),
+        ),
+        migrations.RunPython(calcular_reorden, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0007_stock_minimo_reorden'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_reorden_idx',
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['nombre'], name='categoria_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['apellido', 'nombre'], name='cliente_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['requiere_reorden', 'activo', 'proveedor', 'stock'], name='producto_reorden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='producto_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'fecha_creacion', 'id'], name='producto_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_venta'], name='venta_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['vendido_por', 'fecha_venta'], name='venta_vendedor_fecha_idx'),
+        ),
+    ]
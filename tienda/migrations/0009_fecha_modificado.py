@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0008_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0009_fecha_modificado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='activo',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='activo',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='activo',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['activo', 'nombre'], name='categoria_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', 'apellido', 'nombre'], name='cliente_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['activo'], name='proveedor_activo_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0010_eliminacion_logica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionTabla',
+            fields=[
+                ('tabla', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modificado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Versión de tabla',
+                'verbose_name_plural': 'Versiones de tablas',
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce
+
+
+def unificar_grupos(apps, schema_editor):
+    # Claves de los grupos existentes y una sola fila por grupo (los duplicados se suman)
+    VentaDiaria = apps.get_model('tienda', 'VentaDiaria')
+    VentaDiaria.objects.update(vendedor_clave=Coalesce('vendedor_id', 0), cliente_clave=Coalesce('cliente_id', 0))
+    repetidos = (VentaDiaria.objects.values('fecha', 'vendedor_clave', 'cliente_clave')
+                 .annotate(filas=Count('id'), primera=Min('id'), num=Sum('num_ventas'), suma=Sum('total'),
+                           minimo_=Min('minimo'), maximo_=Max('maximo'))
+                 .filter(filas__gt=1).order_by())
+    for grupo in repetidos:
+        filas = VentaDiaria.objects.filter(fecha=grupo['fecha'], vendedor_clave=grupo['vendedor_clave'],
+                                           cliente_clave=grupo['cliente_clave'])
+        filas.filter(pk=grupo['primera']).update(num_ventas=grupo['num'], total=grupo['suma'],
+                                                 minimo=grupo['minimo_'], maximo=grupo['maximo_'])
+        filas.exclude(pk=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0011_versiones_tablas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventadiaria',
+            name='cliente_clave',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ventadiaria',
+            name='vendedor_clave',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(unificar_grupos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ventadiaria',
+            constraint=models.UniqueConstraint(fields=('fecha', 'vendedor_clave', 'cliente_clave'), name='ventadiaria_grupo_unico'),
+        ),
+    ]
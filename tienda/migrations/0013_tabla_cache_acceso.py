@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:30
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def crear_tablas_cache(apps, schema_editor):
+    # Las cachés DatabaseCache de settings (p. ej. 'acceso', contadores de login):
+    # sin su tabla cada intento de login fallaría. Las que ya existen no se tocan.
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0012_ventadiaria_grupo_unico'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tablas_cache, migrations.RunPython.noop),
+    ]
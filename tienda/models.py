@@ -1,8 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
+class ActivosManager(models.Manager):
+    # Manager por defecto de los modelos con eliminación lógica (ver tienda/papelera.py):
+    # oculta las filas desactivadas en vistas, formularios, API y exportaciones.
+    # Para ver también las inactivas (admin, mantenimiento) se usa Modelo._base_manager.
+    # __in=[True] y no activo=True: así el WHERE usa el índice que empieza por activo (ver reorden.py).
+    def get_queryset(self):
+        return super().get_queryset().filter(activo__in=[True])
+
+
 class PerfilUsuario(models.Model):
     ROLES = (
         ('vendedor', 'Vendedor'),
@@ -57,6 +67,11 @@ class Categoria(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    modificado = models.DateTimeField(auto_now=True) # Último cambio; invalida su fila cacheada y las de sus productos.
+    stock_minimo = models.PositiveIntegerField(default=10) # Umbral de reorden de sus productos (si el producto no define uno propio).
+    activo = models.BooleanField(default=True) # Eliminación lógica (al desactivarla se desactivan sus productos).
+
+    objects = ActivosManager() # Solo las activas
 
     def __str__(self):
         return self.nombre
@@ -65,6 +80,10 @@ class Categoria(models.Model):
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre'], name='categoria_nombre_idx'),  # Orden por defecto sin ordenar en memoria
+            models.Index(fields=['activo', 'nombre'], name='categoria_activo_idx'),  # Lo mismo, solo las activas
+        ]
 
 class Proveedor(models.Model):
     # Tu formulario usa 'nombre' para 'Nombre del Contacto'
@@ -80,6 +99,10 @@ class Proveedor(models.Model):
 
     email = models.EmailField(max_length=191, blank=True, null=True) # Label: 'Correo Electrónico'
     direccion = models.TextField(blank=True, null=True) # Label: 'Dirección'
+    modificado = models.DateTimeField(auto_now=True) # Fecha del último cambio (llave de la fila cacheada en la lista).
+    activo = models.BooleanField(default=True) # Eliminación lógica.
+
+    objects = ActivosManager() # Solo los activos
 
     # NOTA: Tu formulario (ProveedorForm) no incluye el campo 'contacto'
     # que tenías antes en el modelo. Si ya no lo necesitas, está bien.
@@ -92,6 +115,11 @@ class Proveedor(models.Model):
             return f"{self.nombre} ({self.empresa})"
         return self.nombre
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['activo'], name='proveedor_activo_idx'),  # Lista de proveedores activos
+        ]
+
 # (tus otros modelos están abajo)
 
 class Producto(models.Model):
@@ -104,10 +132,38 @@ class Producto(models.Model):
     creado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='productos_creados') # Usuario que creó el producto (opcional, si se borra el usuario, se establece a NULL).
     fecha_creacion = models.DateTimeField(auto_now_add=True) # Fecha y hora de creación (se establece automáticamente al crear).
     activo = models.BooleanField(default=True) # Campo booleano para eliminación lógica (determina si está activo o desactivado).
+    stock_minimo = models.PositiveIntegerField(null=True, blank=True) # Umbral de reorden propio (vacío: se usa el de la categoría).
+    requiere_reorden = models.BooleanField(default=False, editable=False) # stock <= umbral; lo mantiene tienda/reorden.py, no se edita a mano.
+    modificado = models.DateTimeField(auto_now=True) # Último cambio (también los UPDATE de stock y reorden); llave de caché de su fila en la lista.
+
+    objects = ActivosManager() # Solo los activos (los desactivados siguen en _base_manager)
 
     def __str__(self):
         return self.nombre # Representación en string del objeto.
 
+    @property
+    def umbral_reorden(self):
+        # Umbral efectivo: el propio o el de la categoría
+        return self.stock_minimo if self.stock_minimo is not None else self.categoria.stock_minimo
+
+    @property
+    def faltante_reorden(self):
+        # Unidades que faltan para volver al umbral
+        return max(self.umbral_reorden - self.stock, 0)
+
+    class Meta:
+        indexes = [
+            # Lista de reorden: solo lee la parte del índice con requiere_reorden = TRUE.
+            # MySQL no tiene índices parciales (WHERE stock <= umbral); la bandera
+            # precalculada como primera columna cumple la misma función. Con stock al
+            # final, el orden de la lista (proveedor, stock) sale del índice.
+            models.Index(fields=['requiere_reorden', 'activo', 'proveedor', 'stock'], name='producto_reorden_idx'),
+            # Lista de productos y "recientes" del dashboard: cursor (fecha_creacion, id) en ambos sentidos
+            models.Index(fields=['fecha_creacion', 'id'], name='producto_creacion_idx'),
+            # Lo mismo restringido a productos activos (catálogo de venta)
+            models.Index(fields=['activo', 'fecha_creacion', 'id'], name='producto_activo_idx'),
+        ]
+
 class Cliente(models.Model):
     nombre = models.CharField(max_length=100)  # Nombre del cliente
     apellido = models.CharField(max_length=100)  # Apellido del cliente
@@ -115,6 +171,10 @@ class Cliente(models.Model):
     telefono = models.CharField(max_length=15)  # Teléfono del cliente
     direccion = models.TextField()  # Dirección de entrega
     fecha_registro = models.DateTimeField(auto_now_add=True)  # Fecha de registro automática
+    modificado = models.DateTimeField(auto_now=True)  # Último cambio; forma parte de la llave de caché de su fila en la lista
+    activo = models.BooleanField(default=True)  # Eliminación lógica (sus ventas lo siguen referenciando)
+    
+    objects = ActivosManager()  # Solo los activos
     
     def __str__(self):
         return f"{self.nombre} {self.apellido}"  # Muestra nombre completo
@@ -128,6 +188,10 @@ class Cliente(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['apellido', 'nombre']  # Ordena por apellido y luego por nombre
+        indexes = [
+            models.Index(fields=['apellido', 'nombre'], name='cliente_nombre_idx'),  # Cubre el orden por defecto
+            models.Index(fields=['activo', 'apellido', 'nombre'], name='cliente_activo_idx'),  # Lo mismo, solo los activos
+        ]
 
 class Venta(models.Model):
     fecha_venta = models.DateTimeField(auto_now_add=True) # Fecha y hora de la venta.
@@ -138,4 +202,168 @@ class Venta(models.Model):
     def __str__(self):
         return f"Venta #{self.id} - Total: {self.total}" # Representación en string con ID y total.
 
+    class Meta:
+        indexes = [
+            # Rangos de fechas (exportación, reconstrucción del resumen diario)
+            models.Index(fields=['fecha_venta'], name='venta_fecha_idx'),
+            # Ventas de un vendedor en un rango de fechas
+            models.Index(fields=['vendido_por', 'fecha_venta'], name='venta_vendedor_fecha_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # El resumen diario (VentaDiaria) se actualiza en la MISMA transacción que la venta:
+        # o se guardan los dos, o ninguno.
+        from .resumenes import registrar_venta, recalcular_grupo
+        nueva = self._state.adding
+        with transaction.atomic():
+            anterior = None
+            if not nueva:
+                # Grupo (fecha, vendedor, cliente) antes del cambio, por si la venta se mueve de grupo
+                anterior = Venta.objects.filter(pk=self.pk).values_list('fecha_venta', 'vendido_por_id', 'cliente_id').first()
+            super().save(*args, **kwargs)
+            if nueva:
+                registrar_venta(self)
+            else:
+                if anterior:
+                    recalcular_grupo(timezone.localdate(anterior[0]), anterior[1], anterior[2])
+                recalcular_grupo(timezone.localdate(self.fecha_venta), self.vendido_por_id, self.cliente_id)
+
+    def delete(self, *args, **kwargs):
+        from .resumenes import recalcular_grupo
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            recalcular_grupo(timezone.localdate(self.fecha_venta), self.vendido_por_id, self.cliente_id)
+        return resultado
+
+
+class DetalleVenta(models.Model):
+    # Renglón de una venta: qué producto, cuántas unidades y a qué precio (ver tienda/ventas.py).
+    venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='detalles') # Venta a la que pertenece.
+    producto = models.ForeignKey(Producto, on_delete=models.SET_NULL, null=True, related_name='detalles_venta') # Producto vendido (NULL si luego se borra).
+    cantidad = models.PositiveIntegerField() # Unidades vendidas.
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2) # Precio al momento de la venta (no cambia si luego cambia el producto).
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2) # cantidad x precio_unitario.
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto} (Venta #{self.venta_id})"
+
+    class Meta:
+        verbose_name = "Detalle de Venta"
+        verbose_name_plural = "Detalles de Venta"
+
+
+class VentaDiaria(models.Model):
+    # Resumen de ventas por día x vendedor x cliente (ver tienda/resumenes.py).
+    # Se actualiza en la misma transacción que cada Venta, así los totales del día o
+    # del mes se leen sumando unas pocas filas en lugar de recorrer todo el historial.
+    # La unicidad del grupo va sobre vendedor_clave/cliente_clave (el id, o 0 si no hay):
+    # una restricción UNIQUE sobre las llaves foráneas no evitaría duplicados con NULL
+    # (MySQL no los considera iguales). Borrar un usuario o cliente deja su FK en NULL
+    # pero conserva la clave, así que un grupo puede quedar en dos filas; por eso las
+    # lecturas siempre agregan con SUM/MIN/MAX.
+    fecha = models.DateField() # Día local de la venta.
+    vendedor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+') # Usuario que vendió.
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='+') # Cliente (opcional).
+    vendedor_clave = models.PositiveBigIntegerField(default=0) # vendedor_id al crear el grupo, 0 sin vendedor.
+    cliente_clave = models.PositiveBigIntegerField(default=0) # cliente_id al crear el grupo, 0 sin cliente.
+    num_ventas = models.PositiveIntegerField(default=0) # Cantidad de ventas del grupo.
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0) # Suma de los totales.
+    minimo = models.DecimalField(max_digits=10, decimal_places=2, default=0) # Venta más pequeña.
+    maximo = models.DecimalField(max_digits=10, decimal_places=2, default=0) # Venta más grande.
+
+    def __str__(self):
+        return f"{self.fecha} - {self.num_ventas} ventas - Total: {self.total}"
+
+    class Meta:
+        verbose_name = "Venta Diaria"
+        verbose_name_plural = "Ventas Diarias"
+        indexes = [
+            models.Index(fields=['fecha', 'vendedor', 'cliente'], name='ventadiaria_grupo_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'vendedor_clave', 'cliente_clave'], name='ventadiaria_grupo_unico'),
+        ]
+
+
+
+
+class IndiceBusqueda(models.Model):
+    # Índice invertido de trigramas para la búsqueda de productos (ver tienda/busqueda.py).
+    # Se mantiene automáticamente con señales al guardar productos y categorías.
+    trigrama = models.CharField(max_length=3) # Grupo de 3 caracteres normalizado (sin acentos, minúsculas).
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+') # Producto que contiene el trigrama.
+    peso = models.PositiveSmallIntegerField(default=1) # Suma de pesos de los campos donde aparece (nombre > categoría > descripción).
+
+    class Meta:
+        verbose_name = "Entrada del índice de búsqueda"
+        verbose_name_plural = "Índice de búsqueda"
+        indexes = [
+            # Índice "cubriente": la búsqueda se resuelve leyendo solo este índice
+            models.Index(fields=['trigrama', 'producto', 'peso'], name='busqueda_trigrama_idx'),
+        ]
+
+
+class MovimientoInventario(models.Model):
+    # Libro de movimientos de stock, solo de inserción (ver tienda/inventario.py).
+    # Producto.stock se mueve siempre con UPDATE stock = stock + cantidad en la misma
+    # transacción que el movimiento, así que el libro explica cada cambio de stock.
+    TIPOS = (
+        ('entrada', 'Entrada (recepción)'),
+        ('venta', 'Venta'),
+        ('ajuste', 'Ajuste'),
+        ('devolucion', 'Devolución'),
+    )
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos') # Producto afectado.
+    tipo = models.CharField(max_length=20, choices=TIPOS) # Motivo del movimiento.
+    cantidad = models.IntegerField() # Cambio de stock con signo (+ entra, - sale).
+    fecha = models.DateTimeField(default=timezone.now) # Momento del movimiento.
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+') # Quién lo registró.
+    venta = models.ForeignKey(Venta, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos') # Venta que lo originó (tipo 'venta').
+    nota = models.CharField(max_length=200, blank=True) # Comentario libre (p. ej. número de factura).
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad:+d} - {self.producto_id}"
 
+    class Meta:
+        verbose_name = "Movimiento de Inventario"
+        verbose_name_plural = "Movimientos de Inventario"
+        indexes = [
+            # Historial de un producto y "movimientos después del snapshot"
+            models.Index(fields=['producto', 'fecha'], name='movimiento_producto_idx'),
+        ]
+
+
+class SnapshotInventario(models.Model):
+    # Foto periódica del stock de cada producto (comando snapshot_inventario).
+    # El stock a una fecha es el del último snapshot anterior más los movimientos
+    # posteriores, sin recorrer todo el libro.
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+') # Producto.
+    fecha = models.DateTimeField() # Momento de la foto.
+    stock = models.IntegerField() # Stock en ese momento.
+
+    def __str__(self):
+        return f"{self.producto_id} @ {self.fecha}: {self.stock}"
+
+    class Meta:
+        verbose_name = "Snapshot de Inventario"
+        verbose_name_plural = "Snapshots de Inventario"
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='snapshot_producto_fecha_unico'),
+        ]
+
+
+class VersionTabla(models.Model):
+    # Contador de cambios por tabla para las peticiones condicionales (ver tienda/versiones.py).
+    # Vive en la base y no en la caché local: un comando o cualquier otro worker que
+    # cambie datos invalida los ETag de todos los procesos.
+    tabla = models.CharField(max_length=100, primary_key=True) # label_lower del modelo (p. ej. 'tienda.producto').
+    version = models.PositiveBigIntegerField(default=0) # Se incrementa en cada cambio confirmado.
+    modificado = models.DateTimeField(default=timezone.now) # Hora del último cambio (Last-Modified).
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+
+    class Meta:
+        verbose_name = "Versión de tabla"
+        verbose_name_plural = "Versiones de tablas"
@@ -0,0 +1,150 @@
+# tienda/paginacion.py
+# Paginación por cursor (keyset) para listas grandes.
+# En lugar de OFFSET (que obliga a la base de datos a recorrer todas las filas
+# anteriores), cada página se pide "a partir de" los valores de orden de la
+# última fila vista, así que la página 1 y la página 10.000 cuestan lo mismo.
+import base64
+import json
+
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar o no corresponde al orden pedido."""
+
+
+def codificar_cursor(datos):
+    """Convierte un diccionario en un texto seguro para la URL."""
+    crudo = json.dumps(datos, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Operación inversa de codificar_cursor(); lanza CursorInvalido si el texto está dañado."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)  # base64 necesita longitud múltiplo de 4
+        return json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+    except (ValueError, TypeError) as exc:
+        raise CursorInvalido('Cursor de paginación inválido') from exc
+
+
+def filtro_despues_de(campos, valores, hacia_abajo=False):
+    """
+    Construye (a < x) OR (a = x AND b < y) ... para "filas después del cursor".
+
+    Se añade además a <= x como condición externa: es redundante en lógica
+    pero permite al motor usar un rango sobre el índice del primer campo.
+    """
+    op = 'lt' if hacia_abajo else 'gt'
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        iguales = {c: v for c, v in zip(campos[:i], valores[:i])}
+        condicion |= Q(**iguales, **{f'{campo}__{op}': valores[i]})
+    rango = Q(**{f'{campos[0]}__{op}e': valores[0]})
+    return rango & condicion
+
+
+class PaginaKeyset:
+    """Resultado de una página: filas más los cursores para navegar."""
+
+    def __init__(self, objetos, siguiente=None, anterior=None, por_pagina=25):
+        self.objetos = objetos
+        self.siguiente = siguiente  # Cursor de la página siguiente (None si es la última)
+        self.anterior = anterior  # Cursor de la página anterior (None si es la primera)
+        self.por_pagina = por_pagina
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def tiene_siguiente(self):
+        return self.siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.anterior is not None
+
+
+class PaginadorKeyset:
+    """
+    Pagina un queryset ordenado por una tupla de campos única, p. ej. ('fecha_creacion', 'id').
+
+    El último campo debe ser único (normalmente la PK) para que el orden sea total
+    y ninguna fila se repita o se pierda entre páginas. Conviene que exista un
+    índice compuesto sobre los mismos campos y en el mismo orden.
+    """
+
+    def __init__(self, queryset, campos, descendente=True, por_pagina=25):
+        self.queryset = queryset
+        self.campos = tuple(campos)
+        self.descendente = descendente
+        self.por_pagina = por_pagina
+
+    # ---------- Cursores ----------
+    def _valores_de(self, objeto):
+        """Valores de orden de una fila, serializables a JSON."""
+        valores = []
+        for campo in self.campos:
+            valor = getattr(objeto, campo)
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+        return valores
+
+    def _cursor(self, objeto, direccion):
+        return codificar_cursor({
+            'v': self._valores_de(objeto),
+            'd': direccion,  # 'sig' (hacia adelante) o 'ant' (hacia atrás)
+            'o': 'desc' if self.descendente else 'asc',
+        })
+
+    def _leer_cursor(self, cursor):
+        datos = decodificar_cursor(cursor)
+        if not isinstance(datos, dict) or datos.get('o') != ('desc' if self.descendente else 'asc'):
+            raise CursorInvalido('El cursor pertenece a otro orden')
+        valores = datos.get('v')
+        if not isinstance(valores, list) or len(valores) != len(self.campos) or datos.get('d') not in ('sig', 'ant'):
+            raise CursorInvalido('Cursor de paginación incompleto')
+        modelo = self.queryset.model
+        try:
+            # to_python() convierte el texto ISO de vuelta a datetime/Decimal/etc.
+            valores = [modelo._meta.get_field(campo).to_python(valor) for campo, valor in zip(self.campos, valores)]
+        except Exception as exc:
+            raise CursorInvalido('Cursor con valores inválidos') from exc
+        return valores, datos['d']
+
+    # ---------- Consulta ----------
+    def _filtro_despues_de(self, valores, hacia_abajo):
+        return filtro_despues_de(self.campos, valores, hacia_abajo)
+
+    def _orden(self, hacia_abajo):
+        prefijo = '-' if hacia_abajo else ''
+        return [f'{prefijo}{campo}' for campo in self.campos]
+
+    def pagina(self, cursor=None):
+        """Devuelve la PaginaKeyset que empieza en `cursor` (o la primera si es None)."""
+        direccion = 'sig'
+        qs = self.queryset
+        if cursor:
+            valores, direccion = self._leer_cursor(cursor)
+            # Ir hacia atrás equivale a recorrer el orden invertido desde el cursor
+            hacia_abajo = self.descendente if direccion == 'sig' else not self.descendente
+            qs = qs.filter(self._filtro_despues_de(valores, hacia_abajo))
+        else:
+            hacia_abajo = self.descendente
+
+        # Se pide una fila extra para saber si existe otra página sin hacer COUNT(*)
+        filas = list(qs.order_by(*self._orden(hacia_abajo))[:self.por_pagina + 1])
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+
+        if direccion == 'ant':
+            filas.reverse()
+            siguiente = self._cursor(filas[-1], 'sig') if filas else None
+            anterior = self._cursor(filas[0], 'ant') if filas and hay_mas else None
+        else:
+            siguiente = self._cursor(filas[-1], 'sig') if filas and hay_mas else None
+            anterior = self._cursor(filas[0], 'ant') if filas and cursor else None
+
+        return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior, por_pagina=self.por_pagina)
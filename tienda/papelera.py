@@ -0,0 +1,121 @@
+# tienda/papelera.py
+# Eliminación lógica de productos, categorías, proveedores y clientes.
+#
+# Eliminar desde las vistas o la API solo desactiva la fila (activo = False). El
+# manager por defecto (models.ActivosManager) la oculta de listas, formularios,
+# exportaciones y del dashboard, pero sigue en la base y se reactiva desde el admin.
+# Desactivar una categoría desactiva sus productos con un UPDATE sobre el índice de
+# categoria_id, en lugar del DELETE en cascada (productos, índice de búsqueda, libro
+# de inventario, snapshots) dentro de la petición.
+#
+# El borrado definitivo lo hace purgar() (comando purgar_inactivos) en segundo plano:
+# las filas inactivas desde hace más de N días (según `modificado`) se borran en
+# lotes de pocas filas, cada lote en su propia transacción corta, con una pausa entre
+# lotes para no acaparar los bloqueos ni el disco. Una categoría solo se purga cuando
+# ya no le queda ningún producto, así el DELETE nunca arrastra productos en cascada.
+# Lo que depende de cada lote (libro de inventario, snapshots, índice de búsqueda,
+# renglones y ventas que lo referencian) se borra o se pone en NULL antes, también
+# en lotes acotados: un producto con años de movimientos no vuelve a ser un DELETE
+# en cascada de cientos de miles de filas en una sola transacción.
+import time
+
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import estadisticas, versiones
+from .models import Categoria, Cliente, Producto, Proveedor
+
+# En este orden: los productos se purgan antes que las categorías que los contienen
+MODELOS = (Producto, Cliente, Proveedor, Categoria)
+LOTE_PURGA = 200  # Filas por DELETE o UPDATE, de la tabla purgada y de cada una de sus dependientes
+PAUSA_PURGA = 0.1  # Segundos entre lotes
+
+
+def desactivar(objeto):
+    """Eliminación lógica; las señales ajustan los contadores del dashboard y las versiones"""
+    with transaction.atomic():
+        objeto.activo = False
+        objeto.save(update_fields=['activo', 'modificado'])
+        if isinstance(objeto, Categoria):
+            desactivar_productos(objeto)
+
+
+def desactivar_productos(categoria):
+    """Desactiva con un UPDATE los productos activos de una categoría (ya desactivada)"""
+    desactivados = Producto._base_manager.filter(categoria_id=categoria.pk, activo__in=[True]).update(
+        activo=False, modificado=timezone.now())  # update() no aplica auto_now
+    if desactivados:
+        # update() no envía señales
+        transaction.on_commit(lambda: estadisticas.invalidar_conteo(Producto))
+        versiones.cambiar(Producto)
+    return desactivados
+
+
+def reactivar(objeto):
+    """Deshace desactivar() (los productos de una categoría se reactivan uno por uno)"""
+    objeto.activo = True
+    objeto.save(update_fields=['activo', 'modificado'])
+
+
+def purgables(modelo, antes):
+    """Filas inactivas sin cambios desde `antes` que se pueden borrar"""
+    filas = modelo._base_manager.filter(activo__in=[False], modificado__lt=antes)
+    if modelo is Categoria:
+        filas = filas.filter(~Exists(Producto._base_manager.filter(categoria_id=OuterRef('pk'))))
+    return filas
+
+
+def _vaciar_dependientes(modelo, ids, antes, lote, pausa):
+    """
+    Borra (CASCADE) o pone en NULL (SET_NULL) en lotes de `lote` filas lo que apunta
+    a las filas `ids` de `modelo`, para que su DELETE ya no arrastre nada.
+    """
+    # La subconsulta vuelve a filtrar en cada lote: si una fila se reactiva a mitad
+    # de la purga, lo que le quede ya no se toca
+    siguen = purgables(modelo, antes).filter(pk__in=ids)
+    for relacion in modelo._meta.related_objects:
+        campo, relacionado = relacion.field, relacion.related_model
+        filas = relacionado._base_manager.filter(**{f'{campo.name}__in': siguen})
+        nulo = relacion.on_delete is models.SET_NULL
+        cambios = {campo.name: None}
+        if nulo and any(f.name == 'modificado' for f in relacionado._meta.concrete_fields):
+            cambios['modificado'] = timezone.now()  # update() no aplica auto_now (llave de la fila cacheada)
+        while True:
+            pks = list(filas.order_by('pk').values_list('pk', flat=True)[:lote])
+            if not pks:
+                break
+            with transaction.atomic():
+                bloque = filas.filter(pk__in=pks)
+                if nulo:
+                    bloque.update(**cambios)
+                else:
+                    bloque.delete()
+                versiones.cambiar(relacionado)  # update() y el DELETE en bloque no envían señales
+            if pausa:
+                time.sleep(pausa)
+
+
+def purgar(modelo, antes, lote=LOTE_PURGA, pausa=PAUSA_PURGA, progreso=None):
+    """
+    Borra purgables(modelo, antes) en lotes de `lote` filas por PK; devuelve cuántas
+    borró. progreso(borradas) se llama después de cada lote.
+    """
+    borradas = 0
+    ultimo = 0
+    while True:
+        ids = list(purgables(modelo, antes).filter(pk__gt=ultimo).order_by('pk')
+                   .values_list('pk', flat=True)[:lote])
+        if not ids:
+            break
+        ultimo = ids[-1]
+        _vaciar_dependientes(modelo, ids, antes, lote, pausa)
+        with transaction.atomic():
+            # Se vuelve a filtrar: una fila reactivada entre la lectura y el DELETE se conserva
+            _, por_modelo = purgables(modelo, antes).filter(pk__in=ids).delete()
+        borradas += por_modelo.get(modelo._meta.label, 0)
+        if progreso:
+            progreso(borradas)
+        if pausa:
+            time.sleep(pausa)
+    return borradas
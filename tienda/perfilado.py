@@ -0,0 +1,308 @@
+# tienda/perfilado.py
+# Perfilado por muestreo de peticiones lentas.
+#
+# - Un hilo de fondo toma cada TIENDA_PERFIL_INTERVALO_MS la pila de cada petición
+#   en curso (sys._current_frames(), sin instrumentar el código) y cuenta las pilas
+#   en formato "collapsed" (modulo:funcion;modulo:funcion N), el que leen
+#   flamegraph.pl y speedscope.
+# - Al terminar la petición el perfil se guarda si la petición cayó en la fracción
+#   muestreada (TIENDA_PERFIL_FRACCION) o si tardó más de TIENDA_PERFIL_UMBRAL_MS.
+#   Como el muestreo corre para todas, las lentas se guardan completas aunque no
+#   se supiera de antemano que lo serían. Las demás se descartan.
+# - También se guardan las consultas SQL con su tiempo, agrupadas: la misma SQL con
+#   los mismos parámetros es una consulta duplicada; la misma SQL con distintos
+#   parámetros muchas veces suele ser un N+1. Solo se guarda la SQL con sus %s:
+#   de los parámetros (claves de sesión, hashes de contraseñas, datos de clientes)
+#   se conserva un hash, lo justo para contar variantes y duplicadas.
+# - Los perfiles son archivos JSON en TIENDA_PERFIL_DIR, usado como buffer circular:
+#   solo se conservan los TIENDA_PERFIL_MAX más recientes.
+#
+# Funciona bajo WSGI y ASGI: la petición en curso viaja en una ContextVar y cada hilo
+# que trabaja para ella (el de la petición, el síncrono de ASGI, los del pool de
+# asincrono.en_paralelo) se registra con en_este_hilo(), así sus pilas y su SQL cuentan.
+#
+# Las páginas para superusuarios (views.perfiles_lista / perfil_detalle) leen este directorio.
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from .metricas import en_hilo_sincrono
+
+FRACCION = 0.01  # Peticiones perfiladas al azar
+UMBRAL_MS = 1000  # Toda petición más lenta que esto se guarda (None: ninguna)
+INTERVALO_MS = 10  # Entre muestras de pila
+MAX_PERFILES = 200  # Archivos conservados en el directorio
+MAX_CONSULTAS = 2000  # Consultas guardadas por petición (un N+1 puede hacer miles)
+EXTENSION = '.json'
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'TIENDA_PERFIL_{nombre}', defecto)
+
+
+def directorio():
+    return str(_config('DIR', os.path.join(settings.BASE_DIR, 'perfiles')))
+
+
+# ============ MUESTREO DE PILAS ============
+class _Peticion:
+    """Estado de una petición en curso"""
+
+    def __init__(self, muestreador):
+        self.muestreador = muestreador
+        self.pilas = Counter()
+        self.consultas = []
+        self.inicio = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: guarda cada consulta con su duración
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.consultas) < MAX_CONSULTAS:
+                # hash(): compara parámetros sin escribir sus valores en el perfil
+                self.consultas.append((sql, hash(repr(params)), time.perf_counter() - inicio))
+
+
+class Muestreador:
+    """Hilo de fondo que cuenta las pilas de las peticiones registradas"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._peticiones = {}  # id del hilo -> _Peticion
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def registrar(self, peticion):
+        """Muestrea el hilo actual para `peticion` hasta quitar()"""
+        with self._lock:
+            self._peticiones[threading.get_ident()] = peticion
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name='tienda-perfilador', daemon=True)
+                self._hilo.start()
+
+    def quitar(self):
+        with self._lock:
+            self._peticiones.pop(threading.get_ident(), None)
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            # Bajo el lock: después de quitar() nadie más toca las pilas de esa petición
+            with self._lock:
+                if not self._peticiones:
+                    continue
+                marcos = sys._current_frames()
+                for hilo, peticion in self._peticiones.items():
+                    marco = marcos.get(hilo)
+                    if marco is not None:
+                        peticion.pilas[_pila(marco)] += 1
+                del marcos  # No retener los marcos (y sus variables) hasta la siguiente vuelta
+
+
+_actual = contextvars.ContextVar('tienda_perfil', default=None)
+
+
+@contextmanager
+def en_este_hilo():
+    """
+    Cuenta en el perfil de la petición en curso las pilas y el SQL de este hilo
+    (el de la petición, o uno del pool de una vista async). Sin perfil, no hace nada.
+    """
+    peticion = _actual.get()
+    if peticion is None:
+        yield
+        return
+    peticion.muestreador.registrar(peticion)
+    try:
+        with connections['default'].execute_wrapper(peticion):
+            yield
+    finally:
+        peticion.muestreador.quitar()
+
+
+def _pila(marco):
+    """Pila colapsada desde el middleware hasta el marco actual (raíz primero)"""
+    partes = []
+    while marco is not None:
+        codigo = marco.f_code
+        if codigo is PerfiladorMiddleware.__call__.__code__:
+            break  # Lo que está por encima (servidor, otros middlewares) es igual en todas
+        partes.append(f'{marco.f_globals.get("__name__", "?")}:{codigo.co_name}')
+        marco = marco.f_back
+    return ';'.join(reversed(partes))
+
+
+# ============ ANÁLISIS DE LAS CONSULTAS ============
+def resumen_sql(consultas):
+    """
+    Agrupa las consultas por texto SQL. Cada grupo: sql, veces, ms totales,
+    duplicadas (repeticiones con parámetros idénticos) y variantes de parámetros.
+    """
+    grupos = {}
+    for sql, params, duracion in consultas:
+        grupo = grupos.setdefault(sql, {'sql': sql, 'veces': 0, 'ms': 0.0, 'parametros': Counter()})
+        grupo['veces'] += 1
+        grupo['ms'] += duracion * 1000
+        grupo['parametros'][params] += 1
+    resumen = []
+    for grupo in grupos.values():
+        parametros = grupo.pop('parametros')
+        grupo['ms'] = round(grupo['ms'], 2)
+        grupo['variantes'] = len(parametros)
+        grupo['duplicadas'] = grupo['veces'] - len(parametros)
+        resumen.append(grupo)
+    resumen.sort(key=lambda g: g['ms'], reverse=True)
+    return resumen
+
+
+# ============ ALMACENAMIENTO (BUFFER CIRCULAR) ============
+def guardar(datos):
+    """Escribe un perfil y borra los más antiguos que excedan MAX_PERFILES"""
+    carpeta = directorio()
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = f'{time.time_ns()}-{os.getpid()}-{threading.get_ident()}'
+    temporal = os.path.join(carpeta, f'.{nombre}.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False)
+    os.replace(temporal, os.path.join(carpeta, nombre + EXTENSION))  # Los lectores nunca ven un archivo a medias
+
+    archivos = sorted(n for n in os.listdir(carpeta) if n.endswith(EXTENSION))
+    for viejo in archivos[:-_config('MAX', MAX_PERFILES)]:
+        try:
+            os.remove(os.path.join(carpeta, viejo))
+        except FileNotFoundError:
+            pass  # Otro proceso ya lo borró
+    return nombre
+
+
+def _ruta(nombre):
+    # El nombre viene de la URL: solo dígitos y guiones, nada de rutas
+    if not nombre or not all(c.isdigit() or c == '-' for c in nombre):
+        raise FileNotFoundError(nombre)
+    return os.path.join(directorio(), nombre + EXTENSION)
+
+
+def cargar(nombre):
+    with open(_ruta(nombre), encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    datos['nombre'] = nombre
+    return datos
+
+
+def recientes():
+    """Resúmenes de los perfiles guardados (sin pilas ni SQL), los más lentos primero"""
+    carpeta = directorio()
+    if not os.path.isdir(carpeta):
+        return []
+    perfiles = []
+    for archivo in os.listdir(carpeta):
+        if not archivo.endswith(EXTENSION):
+            continue
+        try:
+            datos = cargar(archivo[:-len(EXTENSION)])
+        except (FileNotFoundError, ValueError):
+            continue  # Borrado por el buffer circular mientras se listaba, o dañado
+        datos.pop('pilas')
+        datos.pop('sql')
+        perfiles.append(datos)
+    perfiles.sort(key=lambda p: p['ms'], reverse=True)
+    return perfiles
+
+
+def colapsado(datos):
+    """Texto "pila N" por línea para flamegraph.pl / speedscope"""
+    return ''.join(f'{pila} {n}\n' for pila, n in sorted(datos['pilas'].items(), key=lambda p: -p[1]))
+
+
+# ============ MIDDLEWARE ============
+class PerfiladorMiddleware:
+    """
+    Muestrea la pila y las consultas de cada petición y guarda las muestreadas o
+    lentas. Va después de MetricasMiddleware. Se desactiva con
+    TIENDA_PERFIL_FRACCION = 0 y TIENDA_PERFIL_UMBRAL_MS = None.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.fraccion = _config('FRACCION', FRACCION)
+        self.umbral = _config('UMBRAL_MS', UMBRAL_MS)
+        if not self.fraccion and self.umbral is None:
+            raise MiddlewareNotUsed
+        self.muestreador = Muestreador(_config('INTERVALO_MS', INTERVALO_MS) / 1000)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        elegida = random.random() < self.fraccion
+        peticion = _Peticion(self.muestreador)
+        token = _actual.set(peticion)
+        try:
+            with en_este_hilo():
+                respuesta = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        ms, motivo = self._motivo(peticion, elegida)
+        if motivo:
+            self._guardar(request, respuesta, peticion, ms, motivo)
+        return respuesta
+
+    async def __acall__(self, request):
+        elegida = random.random() < self.fraccion
+        peticion = _Peticion(self.muestreador)
+        token = _actual.set(peticion)
+        try:
+            # El event loop no ejecuta la vista: se muestrea el hilo síncrono de la petición
+            async with en_hilo_sincrono(en_este_hilo()):
+                respuesta = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        ms, motivo = self._motivo(peticion, elegida)
+        if motivo:
+            # request.user puede no estar cargado aún (ORM) y guardar() escribe a disco
+            await sync_to_async(self._guardar)(request, respuesta, peticion, ms, motivo)
+        return respuesta
+
+    def _motivo(self, peticion, elegida):
+        """(ms, 'lenta' | 'muestra' | None): si la petición se guarda y por qué"""
+        ms = (time.perf_counter() - peticion.inicio) * 1000
+        if self.umbral is not None and ms >= self.umbral:
+            return ms, 'lenta'
+        return ms, 'muestra' if elegida else None
+
+    def _guardar(self, request, respuesta, peticion, ms, motivo):
+        coincidencia = getattr(request, 'resolver_match', None)
+        sql = resumen_sql(peticion.consultas)
+        guardar({
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'vista': coincidencia.view_name if coincidencia else '',
+            'metodo': request.method,
+            'ruta': request.get_full_path(),
+            'usuario': request.user.get_username() if hasattr(request, 'user') else '',
+            'estado': respuesta.status_code,
+            'ms': round(ms, 1),
+            'motivo': motivo,
+            'consultas': len(peticion.consultas),
+            'sql_ms': round(sum(g['ms'] for g in sql), 1),
+            'duplicadas': sum(g['duplicadas'] for g in sql),
+            'muestras': sum(peticion.pilas.values()),
+            'pilas': dict(peticion.pilas),
+            'sql': sql,
+        })
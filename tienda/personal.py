@@ -0,0 +1,230 @@
+# tienda/personal.py
+# Alta y actualización masiva del personal (User + PerfilUsuario) desde una plantilla.
+# Lo usa el comando: python manage.py provisionar_usuarios <archivo>
+#
+# - Los usuarios existentes se leen de una vez (una consulta por cada LOTE_PROVISION
+#   usernames, con su perfil por JOIN), no con un exists() por persona.
+# - validar() pasa cada columna por el campo del modelo (largo máximo, formato de
+#   email y de username): un renglón que la base rechazaría se reporta con su número
+#   en lugar de tumbar la transacción de todo el lote.
+# - planear() compara la plantilla con la base y devuelve un Plan: usuarios nuevos,
+#   perfiles que faltan y cambios de rol/departamento/teléfono/activo. Los usernames
+#   se comparan sin distinguir mayúsculas, igual que los repetidos en leer() (y que la
+#   collation de MySQL). Sin escribir nada, el plan es el modo de simulación del comando.
+# - is_staff (acceso al admin) sigue al rol: solo 'administrador' lo tiene, al crear
+#   el usuario y cada vez que la plantilla le asigna un rol; un superusuario lo conserva.
+# - aplicar() calcula los hashes de los nuevos en paralelo (tienda/hashing.py), fuera
+#   de la transacción, y luego escribe todo en una sola transacción con bulk_create y
+#   bulk_update por lotes. El rol cacheado de los perfiles tocados se invalida al confirmar.
+# - A los usuarios existentes no se les cambia la contraseña (rehashear_passwords).
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from . import hashing, roles
+from .models import PerfilUsuario
+
+LOTE_PROVISION = 500  # Filas por INSERT/UPDATE
+ROLES_VALIDOS = dict(PerfilUsuario.ROLES)
+ROL_POR_DEFECTO = 'vendedor'
+# Columna de la plantilla -> campo de User (solo al crear)
+CAMPOS_USUARIO = {'nombre': 'first_name', 'apellido': 'last_name', 'email': 'email'}
+# Campos del perfil que la plantilla puede cambiar en usuarios existentes
+CAMPOS_PERFIL = ('rol', 'departamento', 'telefono', 'activo')
+VERDADEROS = {'1', 'si', 'sí', 's', 'true', 'verdadero', 'yes', 'y'}
+FALSOS = {'0', 'no', 'n', 'false', 'falso'}
+
+
+class Renglon:
+    """Una persona de la plantilla ya validada"""
+
+    def __init__(self, numero, username, password, usuario, perfil):
+        self.numero = numero
+        self.username = username
+        self.password = password  # '' si no viene (los nuevos reciben una temporal)
+        self.usuario = usuario  # {campo de User: valor}
+        self.perfil = perfil  # {campo de PerfilUsuario: valor}, solo las columnas con valor
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _limpio(modelo, campo, columna, valor):
+    """Valor validado por el campo del modelo (largo, formato); ValueError con la columna"""
+    try:
+        return modelo._meta.get_field(campo).clean(valor, None)
+    except ValidationError as exc:
+        raise ValueError(f'{columna}: {" ".join(exc.messages)}')
+
+
+def _es_staff(rol, user=None):
+    return rol == 'administrador' or bool(user and user.is_superuser)
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    texto = _texto(valor).lower()
+    if texto in VERDADEROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise ValueError(f'activo: valor no reconocido {valor!r}')
+
+
+def validar(numero, datos):
+    """Renglon desde un dict de la plantilla; ValueError con el motivo si no es válido"""
+    if not isinstance(datos, dict):
+        raise ValueError('no es un objeto válido')
+    username = _texto(datos.get('username'))
+    if not username:
+        raise ValueError('falta username')
+    username = _limpio(User, 'username', 'username', username)
+
+    perfil = {}
+    rol = _texto(datos.get('rol')).lower()
+    if rol:
+        if rol not in ROLES_VALIDOS:
+            raise ValueError(f'rol: {rol!r} no es uno de {", ".join(ROLES_VALIDOS)}')
+        perfil['rol'] = rol
+    for nombre in ('departamento', 'telefono'):
+        if _texto(datos.get(nombre)):
+            perfil[nombre] = _limpio(PerfilUsuario, nombre, nombre, _texto(datos[nombre]))
+    if _texto(datos.get('activo')):
+        perfil['activo'] = _booleano(datos['activo'])
+
+    usuario = {campo: _limpio(User, campo, columna, _texto(datos.get(columna)))
+               for columna, campo in CAMPOS_USUARIO.items()}
+    return Renglon(numero, username, _texto(datos.get('password')), usuario, perfil)
+
+
+def leer(renglones, reportar_error=None):
+    """
+    Renglones válidos de la plantilla, sin usernames repetidos; los inválidos y
+    repetidos se reportan con reportar_error(numero, mensaje) y se omiten.
+    """
+    reportar_error = reportar_error or (lambda numero, mensaje: None)
+    validos = {}
+    for numero, datos in renglones:
+        if isinstance(datos, Exception):
+            reportar_error(numero, str(datos))
+            continue
+        try:
+            renglon = validar(numero, datos)
+        except ValueError as exc:
+            reportar_error(numero, str(exc))
+            continue
+        clave = renglon.username.lower()
+        if clave in validos:
+            reportar_error(numero, f'username repetido (ya está en el renglón {validos[clave].numero})')
+            continue
+        validos[clave] = renglon
+    return list(validos.values())
+
+
+class Plan:
+    """Diferencias entre la plantilla y la base"""
+
+    def __init__(self):
+        self.nuevos = []  # Renglon sin usuario en la base
+        self.sin_perfil = []  # (user_id, Renglon): el usuario existe pero no tiene perfil
+        self.cambios = []  # (PerfilUsuario con los valores nuevos, {campo: (antes, después)})
+        self.staff = []  # User existentes con is_staff ya cambiado según su nuevo rol
+        self.sin_cambios = 0
+
+    @property
+    def vacio(self):
+        return not (self.nuevos or self.sin_perfil or self.cambios or self.staff)
+
+
+def planear(renglones):
+    plan = Plan()
+    existentes = {}  # {username en minúsculas: [User, ...]}
+    usernames = [r.username.lower() for r in renglones]
+    for inicio in range(0, len(usernames), LOTE_PROVISION):  # Una consulta por lote (límite de parámetros)
+        bloque = usernames[inicio:inicio + LOTE_PROVISION]
+        # LOWER() no usa el índice de username, pero la tabla de usuarios es la del personal
+        usuarios = User.objects.annotate(clave=Lower('username')).filter(clave__in=bloque).select_related('perfil')
+        for user in usuarios:
+            existentes.setdefault(user.clave, []).append(user)
+
+    for renglon in renglones:
+        candidatos = existentes.get(renglon.username.lower())
+        if not candidatos:
+            plan.nuevos.append(renglon)
+            continue
+        # Si la base ya tiene el mismo nombre con distintas mayúsculas, gana el idéntico
+        user = next((u for u in candidatos if u.username == renglon.username), candidatos[0])
+        try:
+            perfil = user.perfil
+        except PerfilUsuario.DoesNotExist:
+            plan.sin_perfil.append((user.pk, renglon))
+            _sincronizar_staff(plan, user, renglon.perfil.get('rol', ROL_POR_DEFECTO))
+            continue
+        diferencias = {campo: (getattr(perfil, campo), valor) for campo, valor in renglon.perfil.items()
+                       if getattr(perfil, campo) != valor}
+        if diferencias:
+            for campo, (_, valor) in diferencias.items():
+                setattr(perfil, campo, valor)
+            plan.cambios.append((perfil, diferencias))
+            if 'rol' in diferencias:
+                _sincronizar_staff(plan, user, perfil.rol)
+        else:
+            plan.sin_cambios += 1
+    return plan
+
+
+def _sincronizar_staff(plan, user, rol):
+    staff = _es_staff(rol, user)
+    if user.is_staff != staff:
+        user.is_staff = staff
+        plan.staff.append(user)
+
+
+def _perfil(user_id, renglon):
+    return PerfilUsuario(user_id=user_id, **{'rol': ROL_POR_DEFECTO, **renglon.perfil})
+
+
+def asignar_temporales(plan):
+    """Contraseña temporal a los nuevos que no traen una; devuelve [(username, contraseña)]"""
+    temporales = []
+    for renglon in plan.nuevos:
+        if not renglon.password:
+            renglon.password = hashing.password_temporal()
+            temporales.append((renglon.username, renglon.password))
+    return temporales
+
+
+def aplicar(plan, procesos=None, lote=LOTE_PROVISION, progreso=None):
+    """
+    Escribe el plan (los nuevos ya deben tener contraseña, ver asignar_temporales).
+    progreso(hechos, total, segundos) viene de hashing.hashear().
+    """
+    # El hash es lo lento: se calcula antes de abrir la transacción
+    hashes = hashing.hashear([r.password for r in plan.nuevos], procesos=procesos, progreso=progreso)
+
+    tocados = [perfil.user_id for perfil, _ in plan.cambios] + [user_id for user_id, _ in plan.sin_perfil]
+    with transaction.atomic():
+        usuarios = [
+            User(username=r.username, password=encoded, is_staff=_es_staff(r.perfil.get('rol')), **r.usuario)
+            for r, encoded in zip(plan.nuevos, hashes)
+        ]
+        User.objects.bulk_create(usuarios, batch_size=lote)
+        # MySQL no devuelve las PK de bulk_create: se leen por username
+        ids = {}
+        for inicio in range(0, len(usuarios), lote):
+            bloque = [u.username for u in usuarios[inicio:inicio + lote]]
+            ids.update(User.objects.filter(username__in=bloque).values_list('username', 'pk'))
+
+        perfiles = [_perfil(ids[r.username], r) for r in plan.nuevos]
+        perfiles += [_perfil(user_id, r) for user_id, r in plan.sin_perfil]
+        PerfilUsuario.objects.bulk_create(perfiles, batch_size=lote)
+        if plan.staff:
+            User.objects.bulk_update(plan.staff, ['is_staff'], batch_size=lote)
+        campos = [campo for campo in CAMPOS_PERFIL if any(campo in d for _, d in plan.cambios)]
+        if campos:
+            PerfilUsuario.objects.bulk_update([perfil for perfil, _ in plan.cambios], campos, batch_size=lote)
+        # bulk_create/bulk_update no disparan la señal que invalida el rol cacheado
+        transaction.on_commit(lambda: roles.invalidar_varios(tocados))
@@ -0,0 +1,89 @@
+# tienda/reorden.py
+# Productos con stock bajo (lista de reorden).
+#
+# Producto.requiere_reorden guarda precalculado "stock <= umbral", donde el umbral
+# es Producto.stock_minimo o, si está vacío, Categoria.stock_minimo. La bandera es
+# la primera columna del índice producto_reorden_idx, así la lista de reorden lee
+# solo los productos marcados en lugar de recorrer el catálogo.
+#
+# La bandera se recalcula en SQL (no en Python) en cada camino que cambia el stock
+# o el umbral:
+# - inventario.aplicar_deltas(): en el mismo UPDATE que mueve el stock.
+# - Producto guardado / Categoria con otro stock_minimo: señales en tienda/signals.py.
+# - Importaciones: ImportadorProductos.terminar().
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import versiones
+from .models import Categoria, Producto
+
+LOTE_REORDEN = 5000  # Productos por UPDATE al recalcular todo el catálogo
+
+# Django escribe filter(campo=True) como WHERE "campo" (sin comparación), y ni MySQL ni
+# SQLite usan un índice para eso. Con __in=[True] sale WHERE "campo" IN (1), que sí
+# recorre solo el tramo del índice producto_reorden_idx (ver tienda/tests.py).
+FILTRO_REORDEN = {'requiere_reorden__in': [True], 'activo__in': [True]}
+
+
+def umbral():
+    """Expresión SQL del umbral de reorden de cada producto"""
+    return Coalesce(
+        'stock_minimo',
+        Subquery(Categoria._base_manager.filter(pk=OuterRef('categoria_id')).values('stock_minimo')[:1]),
+        output_field=IntegerField(),
+    )
+
+
+def bandera(delta=0):
+    """
+    Expresión de requiere_reorden para un UPDATE.
+
+    Con `delta` se evalúa para el stock que quedará después de sumarlo, usando el
+    valor anterior de stock (stock + delta <= umbral  ==  stock <= umbral - delta).
+    """
+    limite = umbral() - delta if delta else umbral()
+    return Case(When(stock__lte=limite, then=Value(True)), default=Value(False))
+
+
+def actualizar(queryset):
+    """
+    Recalcula la bandera de los productos del queryset (un UPDATE); devuelve
+    cuántos cambiaron. Solo escribe las filas cuya bandera cambia, así su
+    `modificado` (llave de la fila cacheada en la lista) no se mueve sin motivo.
+    """
+    cambiados = queryset.exclude(requiere_reorden=bandera()).update(requiere_reorden=bandera(),
+                                                                   modificado=timezone.now())
+    if cambiados:
+        versiones.cambiar(Producto)  # update() no dispara señales
+    return cambiados
+
+
+def actualizar_categoria(categoria_id):
+    """Tras cambiar el umbral de una categoría: solo sus productos sin umbral propio"""
+    return actualizar(Producto._base_manager.filter(categoria_id=categoria_id, stock_minimo__isnull=True))
+
+
+def actualizar_todo(lote=LOTE_REORDEN):
+    """Recalcula todo el catálogo en rangos de PK (transacciones cortas); devuelve cuántos cambiaron"""
+    total = 0
+    desde = 0
+    ultimo = Producto._base_manager.order_by('-pk').values_list('pk', flat=True).first() or 0
+    while desde < ultimo:
+        total += actualizar(Producto._base_manager.filter(pk__gt=desde, pk__lte=desde + lote))
+        desde += lote
+    return total
+
+
+def lista_de_reorden(proveedor_id=None):
+    """Productos activos que requieren reorden, ordenados por proveedor y urgencia"""
+    productos = (
+        Producto.objects.filter(**FILTRO_REORDEN)
+        .select_related('proveedor', 'categoria')
+        .only('id', 'nombre', 'stock', 'stock_minimo', 'proveedor__nombre', 'proveedor__empresa',
+              'proveedor__telefono', 'proveedor__email', 'categoria__nombre', 'categoria__stock_minimo')
+        .order_by('proveedor_id', 'stock', 'id')
+    )
+    if proveedor_id is not None:
+        productos = productos.filter(proveedor_id=proveedor_id)
+    return productos
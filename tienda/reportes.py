@@ -0,0 +1,145 @@
+# tienda/reportes.py
+# Reportes de ventas (vista reportes): ingresos por día/semana/mes, por vendedor
+# y por cliente, rankings top-N y comparación contra el periodo anterior.
+#
+# Todo se calcula con agregados en la base de datos sobre el resumen diario
+# (VentaDiaria, ver tienda/resumenes.py), filtrando por rangos de `fecha` que usan
+# su índice; nunca se recorren filas de Venta en Python.
+#
+# Los resultados se cachean por (reporte, rango, parámetros). Un rango que termina
+# antes de hoy ya no cambia, así que se guarda por mucho tiempo; si incluye hoy, por
+# poco. Cuando se corrige una venta pasada o se reconstruye el resumen se incrementa
+# una "versión" que forma parte de la clave, invalidando todo de una vez. La versión
+# es un contador de VersionTabla (en la base, ver tienda/versiones.py) y no una llave
+# de la caché: 'default' es local a cada proceso y una corrección hecha en un worker
+# o en un comando debe invalidar los reportes de todos.
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import versiones
+from .models import VentaDiaria
+
+PREFIJO = 'tienda:reportes'
+VERSION = PREFIJO  # Contador de VersionTabla de los reportes
+TTL_HISTORICO = 24 * 60 * 60  # Rangos cerrados (terminan antes de hoy)
+TTL_ACTUAL = 60  # Rangos que incluyen el día de hoy
+
+GRANULARIDADES = {
+    'dia': TruncDay,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+_CERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+# ============ CACHÉ ============
+def _version():
+    return versiones.versiones(VERSION)[VERSION][0]  # Una consulta por PK
+
+
+def invalidar():
+    """Invalida todos los reportes cacheados en todos los workers (se llama al corregir ventas pasadas)"""
+    versiones.cambiar(VERSION)
+
+
+def _cacheado(nombre, desde, hasta, calcular, **parametros):
+    """Devuelve el reporte desde la caché o lo calcula y lo guarda con el TTL que corresponda"""
+    extra = ':'.join(f'{k}={v}' for k, v in sorted(parametros.items()))
+    clave = f'{PREFIJO}:v{_version()}:{nombre}:{desde.isoformat()}:{hasta.isoformat()}:{extra}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular()
+        cerrado = hasta <= timezone.localdate()  # [desde, hasta) no incluye hoy
+        cache.set(clave, resultado, TTL_HISTORICO if cerrado else TTL_ACTUAL)
+    return resultado
+
+
+def _rango(desde, hasta):
+    return VentaDiaria.objects.filter(fecha__gte=desde, fecha__lt=hasta)
+
+
+def _totales():
+    return {'num_ventas': Coalesce(Sum('num_ventas'), 0), 'total': Coalesce(Sum('total'), _CERO)}
+
+
+# ============ REPORTES ============
+def ingresos_por_periodo(desde, hasta, granularidad='dia'):
+    """Lista de {'periodo', 'num_ventas', 'total'} para los días [desde, hasta)"""
+    truncar = GRANULARIDADES[granularidad]
+
+    def calcular():
+        return list(
+            _rango(desde, hasta)
+            .annotate(periodo=truncar('fecha'))
+            .values('periodo')
+            .annotate(**_totales())
+            .order_by('periodo')
+        )
+    return _cacheado('periodo', desde, hasta, calcular, granularidad=granularidad)
+
+
+def ranking_vendedores(desde, hasta, top=10):
+    """Top-N de vendedores por ingresos en [desde, hasta)"""
+    def calcular():
+        return list(
+            _rango(desde, hasta)
+            .values('vendedor_id', 'vendedor__username')
+            .annotate(**_totales())
+            .order_by('-total', 'vendedor_id')[:top]
+        )
+    return _cacheado('vendedores', desde, hasta, calcular, top=top)
+
+
+def ranking_clientes(desde, hasta, top=10):
+    """Top-N de clientes por ingresos en [desde, hasta); las ventas sin cliente se excluyen"""
+    def calcular():
+        return list(
+            _rango(desde, hasta)
+            .filter(cliente__isnull=False)
+            .values('cliente_id', 'cliente__nombre', 'cliente__apellido')
+            .annotate(**_totales())
+            .order_by('-total', 'cliente_id')[:top]
+        )
+    return _cacheado('clientes', desde, hasta, calcular, top=top)
+
+
+def _variacion(actual, anterior):
+    """Cambio porcentual; None si el periodo anterior fue cero"""
+    if not anterior:
+        return None
+    return (Decimal(actual) - Decimal(anterior)) / Decimal(anterior) * 100
+
+
+def comparar_con_anterior(desde, hasta):
+    """
+    Compara [desde, hasta) contra el periodo inmediatamente anterior de la misma duración.
+
+    Devuelve {'actual': {...}, 'anterior': {...}, 'variacion_total', 'variacion_ventas'}.
+    """
+    duracion = hasta - desde
+    # Un rango enorme no tiene periodo anterior completo: se compara contra lo que haya antes
+    previo_desde = desde - min(duracion, desde - datetime.date.min)
+
+    def calcular():
+        actual = _rango(desde, hasta).aggregate(**_totales())
+        anterior = _rango(previo_desde, desde).aggregate(**_totales())
+        return {
+            'actual': actual,
+            'anterior': anterior,
+            'anterior_desde': previo_desde,
+            'variacion_total': _variacion(actual['total'], anterior['total']),
+            'variacion_ventas': _variacion(actual['num_ventas'], anterior['num_ventas']),
+        }
+    return _cacheado('comparacion', desde, hasta, calcular)
+
+
+def rango_por_defecto(dias=30):
+    """Los últimos `dias` días, incluyendo hoy: (desde, hasta) semiabierto"""
+    hasta = timezone.localdate() + datetime.timedelta(days=1)
+    return hasta - datetime.timedelta(days=dias), hasta
@@ -0,0 +1,174 @@
+# tienda/resumenes.py
+# Mantenimiento y lectura del resumen diario de ventas (modelo VentaDiaria).
+#
+# - registrar_venta(): suma una venta nueva a su grupo (fecha, vendedor, cliente)
+#   con un solo INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE sobre la
+#   restricción única del grupo: lo crea si no existe y si existe suma en la misma
+#   sentencia. Un UPDATE de 0 filas seguido de un INSERT tomaba en MySQL
+#   (REPEATABLE READ) un bloqueo de hueco, y dos primeras ventas del mismo grupo
+#   a la vez terminaban en un interbloqueo (error 1213).
+# - recalcular_grupo(): rehace un grupo desde las ventas reales (al editar/borrar,
+#   porque MIN/MAX no se pueden "restar").
+# - reconstruir(): vuelve a generar el resumen de un rango de fechas desde cero
+#   (lo usa el comando reconstruir_ventas_diarias).
+# - totales(): lee el resumen de un rango de días sumando filas de VentaDiaria.
+import datetime
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import reportes
+from .estadisticas import rango_del_dia
+from .models import Venta, VentaDiaria
+
+LOTE_RECONSTRUCCION = 1000  # Filas de VentaDiaria por INSERT al reconstruir
+
+
+def _decimal(valor):
+    return Value(Decimal(valor), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _grupo(fecha, vendedor_id, cliente_id):
+    """Campos que identifican un grupo, con las claves únicas (0 en lugar de NULL)"""
+    return {'fecha': fecha, 'vendedor_id': vendedor_id, 'cliente_id': cliente_id,
+            'vendedor_clave': vendedor_id or 0, 'cliente_clave': cliente_id or 0}
+
+
+def _rango_fechas(desde, hasta):
+    """Rango semiabierto de datetimes [desde 00:00, hasta 00:00) en hora local"""
+    return rango_del_dia(desde)[0], rango_del_dia(hasta)[0]
+
+
+# ============ ESCRITURA ============
+_COLUMNAS_UPSERT = ['fecha', 'vendedor', 'cliente', 'vendedor_clave', 'cliente_clave',
+                    'num_ventas', 'total', 'minimo', 'maximo']
+
+
+def _sql_upsert():
+    """INSERT de un grupo que, si ya existe, suma la venta a la fila existente"""
+    q = connection.ops.quote_name
+    meta = VentaDiaria._meta
+    tabla = q(meta.db_table)
+
+    def columna(campo):
+        return q(meta.get_field(campo).column)
+
+    if connection.vendor == 'mysql':
+        conflicto = 'ON DUPLICATE KEY UPDATE'
+        nuevo = 'VALUES({})'.format  # VALUES(col): el valor que se intentó insertar
+    else:
+        clave = ', '.join(columna(c) for c in ('fecha', 'vendedor_clave', 'cliente_clave'))
+        conflicto = f'ON CONFLICT ({clave}) DO UPDATE SET'
+        nuevo = 'excluded.{}'.format
+    # SQLite no tiene LEAST/GREATEST: MIN/MAX con dos argumentos son escalares
+    menor, mayor = ('MIN', 'MAX') if connection.vendor == 'sqlite' else ('LEAST', 'GREATEST')
+    actual = {c: f'{tabla}.{columna(c)}' for c in ('num_ventas', 'total', 'minimo', 'maximo')}
+    nuevos = {c: nuevo(columna(c)) for c in actual}
+    return (
+        f'INSERT INTO {tabla} ({", ".join(columna(c) for c in _COLUMNAS_UPSERT)}) '
+        f'VALUES ({", ".join(["%s"] * len(_COLUMNAS_UPSERT))}) {conflicto} '
+        f'{columna("num_ventas")} = {actual["num_ventas"]} + {nuevos["num_ventas"]}, '
+        f'{columna("total")} = {actual["total"]} + {nuevos["total"]}, '
+        f'{columna("minimo")} = {menor}({actual["minimo"]}, {nuevos["minimo"]}), '
+        f'{columna("maximo")} = {mayor}({actual["maximo"]}, {nuevos["maximo"]})'
+    )
+
+
+def registrar_venta(venta):
+    """
+    Suma una venta recién creada al resumen de su día.
+
+    Debe llamarse dentro de la transacción que inserta la venta (Venta.save()
+    ya lo hace). Es una sola sentencia atómica: dos cajas que venden a la vez al
+    mismo grupo, exista o no todavía, no se pisan ni se bloquean entre sí.
+    """
+    grupo = _grupo(timezone.localdate(venta.fecha_venta), venta.vendido_por_id, venta.cliente_id)
+    ops = connection.ops
+    total = ops.adapt_decimalfield_value(Decimal(venta.total), 14, 2)
+    with connection.cursor() as cursor:
+        cursor.execute(_sql_upsert(), [
+            ops.adapt_datefield_value(grupo['fecha']), grupo['vendedor_id'], grupo['cliente_id'],
+            grupo['vendedor_clave'], grupo['cliente_clave'], 1, total, total, total,
+        ])
+
+
+def recalcular_grupo(fecha, vendedor_id, cliente_id):
+    """Rehace un grupo (fecha, vendedor, cliente) a partir de las ventas de ese día"""
+    inicio, fin = _rango_fechas(fecha, fecha + datetime.timedelta(days=1))
+    with transaction.atomic():
+        datos = Venta.objects.filter(
+            fecha_venta__gte=inicio, fecha_venta__lt=fin,
+            vendido_por_id=vendedor_id, cliente_id=cliente_id,
+        ).aggregate(conteo=Count('id'), suma=Sum('total'), minimo_=Min('total'), maximo_=Max('total'))
+        VentaDiaria.objects.filter(fecha=fecha, vendedor_id=vendedor_id, cliente_id=cliente_id).delete()
+        if datos['conteo']:
+            VentaDiaria.objects.create(
+                **_grupo(fecha, vendedor_id, cliente_id), num_ventas=datos['conteo'],
+                total=datos['suma'], minimo=datos['minimo_'], maximo=datos['maximo_'],
+            )
+    transaction.on_commit(reportes.invalidar)  # Los reportes cacheados de ese día ya no valen
+
+
+def reconstruir(desde, hasta, lote=LOTE_RECONSTRUCCION):
+    """
+    Regenera el resumen para los días [desde, hasta).
+
+    La agregación (GROUP BY día, vendedor, cliente) la hace la base de datos;
+    Python solo recibe una fila por grupo y las inserta en lotes. Devuelve el
+    número de filas de resumen creadas.
+    """
+    inicio, fin = _rango_fechas(desde, hasta)
+    grupos = (
+        Venta.objects.filter(fecha_venta__gte=inicio, fecha_venta__lt=fin)
+        .annotate(dia=TruncDate('fecha_venta'))  # TruncDate usa la zona horaria actual, igual que localdate()
+        .values('dia', 'vendido_por_id', 'cliente_id')
+        .annotate(num_ventas=Count('id'), suma=Sum('total'), minimo_=Min('total'), maximo_=Max('total'))
+        .order_by()
+    )
+    creadas = 0
+    with transaction.atomic():
+        VentaDiaria.objects.filter(fecha__gte=desde, fecha__lt=hasta).delete()
+        pendientes = []
+        for g in grupos.iterator(chunk_size=lote):
+            pendientes.append(VentaDiaria(
+                **_grupo(g['dia'], g['vendido_por_id'], g['cliente_id']),
+                num_ventas=g['num_ventas'], total=g['suma'], minimo=g['minimo_'], maximo=g['maximo_'],
+            ))
+            if len(pendientes) >= lote:
+                VentaDiaria.objects.bulk_create(pendientes)
+                creadas += len(pendientes)
+                pendientes = []
+        if pendientes:
+            VentaDiaria.objects.bulk_create(pendientes)
+            creadas += len(pendientes)
+    transaction.on_commit(reportes.invalidar)
+    return creadas
+
+
+# ============ LECTURA ============
+def totales(desde, hasta, **filtros):
+    """
+    Totales de ventas para los días [desde, hasta) leídos del resumen.
+
+    `filtros` se aplica sobre VentaDiaria (p. ej. vendedor_id=3). Devuelve
+    {'num_ventas', 'total', 'minimo', 'maximo'}.
+    """
+    return VentaDiaria.objects.filter(fecha__gte=desde, fecha__lt=hasta, **filtros).aggregate(
+        num_ventas=Coalesce(Sum('num_ventas'), 0),
+        total=Coalesce(Sum('total'), _decimal(0)),
+        minimo=Min('minimo'),
+        maximo=Max('maximo'),
+    )
+
+
+def totales_del_dia(fecha):
+    return totales(fecha, fecha + datetime.timedelta(days=1))
+
+
+def totales_del_mes(anio, mes):
+    inicio = datetime.date(anio, mes, 1)
+    fin = datetime.date(anio + (mes == 12), mes % 12 + 1, 1)
+    return totales(inicio, fin)
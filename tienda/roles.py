@@ -0,0 +1,106 @@
+# tienda/roles.py
+# Resolución del rol del usuario, una sola vez por petición.
+#
+# El backend de autenticación (tienda/backends.py) ya trae User y PerfilUsuario en
+# la misma consulta, así que normalmente el rol sale del objeto en memoria. Si el
+# perfil no vino cargado (sesiones iniciadas con otro backend, scripts) se busca en
+# la caché compartida y solo como último recurso en la base de datos. La entrada de
+# caché se borra cuando cambia el PerfilUsuario (ver tienda/signals.py).
+#
+# RolUsuarioMiddleware deja el resultado en request.rol y el context processor
+# lo expone en las plantillas como `rol_usuario`.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import PerfilUsuario
+
+PREFIJO = 'tienda:rol'
+ROL_TTL = 60 * 60  # La invalidación es explícita; el TTL solo limita entradas olvidadas
+_SIN_PERFIL = ('', False)  # Marcador en caché para "el usuario no tiene perfil"
+
+
+class Rol:
+    """Rol resuelto del usuario de la petición"""
+
+    def __init__(self, nombre=None, activo=False, es_superusuario=False, autenticado=True):
+        self.nombre = nombre  # 'vendedor', 'gerente', 'administrador' o None si no tiene perfil
+        self.activo = activo
+        self.es_superusuario = es_superusuario
+        self.autenticado = autenticado
+
+    def __repr__(self):
+        return f'<Rol {self.nombre or "sin perfil"}{"" if self.activo else " (inactivo)"}>'
+
+    @property
+    def tiene_perfil(self):
+        return self.nombre is not None
+
+    def permite(self, *roles):
+        """True si el usuario puede entrar a una vista restringida a `roles`"""
+        if self.es_superusuario:
+            return True
+        return self.activo and self.nombre in roles
+
+    # Atajos para las plantillas (equivalentes a los métodos de PerfilUsuario)
+    @property
+    def es_vendedor(self):
+        return self.nombre == 'vendedor'
+
+    @property
+    def puede_gestionar(self):
+        """Ve los menús de gestión (categorías, proveedores, reportes): todos menos el vendedor"""
+        return self.es_superusuario or not self.es_vendedor
+
+    @property
+    def puede_escribir(self):
+        return self.permite('gerente', 'administrador')
+
+    @property
+    def puede_eliminar(self):
+        return self.permite('administrador')
+
+
+def _clave(user_id):
+    return f'{PREFIJO}:{user_id}'
+
+
+def _datos_perfil(user):
+    """(rol, activo) del perfil del usuario, o _SIN_PERFIL"""
+    if User.perfil.is_cached(user):
+        # Caso normal: el backend hizo select_related('perfil'), no hace falta consultar
+        try:
+            perfil = user.perfil
+        except PerfilUsuario.DoesNotExist:
+            return _SIN_PERFIL
+        return (perfil.rol, perfil.activo)
+
+    datos = cache.get(_clave(user.pk))
+    if datos is None:
+        datos = PerfilUsuario.objects.filter(user_id=user.pk).values_list('rol', 'activo').first() or _SIN_PERFIL
+        cache.set(_clave(user.pk), tuple(datos), ROL_TTL)
+    return tuple(datos)
+
+
+def rol_de(user):
+    """Resuelve el Rol de un usuario (anónimo incluido)"""
+    if not user.is_authenticated:
+        return Rol(autenticado=False)
+    nombre, activo = _datos_perfil(user)
+    return Rol(nombre=nombre or None, activo=activo, es_superusuario=user.is_superuser)
+
+
+def rol_de_request(request):
+    """El Rol de la petición; usa request.rol si el middleware ya lo resolvió"""
+    rol = getattr(request, 'rol', None)
+    if rol is None:
+        rol = request.rol = rol_de(request.user)
+    return rol
+
+
+def invalidar(user_id):
+    """Olvida el rol cacheado de un usuario (al cambiar su perfil)"""
+    cache.delete(_clave(user_id))
+
+
+def invalidar_varios(user_ids):
+    cache.delete_many([_clave(pk) for pk in user_ids])
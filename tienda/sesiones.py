@@ -0,0 +1,149 @@
+# tienda/sesiones.py
+# Motor de sesiones de la tienda (SESSION_ENGINE = 'tienda.sesiones', ver settings.py).
+#
+# Es cached_db con dos cambios:
+# - La copia en caché vive en SESSION_CACHE_ALIAS (por defecto una LocMemCache del
+#   proceso: leer la sesión no cuesta ni un viaje de red) y dura a lo más
+#   TIENDA_SESION_CACHE_TTL segundos. Como cada worker tiene su propia copia, el TTL
+#   acota cuánto puede ver un worker una sesión que otro ya cambió o cerró; con una
+#   caché compartida (Redis/Memcached) se puede subir.
+# - Cerrar sesión (logout, flush, cycle_key) deja una marca en la caché compartida
+#   TIENDA_SESION_CACHE_CERRADAS ('acceso'), que dura lo que puede durar una copia.
+#   Antes de usar su copia, cada worker mira esa marca: una sesión cerrada en un
+#   worker deja de valer en todos de inmediato, no cuando vence el TTL. Cuesta una
+#   lectura de la caché compartida por petición (ninguna si SESSION_CACHE_ALIAS ya
+#   es compartida: se configura TIENDA_SESION_CACHE_CERRADAS = None).
+# - save() no escribe si los datos son los mismos que se leyeron (p. ej. se asignó
+#   el mismo valor o se sacó una llave que no estaba): la fila de django_session
+#   solo se toca cuando algo cambió de verdad.
+# Las versiones async (aload/asave, las que usa request.auser() en las vistas async)
+# pasan por load()/save(): mismo TTL y misma huella.
+#
+# Las sesiones vencidas se borran por lotes (borrar_vencidas): `manage.py limpiar_sesiones`
+# o el clearsessions de Django, que llama a SessionStore.clear_expired().
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger('django.contrib.sessions')
+
+CACHE_TTL = 60  # Segundos que un worker confía en su copia sin releer la base
+LOTE_LIMPIEZA = 1000  # Sesiones vencidas por DELETE
+
+
+def cache_ttl():
+    return getattr(settings, 'TIENDA_SESION_CACHE_TTL', CACHE_TTL)
+
+
+def _cerradas():
+    """Caché compartida con las marcas de sesiones cerradas (None: no hace falta)"""
+    alias = getattr(settings, 'TIENDA_SESION_CACHE_CERRADAS', 'acceso')
+    if not alias or alias == settings.SESSION_CACHE_ALIAS:
+        return None
+    return caches[alias]
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'tienda:sesion:'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._huella = None  # Datos serializados tal como se leyeron (None: no se han leído)
+
+    def _serializar(self, datos):
+        return self.serializer().dumps(datos)
+
+    def _cerrada(self):
+        cerradas = _cerradas()
+        if cerradas is None:
+            return False
+        try:
+            return cerradas.get(self.cache_key) is not None
+        except Exception:
+            logger.exception('Error leyendo las sesiones cerradas (%s)', cerradas)
+            return True  # Sin saberlo no se confía en la copia: se relee la base
+
+    def load(self):
+        try:
+            datos = self._cache.get(self.cache_key)
+        except Exception:
+            datos = None  # Llave inválida para el backend: se trata como ausente (igual que cached_db)
+        if datos is not None and self._cerrada():
+            # Otro worker la cerró: la copia se descarta y la base dirá si sigue existiendo
+            self._cache.delete(self.cache_key)
+            datos = None
+        if datos is None:
+            fila = self._get_session_from_db()
+            if fila:
+                datos = self.decode(fila.session_data)
+                self._cache.set(self.cache_key, datos, min(self.get_expiry_age(expiry=fila.expire_date),
+                                                           cache_ttl()))
+            else:
+                datos = {}
+        self._huella = self._serializar(datos)
+        return datos
+
+    def save(self, must_create=False):
+        # Con SESSION_SAVE_EVERY_REQUEST el guardado renueva la expiración: no se omite
+        sin_cambios = (not must_create and self.session_key is not None and self._huella is not None
+                       and not settings.SESSION_SAVE_EVERY_REQUEST
+                       and self._huella == self._serializar(self._session))
+        if sin_cambios:
+            return
+        cached_db.DBStore.save(self, must_create)
+        self._huella = self._serializar(self._session)
+        try:
+            self._cache.set(self.cache_key, self._session, min(self.get_expiry_age(), cache_ttl()))
+        except Exception:
+            logger.exception('Error guardando la sesión en la caché (%s)', self._cache)
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        super().delete(session_key)
+        cerradas = _cerradas()
+        if session_key is None or cerradas is None:
+            return
+        try:
+            # Las copias de los demás workers duran a lo más cache_ttl(): la marca también
+            cerradas.set(self.cache_key_prefix + session_key, True, cache_ttl())
+        except Exception:
+            logger.exception('Error marcando la sesión como cerrada (%s)', cerradas)
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def asave(self, must_create=False):
+        await sync_to_async(self.save)(must_create)
+
+    @classmethod
+    def clear_expired(cls):
+        borrar_vencidas()
+
+
+def borrar_vencidas(lote=LOTE_LIMPIEZA, pausa=0.0, progreso=None):
+    """
+    Borra las sesiones vencidas en DELETE de a lo más `lote` filas, cada uno en su
+    propia transacción (autocommit), con `pausa` segundos entre lotes. Un solo
+    DELETE sobre millones de filas bloquearía django_session para los logins.
+    Devuelve cuántas borró; progreso(total) se llama tras cada lote.
+    """
+    modelo = SessionStore.get_model_class()
+    ahora = timezone.now()
+    total = 0
+    while True:
+        # Por llave primaria: el DELETE no recorre el índice de expire_date con bloqueos de rango
+        llaves = list(modelo.objects.filter(expire_date__lt=ahora).values_list('session_key', flat=True)[:lote])
+        if not llaves:
+            return total
+        total += modelo.objects.filter(session_key__in=llaves).delete()[0]
+        if progreso:
+            progreso(total)
+        if len(llaves) < lote:
+            return total
+        if pausa:
+            time.sleep(pausa)
@@ -0,0 +1,159 @@
+# tienda/signals.py
+# Receptores de señales de los modelos de la tienda.
+# Se registran en TiendaConfig.ready() (tienda/apps.py).
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import busqueda, estadisticas, reorden, roles, versiones
+from .models import Categoria, Cliente, PerfilUsuario, Producto, Proveedor, Venta
+
+# Campos que alimentan el índice de búsqueda
+CAMPOS_INDEXADOS_PRODUCTO = ('nombre', 'descripcion', 'categoria_id')
+# Campos de los que depende la bandera de reorden
+CAMPOS_REORDEN_PRODUCTO = ('stock', 'stock_minimo', 'categoria_id')
+
+
+# ============ ÍNDICE DE BÚSQUEDA ============
+@receiver(post_init, sender=Producto)
+def recordar_texto_producto(sender, instance, **kwargs):
+    """Guarda los valores indexados al cargar el objeto para saber luego si cambiaron"""
+    instance._texto_indexado = tuple(instance.__dict__.get(c) for c in CAMPOS_INDEXADOS_PRODUCTO)
+    instance._reorden = tuple(instance.__dict__.get(c) for c in CAMPOS_REORDEN_PRODUCTO)
+
+
+@receiver(post_init, sender=Categoria)
+def recordar_nombre_categoria(sender, instance, **kwargs):
+    instance._nombre_indexado = instance.__dict__.get('nombre')
+    instance._stock_minimo = instance.__dict__.get('stock_minimo')
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto_guardado(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Reindexa el producto solo si cambió algún campo que aparece en el índice"""
+    if raw:  # loaddata: el índice se reconstruye con el comando reindexar_busqueda
+        return
+    # __dict__ y no getattr(): un campo diferido (only()) no se cargó, así que tampoco cambió
+    actual = tuple(instance.__dict__.get(c) for c in CAMPOS_INDEXADOS_PRODUCTO)
+    if not created and actual == instance._texto_indexado:
+        return
+    instance._texto_indexado = actual
+    # on_commit: si la transacción se revierte, el índice no queda con datos fantasma
+    transaction.on_commit(lambda: busqueda.indexar_producto(instance))
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_productos_de_categoria(sender, instance, created, raw=False, **kwargs):
+    """Si cambia el nombre de una categoría, sus productos se reindexan"""
+    if raw or created or instance.__dict__.get('nombre') == instance._nombre_indexado:
+        return
+    instance._nombre_indexado = instance.nombre
+    transaction.on_commit(lambda: busqueda.indexar_productos(
+        Producto._base_manager.filter(categoria_id=instance.pk).values_list('pk', flat=True)
+    ))
+
+
+# ============ BANDERA DE REORDEN ============
+# Se recalcula dentro de la misma transacción que el guardado, en SQL (el umbral
+# puede venir de la categoría). Los cambios de stock con inventario.aplicar_deltas()
+# no pasan por aquí: ese UPDATE ya actualiza la bandera.
+@receiver(post_save, sender=Producto)
+def recalcular_reorden_producto(sender, instance, created, raw=False, **kwargs):
+    actual = tuple(instance.__dict__.get(c) for c in CAMPOS_REORDEN_PRODUCTO)
+    if raw or (not created and actual == instance._reorden):
+        return
+    instance._reorden = actual
+    reorden.actualizar(Producto._base_manager.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Categoria)
+def recalcular_reorden_categoria(sender, instance, created, raw=False, **kwargs):
+    if raw or created or instance.__dict__.get('stock_minimo') == instance._stock_minimo:
+        return
+    instance._stock_minimo = instance.stock_minimo
+    reorden.actualizar_categoria(instance.pk)
+
+
+# ============ CONTADORES DEL DASHBOARD ============
+# Solo cuentan las filas activas: desactivar (tienda/papelera.py) resta y reactivar
+# suma. Las modificaciones se aplican en on_commit: si la transacción se revierte,
+# el contador no cambia.
+@receiver(post_init, sender=Producto)
+@receiver(post_init, sender=Categoria)
+@receiver(post_init, sender=Proveedor)
+@receiver(post_init, sender=Cliente)
+def recordar_activo(sender, instance, **kwargs):
+    instance._activo = instance.__dict__.get('activo')
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Proveedor)
+@receiver(post_save, sender=Cliente)
+def contar_registro_guardado(sender, instance, created, raw=False, **kwargs):
+    # __dict__ y no getattr(): un campo diferido (only()) no se cargó, así que tampoco cambió
+    activo = instance.__dict__.get('activo')
+    anterior, instance._activo = instance._activo, activo
+    if raw or activo is None or (not created and activo == anterior):
+        return
+    if created and not activo:
+        return  # Nace inactivo: no cuenta
+    if not created and anterior is None:
+        # Se cargó sin el campo: no sabemos si cambió, se recalcula al leer
+        transaction.on_commit(lambda: estadisticas.invalidar_conteo(sender))
+        return
+    delta = 1 if activo else -1
+    transaction.on_commit(lambda: estadisticas.ajustar_conteo(sender, delta))
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Proveedor)
+@receiver(post_delete, sender=Cliente)
+def descontar_registro_borrado(sender, instance, **kwargs):
+    if instance.__dict__.get('activo', True):  # Los inactivos (purgar_inactivos) ya se descontaron
+        transaction.on_commit(lambda: estadisticas.ajustar_conteo(sender, -1))
+
+
+@receiver(post_save, sender=Venta)
+def acumular_venta(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        transaction.on_commit(lambda: estadisticas.ajustar_ventas(instance, 1))
+    else:
+        # No conocemos el total anterior: se descarta el día y se recalcula al leer
+        fecha = timezone.localdate(instance.fecha_venta)
+        transaction.on_commit(lambda: estadisticas.invalidar_ventas(fecha))
+
+
+@receiver(post_delete, sender=Venta)
+def descontar_venta(sender, instance, **kwargs):
+    transaction.on_commit(lambda: estadisticas.ajustar_ventas(instance, -1))
+
+
+# ============ VERSIONES (PETICIONES CONDICIONALES) ============
+# Cualquier alta, cambio o baja invalida los ETag de las páginas que muestran la tabla
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Proveedor)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Proveedor)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Venta)
+def cambiar_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versiones.cambiar(sender)
+
+
+# ============ CACHÉ DE ROLES ============
+@receiver(post_save, sender=PerfilUsuario)
+@receiver(post_delete, sender=PerfilUsuario)
+def invalidar_rol(sender, instance, **kwargs):
+    """El rol cacheado del usuario deja de valer al cambiar o borrarse su perfil"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: roles.invalidar(user_id))
@@ -1,3 +1,1429 @@
-from django.test import TestCase
+# tienda/tests.py
+# Regresiones de planes de consulta (PlanesDeConsultaTests) y pruebas de
+# comportamiento de las piezas que lo necesitan (sesiones, API por lotes, ...).
+#
+# Cada prueba abre una vista con el cliente de pruebas, toma la consulta principal
+# que ejecutó (la primera SELECT sobre su tabla) y la pasa por EXPLAIN QUERY PLAN
+# sobre una base SQLite con datos de ejemplo. Falla si el plan recorre la tabla
+# completa sin índice (SCAN <tabla>) o si ordena en memoria (USE TEMP B-TREE FOR
+# ORDER BY): señal de que falta un índice o de que una consulta dejó de usarlo.
+#
+# Ejecutar con: python manage.py test tienda
+# (las de planes solo corren con SQLite; con otro motor se omiten)
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (asincrono, benchmark, estadisticas, exportacion, hashing, importacion, inventario, metricas, papelera,
+               perfilado, personal, reorden, reportes, resumenes, ventas)
+from .forms import ProductoForm
+from .middleware import RolUsuarioMiddleware
+from .paginacion import CursorInvalido, PaginadorKeyset
+from .models import (Categoria, Cliente, DetalleVenta, IndiceBusqueda, MovimientoInventario, PerfilUsuario, Producto,
+                     Proveedor, SnapshotInventario, Venta, VentaDiaria, VersionTabla)
+
+# Líneas de EXPLAIN QUERY PLAN que delatan un problema
+RECORRIDO_COMPLETO = re.compile(r'^SCAN (TABLE )?(?P<tabla>\w+)( AS \w+)?$')
+ORDEN_EN_MEMORIA = 'USE TEMP B-TREE FOR ORDER BY'
+
+# Los perfiles que guarde PerfiladorMiddleware durante las pruebas van a un
+# directorio temporal, no al buffer real (BASE_DIR/perfiles)
+_perfiles = override_settings(TIENDA_PERFIL_DIR=tempfile.mkdtemp(prefix='tienda-perfiles-'))
+
+
+def setUpModule():
+    _perfiles.enable()
+
+
+def tearDownModule():
+    _perfiles.disable()
+    shutil.rmtree(_perfiles.options['TIENDA_PERFIL_DIR'], ignore_errors=True)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es propio de SQLite')
+class PlanesDeConsultaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=cls.usuario, rol='gerente')
+        vendedores = User.objects.bulk_create([User(username=f'vendedor{i}') for i in range(20)])
+
+        categorias = Categoria.objects.bulk_create(
+            [Categoria(nombre=f'Categoría {i}', stock_minimo=10, activo=i % 10 != 0) for i in range(20)]
+        )
+        proveedores = Proveedor.objects.bulk_create(
+            [Proveedor(nombre=f'Contacto {i}', empresa=f'Empresa {i}', activo=i % 5 != 0) for i in range(10)]
+        )
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Producto {i}', descripcion='Descripción', precio_venta=Decimal('9.99'),
+                stock=i % 40, categoria=categorias[i % 20], proveedor=proveedores[i % 10],
+                activo=i % 7 != 0, requiere_reorden=i % 50 == 0,  # Pocos productos por reordenar, como en la tienda
+            )
+            for i in range(500)
+        ])
+        Cliente.objects.bulk_create([
+            Cliente(nombre=f'Nombre {i}', apellido=f'Apellido {i % 50}', email=f'cliente{i}@ejemplo.com',
+                    telefono='5550000', direccion='Calle 1', activo=i % 9 != 0)
+            for i in range(300)
+        ])
+        # bulk_create: sin pasar por Venta.save() (el resumen diario no hace falta aquí)
+        ahora = timezone.now()
+        ventas = Venta.objects.bulk_create([
+            Venta(total=Decimal('100.00'), vendido_por=vendedores[i % 20]) for i in range(500)
+        ])
+        for i, venta in enumerate(ventas):
+            venta.fecha_venta = ahora - datetime.timedelta(hours=i)
+        Venta.objects.bulk_update(ventas, ['fecha_venta'])
+
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    # ---------- Utilidades ----------
+    def consultas(self, url):
+        """SELECT ejecutadas al abrir `url` (incluye las de respuestas en streaming)"""
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200, url)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        return [q['sql'] for q in capturadas.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+
+    @staticmethod
+    def tabla_principal(sql):
+        """Tabla del FROM externo (ignora los FROM de subconsultas entre paréntesis)"""
+        profundidad = 0
+        for i, caracter in enumerate(sql):
+            if caracter == '(':
+                profundidad += 1
+            elif caracter == ')':
+                profundidad -= 1
+            elif profundidad == 0 and sql.startswith(' FROM "', i):
+                return sql[i + 7:sql.index('"', i + 7)]
+        return None
+
+    def consulta_principal(self, url, tabla):
+        for sql in self.consultas(url):
+            if self.tabla_principal(sql) == tabla:
+                return sql
+        self.fail(f'{url} no consultó {tabla}')
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [fila[-1] for fila in cursor.fetchall()]
+
+    def assertUsaIndices(self, url, tabla):
+        sql = self.consulta_principal(url, tabla)
+        plan = self.plan(sql)
+        detalle = '\n'.join(plan)
+        for linea in plan:
+            self.assertIsNone(RECORRIDO_COMPLETO.match(linea),
+                              f'Recorrido completo en {url}:\n{detalle}\n\n{sql}')
+            self.assertNotIn(ORDEN_EN_MEMORIA, linea, f'Orden en memoria en {url}:\n{detalle}\n\n{sql}')
+        return plan
+
+    # ---------- Vistas ----------
+    def test_lista_de_productos_recientes(self):
+        self.assertUsaIndices(reverse('producto_lista'), 'tienda_producto')
+
+    def test_lista_de_productos_antiguos(self):
+        self.assertUsaIndices(reverse('producto_lista') + '?orden=antiguos', 'tienda_producto')
+
+    def test_lista_de_productos_segunda_pagina(self):
+        pagina = self.client.get(reverse('producto_lista')).context['pagina']
+        self.assertTrue(pagina.tiene_siguiente)
+        self.assertUsaIndices(reverse('producto_lista') + f'?cursor={pagina.siguiente}', 'tienda_producto')
+
+    def test_lista_de_reorden(self):
+        plan = self.assertUsaIndices(reverse('reorden_lista'), 'tienda_producto')
+        self.assertTrue(any('producto_reorden_idx' in linea for linea in plan), plan)
+
+    def test_lista_de_clientes(self):
+        self.assertUsaIndices(reverse('cliente_lista'), 'tienda_cliente')
+
+    def test_lista_de_categorias(self):
+        self.assertUsaIndices(reverse('categoria_lista'), 'tienda_categoria')
+
+    def test_lista_de_proveedores(self):
+        plan = self.assertUsaIndices(reverse('proveedor_lista'), 'tienda_proveedor')
+        self.assertTrue(any('proveedor_activo_idx' in linea for linea in plan), plan)
+
+    def test_exportar_ventas_por_fecha(self):
+        hoy = timezone.localdate().isoformat()
+        self.assertUsaIndices(reverse('venta_exportar') + f'?desde={hoy}&hasta={hoy}', 'tienda_venta')
+
+    def test_exportar_ventas_de_un_vendedor(self):
+        hoy = timezone.localdate().isoformat()
+        vendedor = User.objects.get(username='vendedor3')
+        url = reverse('venta_exportar') + f'?desde={hoy}&hasta={hoy}&vendedor={vendedor.pk}'
+        plan = self.assertUsaIndices(url, 'tienda_venta')
+        self.assertTrue(any('venta_vendedor_fecha_idx' in linea for linea in plan), plan)
+
+
+# ============ SESIONES ============
+# TransactionTestCase: las vistas async consultan desde otros hilos (otras conexiones),
+# que no verían los datos de la transacción abierta de un TestCase
+@override_settings(SESSION_ENGINE='tienda.sesiones', TIENDA_SESION_CACHE_TTL=60)
+class SesionesTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=self.usuario, rol='gerente')
+        self.client.force_login(self.usuario)
+
+    def segundos_en_cache(self):
+        """Segundos que le quedan a la copia en caché de la sesión del cliente"""
+        sesiones = caches['sesiones']
+        llave = sesiones.make_key('tienda:sesion:' + self.client.session.session_key)
+        return sesiones._expire_info[llave] - time.time()
+
+    def assertTtlAcotado(self, url):
+        caches['sesiones'].clear()
+        self.assertEqual(self.client.get(url).status_code, 200, url)
+        self.assertLessEqual(self.segundos_en_cache(), 60, url)
+
+    def test_vista_sincrona(self):
+        self.assertTtlAcotado(reverse('producto_lista'))
+
+    def test_vistas_async(self):
+        # request.auser() lee la sesión con aload(): debe respetar el mismo TTL
+        self.assertTtlAcotado(reverse('home'))
+        self.assertTtlAcotado(reverse('reportes'))
+
+    def test_cerrar_sesion_invalida_la_copia_de_otros_workers(self):
+        llave = self.client.session.session_key
+        self.assertEqual(self.client.get(reverse('producto_lista')).status_code, 200)
+        sesiones = caches['sesiones']
+        copia_local = sesiones.get('tienda:sesion:' + llave)
+        self.client.get(reverse('logout'))
+        # Otro worker conserva su copia local de la sesión cerrada
+        sesiones.set('tienda:sesion:' + llave, copia_local)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = llave
+        respuesta = self.client.get(reverse('producto_lista'))
+        self.assertRedirects(respuesta, reverse('login') + '?next=' + reverse('producto_lista'),
+                             fetch_redirect_response=False)
+        self.assertIsNone(sesiones.get('tienda:sesion:' + llave))  # Descartada al ver la marca
+
+    def test_con_sesion_abierta_la_copia_sirve(self):
+        self.client.get(reverse('producto_lista'))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertIn('_auth_user_id', self.client.session.load())
+        # Solo se busca la marca en la caché compartida; django_session no se lee
+        self.assertEqual([c['sql'].split(' FROM ')[1].split()[0] for c in consultas], ['"tienda_cache_acceso"'])
+
+
+# ============ VERSIONES (ETag) ============
+class VersionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=cls.usuario, rol='gerente')
+        cls.categoria = Categoria.objects.create(nombre='Hogar')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def etag(self, url):
+        return self.client.get(url)['ETag']
+
+    def test_304_sin_cambios(self):
+        url = reverse('categoria_lista')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=self.etag(url)).status_code, 304)
+
+    def test_cambio_de_otro_proceso(self):
+        # Otro worker o un comando no comparten la caché local: la versión está en la base
+        url = reverse('categoria_lista')
+        etag = self.etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre='Jardín')
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ============ ADMIN ============
+class AdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='prueba')
+        cls.categoria = Categoria.objects.create(nombre='Hogar')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.producto = Producto.objects.create(nombre='Silla', descripcion='x', precio_venta=Decimal('10'),
+                                                stock=5, categoria=self.categoria, creado_por=self.usuario)
+
+    def datos_producto(self, **cambios):
+        datos = {'nombre': 'Silla', 'descripcion': 'x', 'precio_venta': '10', 'stock': '5', 'initial-stock': '5',
+                 'categoria': self.categoria.pk, 'proveedor': '', 'creado_por': self.usuario.pk,
+                 'activo': 'on', 'stock_minimo': '', '_save': 'Guardar'}
+        datos.update(cambios)
+        return datos
+
+    def test_ajuste_que_dejaria_stock_negativo(self):
+        # El usuario vio 10 y capturó 0, pero mientras tanto quedaron 5: se guarda sin tocar el stock
+        url = reverse('admin:tienda_producto_change', args=[self.producto.pk])
+        respuesta = self.client.post(url, self.datos_producto(nombre='Silla roja', stock='0', **{'initial-stock': '10'}))
+        self.assertEqual(respuesta.status_code, 302)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.nombre, self.producto.stock), ('Silla roja', 5))
+
+    def test_producto_de_categoria_desactivada(self):
+        Categoria._base_manager.filter(pk=self.categoria.pk).update(activo=False)
+        url = reverse('admin:tienda_producto_change', args=[self.producto.pk])
+        self.assertEqual(self.client.post(url, self.datos_producto(nombre='Silla roja')).status_code, 302)
+        self.assertEqual(Producto._base_manager.get(pk=self.producto.pk).nombre, 'Silla roja')
+
+    def test_desactivar_categoria_desde_el_formulario(self):
+        url = reverse('admin:tienda_categoria_change', args=[self.categoria.pk])
+        respuesta = self.client.post(url, {'nombre': 'Hogar', 'descripcion': '', 'stock_minimo': '10', '_save': 'Guardar'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(Producto._base_manager.get(pk=self.producto.pk).activo)
+
+    def test_sin_borrado_masivo(self):
+        for modelo in (Producto, Categoria, Proveedor, Cliente):
+            respuesta = self.client.get(reverse(f'admin:tienda_{modelo._meta.model_name}_changelist'))
+            acciones = [nombre for nombre, _ in respuesta.context['action_form'].fields['action'].choices]
+            self.assertIn('desactivar', acciones)
+            self.assertNotIn('delete_selected', acciones)
+
+
+# ============ API POR LOTES ============
+class ApiLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = {}
+        for rol in ('vendedor', 'gerente', 'administrador'):
+            cls.usuarios[rol] = User.objects.create_user(rol, password='prueba')
+            PerfilUsuario.objects.create(user=cls.usuarios[rol], rol=rol)
+        cls.categoria = Categoria.objects.create(nombre='Hogar')
+        cls.producto = Producto.objects.create(nombre='Silla', descripcion='x', precio_venta=Decimal('10'),
+                                               stock=50, categoria=cls.categoria)
+        cls.cliente = Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com')
+        cls.inactivo = Cliente.objects.create(nombre='Luis', apellido='Paz', email='luis@example.com', activo=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def lote(self, recurso, cuerpo, rol='administrador'):
+        self.client.force_login(self.usuarios[rol])
+        return self.client.post(reverse('api_lote', args=[recurso]), cuerpo, content_type='application/json')
+
+    def indices(self, respuesta):
+        return [(e['operacion'], e['indice']) for e in respuesta.json()['errores']]
+
+    def test_errores_por_renglon_y_nada_aplicado(self):
+        respuesta = self.lote('categorias', {
+            'crear': [{'nombre': 'Jardín', 'stock_minimo': 5}, {'descripcion': 'sin nombre', 'stock_minimo': 5}],
+            'actualizar': [{'id': self.categoria.pk, 'nombre': 'Casa'}, {'id': 999999, 'nombre': 'X'}],
+            'eliminar': [999999],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.indices(respuesta), [('crear', 1), ('actualizar', 1), ('eliminar', 0)])
+        self.assertFalse(Categoria.objects.filter(nombre__in=['Jardín', 'Casa']).exists())
+
+    def test_ids_que_no_son_enteros(self):
+        respuesta = self.lote('categorias', {'actualizar': [{'id': [1]}, {'id': True}, 'x'],
+                                             'eliminar': [[1], {'id': 1}, '1']})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.indices(respuesta), [('actualizar', 0), ('actualizar', 1), ('actualizar', 2),
+                                                   ('eliminar', 0), ('eliminar', 1), ('eliminar', 2)])
+
+    def test_ventas_con_clientes_invalidos(self):
+        lineas = [[self.producto.pk, 1]]
+        respuesta = self.lote('ventas', {'crear': [
+            {'lineas': lineas, 'cliente': self.cliente.pk},
+            {'lineas': lineas, 'cliente': 999999},
+            {'lineas': lineas, 'cliente': self.inactivo.pk},
+            {'lineas': lineas, 'cliente': [1]},
+        ]}, rol='vendedor')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.indices(respuesta), [('crear', 1), ('crear', 2), ('crear', 3)])
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock, 50)
+
+    def test_ventas_validas(self):
+        respuesta = self.lote('ventas', {'crear': [{'lineas': [[self.producto.pk, 2]], 'cliente': self.cliente.pk},
+                                                   {'lineas': [[self.producto.pk, 1]]}]}, rol='vendedor')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['creados']), 2)
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock, 47)
+
+    def test_ventas_no_se_eliminan(self):
+        self.lote('ventas', {'crear': [{'lineas': [[self.producto.pk, 2]]}]}, rol='vendedor')
+        venta = Venta.objects.get()
+        self.assertEqual(self.lote('ventas', {'eliminar': [venta.pk]}).status_code, 405)
+        self.assertEqual(self.client.delete(reverse('api_detalle', args=['ventas', venta.pk])).status_code, 405)
+        self.assertTrue(Venta.objects.filter(pk=venta.pk).exists())
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock, 48)
+
+    def test_roles(self):
+        self.assertEqual(self.lote('productos', {'crear': []}, rol='vendedor').status_code, 403)
+        # Eliminar en lote exige además el rol de eliminación
+        self.assertEqual(self.lote('clientes', {'eliminar': [self.cliente.pk]}, rol='gerente').status_code, 403)
+        respuesta = self.lote('clientes', {'eliminar': [self.cliente.pk]})
+        self.assertEqual((respuesta.status_code, respuesta.json()['eliminados']), (200, [self.cliente.pk]))
+        self.assertFalse(Cliente.objects.filter(pk=self.cliente.pk).exists())  # Eliminación lógica
+
+    def test_etag_304_y_412(self):
+        self.client.force_login(self.usuarios['administrador'])
+        url = reverse('api_detalle', args=['categorias', self.categoria.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.patch(url, {'nombre': 'Casa'}, content_type='application/json')
+        respuesta = self.client.patch(url, {'nombre': 'Otra'}, content_type='application/json', HTTP_IF_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 412)
+        self.assertEqual(Categoria.objects.get(pk=self.categoria.pk).nombre, 'Casa')
+
+
+# ============ RESUMEN DIARIO ============
+class ResumenDiarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = User.objects.create_user('vendedor', password='prueba')
+        cls.cliente = Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com')
+
+    def assertResumenCuadra(self):
+        """Una fila por grupo, y cada una suma exactamente las ventas de su grupo"""
+        grupos = {}
+        for venta in Venta.objects.all():
+            clave = (timezone.localdate(venta.fecha_venta), venta.vendido_por_id, venta.cliente_id)
+            grupos.setdefault(clave, []).append(venta.total)
+        filas = {(f.fecha, f.vendedor_id, f.cliente_id): (f.num_ventas, f.total, f.minimo, f.maximo)
+                 for f in VentaDiaria.objects.all()}
+        self.assertEqual(VentaDiaria.objects.count(), len(grupos))
+        self.assertEqual(filas, {clave: (len(t), sum(t), min(t), max(t)) for clave, t in grupos.items()})
+
+    def test_ventas_sin_vendedor_ni_cliente_en_un_solo_grupo(self):
+        for total, vendedor, cliente in [('10', None, None), ('5', None, None), ('7', self.vendedor, None),
+                                         ('3', self.vendedor, self.cliente), ('8', None, None)]:
+            Venta.objects.create(total=Decimal(total), vendido_por=vendedor, cliente=cliente)
+        self.assertResumenCuadra()
+        venta = Venta.objects.filter(vendido_por=None).first()
+        venta.cliente = self.cliente
+        venta.save()  # Cambia de grupo: se recalculan los dos
+        self.assertResumenCuadra()
+
+    def test_grupo_repetido_viola_la_restriccion(self):
+        VentaDiaria.objects.create(fecha=timezone.localdate())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VentaDiaria.objects.create(fecha=timezone.localdate())
+
+    def test_grupo_existente_se_suma_en_una_sentencia(self):
+        # Otra caja ya creó el grupo: la venta se suma con el mismo INSERT, sin UPDATE previo
+        VentaDiaria.objects.create(fecha=timezone.localdate(), num_ventas=1, total=Decimal('4'),
+                                   minimo=Decimal('4'), maximo=Decimal('4'))
+        with CaptureQueriesContext(connection) as consultas:
+            Venta.objects.create(total=Decimal('6'))
+        resumen = [c['sql'] for c in consultas if VentaDiaria._meta.db_table in c['sql']]
+        self.assertEqual(len(resumen), 1)
+        self.assertTrue(resumen[0].startswith('INSERT'))
+        fila = VentaDiaria.objects.get()
+        self.assertEqual((fila.num_ventas, fila.total, fila.minimo, fila.maximo),
+                         (2, Decimal('10'), Decimal('4'), Decimal('6')))
+
+
+# ============ REPORTES ============
+# TransactionTestCase: la vista de reportes es async (consultas desde otros hilos)
+class ReportesTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=self.usuario, rol='gerente')
+        self.client.force_login(self.usuario)
+
+    def test_fechas_extremas(self):
+        for parametros in ({'hasta': '9999-12-31'}, {'desde': '0001-01-01'},
+                           {'desde': '0001-01-01', 'hasta': '9999-12-31'}):
+            self.assertEqual(self.client.get(reverse('reportes'), parametros).status_code, 200, parametros)
+            self.assertEqual(self.client.get(reverse('venta_exportar'), parametros).status_code, 200, parametros)
+
+    def test_comparacion_sin_periodo_anterior_completo(self):
+        desde, hasta = datetime.date(1, 1, 10), datetime.date(1, 1, 30)
+        self.assertEqual(reportes.comparar_con_anterior(desde, hasta)['anterior_desde'], datetime.date.min)
+
+    def test_la_version_es_compartida_por_los_workers(self):
+        ayer = timezone.localdate() - datetime.timedelta(days=1)
+        desde = ayer - datetime.timedelta(days=6)
+        self.assertEqual(reportes.comparar_con_anterior(desde, ayer)['actual']['num_ventas'], 0)
+        VentaDiaria.objects.create(fecha=ayer - datetime.timedelta(days=1), vendedor=self.usuario,
+                                   vendedor_clave=self.usuario.pk, num_ventas=2,
+                                   total=Decimal('30.00'), minimo=Decimal('10.00'), maximo=Decimal('20.00'))
+        self.assertEqual(reportes.comparar_con_anterior(desde, ayer)['actual']['num_ventas'], 0)  # Cacheado
+        # Otro worker (o un comando) invalida: su caché local no es esta, el contador sí
+        VersionTabla.objects.update_or_create(tabla=reportes.VERSION, defaults={'version': 99})
+        self.assertEqual(reportes.comparar_con_anterior(desde, ayer)['actual']['num_ventas'], 2)
+        resumenes.recalcular_grupo(ayer - datetime.timedelta(days=1), self.usuario.pk, None)  # Sin ventas: lo borra
+        self.assertEqual(reportes.comparar_con_anterior(desde, ayer)['actual']['num_ventas'], 0)
+
+
+# ============ LÍMITE DE INTENTOS DE LOGIN ============
+@override_settings(TIENDA_LOGIN_INTENTOS_USUARIO=3)
+class AccesoTests(TestCase):
+
+    def setUp(self):
+        caches['acceso'].clear()
+        User.objects.create_user('cajero', password='correcta')
+
+    def entrar(self, password):
+        return self.client.post(reverse('login'), {'username': 'cajero', 'password': password})
+
+    def test_bloqueo_compartido_entre_workers(self):
+        for _ in range(3):
+            self.assertEqual(self.entrar('incorrecta').status_code, 200)
+        # Los contadores no viven en la caché local de este proceso ('default')
+        cache.clear()
+        self.assertEqual(self.entrar('correcta').status_code, 429)
+        caches['acceso'].clear()
+        self.assertEqual(self.entrar('correcta').status_code, 302)
+
+
+# ============ BENCHMARK ============
+class CompararLineaBaseTests(SimpleTestCase):
+
+    @staticmethod
+    def metricas(estado='200', consultas=5):
+        return {'estado': estado, 'consultas': consultas, 'p95_ms': 10.0, 'memoria_kb': 100.0}
+
+    def test_estado_distinto_y_escenario_faltante(self):
+        base = {'resultados': {'home:gerente': self.metricas(), 'producto_lista:gerente': self.metricas(),
+                               'home:vendedor': self.metricas()}}
+        resultados = {'home:gerente': self.metricas(estado='200/500')}
+        regresiones = benchmark.comparar(resultados, base, alcance=lambda clave: clave.endswith(':gerente'))
+        self.assertEqual(sorted(regresiones), [('home:gerente', 'estado', '200', '200/500'),
+                                               ('producto_lista:gerente', 'medición', '200', 'falta')])
+
+    def test_filtros_de_la_corrida(self):
+        self.assertFalse(benchmark.en_alcance('home:vendedor', roles=('gerente',)))
+        self.assertFalse(benchmark.en_alcance('home:gerente', solo='producto'))
+        self.assertFalse(benchmark.en_alcance('login_post:anonimo'))  # Sin --password no se mide
+        self.assertTrue(benchmark.en_alcance('login_post:anonimo', password='x'))
+        self.assertTrue(benchmark.en_alcance('escenario_renombrado:gerente'))
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for rol in benchmark.ROLES:
+            usuario = User.objects.create_user(f'bench_{rol}', password='x', is_staff=rol == 'administrador')
+            PerfilUsuario.objects.create(user=usuario, rol=rol)
+        categoria = Categoria.objects.create(nombre='Hogar')
+        Proveedor.objects.create(nombre='Luis', empresa='Muebles SA', telefono='1', email='luis@example.com',
+                                 direccion='Centro')
+        Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com')
+        cls.producto = Producto.objects.create(nombre='Silla', descripcion='x', precio_venta=Decimal('10'),
+                                               stock=50, categoria=categoria)
+
+    def test_escenarios_de_sesion_api_y_metricas(self):
+        escenarios = [e for e in benchmark.ESCENARIOS if e.nombre in ('logout', 'api_lote_ventas', 'metricas')]
+        resultados = benchmark.ejecutar(escenarios, repeticiones=2, calentamiento=1)
+        self.assertEqual({clave: m['estado'] for clave, m in resultados.items()}, {
+            **{f'logout:{rol}': '302' for rol in benchmark.ROLES},
+            **{f'api_lote_ventas:{rol}': '200' for rol in benchmark.ROLES},
+            'metricas:administrador': '200',
+        })
+        # Todo se revirtió y no quedan las sesiones de force_login
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock, 50)
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(Session.objects.exists())
+
+
+# ============ PROVISIÓN DE PERSONAL ============
+class PersonalTests(TestCase):
+
+    def leer(self, *filas):
+        errores = []
+        validos = personal.leer(enumerate(filas, start=1), lambda numero, mensaje: errores.append(numero))
+        return validos, errores
+
+    def test_campos_fuera_de_los_limites_del_modelo(self):
+        validos, errores = self.leer(
+            {'username': 'ana', 'email': 'no-es-email'},
+            {'username': 'luis', 'telefono': '5' * 16},
+            {'username': 'eva', 'departamento': 'x' * 101},
+            {'username': 'sol', 'nombre': 'x' * 151},
+            {'username': 'ok', 'email': 'ok@example.com', 'telefono': '5' * 15},
+        )
+        self.assertEqual(errores, [1, 2, 3, 4])
+        self.assertEqual([r.username for r in validos], ['ok'])
+
+    def test_usernames_sin_distinguir_mayusculas(self):
+        user = User.objects.create_user('Ana', password='x')
+        PerfilUsuario.objects.create(user=user, rol='vendedor')
+        validos, _ = self.leer({'username': 'ana', 'rol': 'gerente'})
+        plan = personal.planear(validos)
+        self.assertEqual((len(plan.nuevos), len(plan.cambios)), (0, 1))
+        personal.aplicar(plan, procesos=1)
+        self.assertEqual(PerfilUsuario.objects.get(user=user).rol, 'gerente')
+
+    def test_is_staff_sigue_al_rol(self):
+        vendedor = User.objects.create_user('vendedor1', password='x')
+        PerfilUsuario.objects.create(user=vendedor, rol='vendedor')
+        admin = User.objects.create_user('admin1', password='x', is_staff=True)
+        PerfilUsuario.objects.create(user=admin, rol='administrador')
+        sin_perfil = User.objects.create_user('suelto', password='x')
+        jefe = User.objects.create_superuser('jefe', password='x')
+        PerfilUsuario.objects.create(user=jefe, rol='administrador')
+        validos, _ = self.leer({'username': 'vendedor1', 'rol': 'administrador'},
+                               {'username': 'admin1', 'rol': 'gerente'},
+                               {'username': 'suelto', 'rol': 'administrador'},
+                               {'username': 'jefe', 'rol': 'gerente'},
+                               {'username': 'nuevo', 'rol': 'administrador', 'password': 'x'})
+        personal.aplicar(personal.planear(validos), procesos=1)
+        staff = dict(User.objects.values_list('username', 'is_staff'))
+        self.assertEqual(staff, {'vendedor1': True, 'admin1': False, 'suelto': True, 'jefe': True, 'nuevo': True})
+
+
+# ============ BÚSQUEDA DE PRODUCTOS ============
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=cls.usuario, rol='gerente')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        categoria = Categoria.objects.create(nombre='Hogar')
+        with self.captureOnCommitCallbacks(execute=True):  # El índice se actualiza al confirmar
+            # Los desactivados primero: empatan en relevancia y ganarían por id
+            for i in range(3):
+                Producto.objects.create(nombre=f'Silla vieja {i}', descripcion='x', precio_venta=Decimal('10'),
+                                        categoria=categoria, activo=False)
+            self.activos = [
+                Producto.objects.create(nombre=f'Silla nueva {i}', descripcion='x', precio_venta=Decimal('10'),
+                                        categoria=categoria).pk
+                for i in range(5)
+            ]
+
+    def pagina(self, numero):
+        return self.client.get(reverse('producto_lista'), {'q': 'silla', 'por_pagina': 2, 'pagina': numero})
+
+    def test_paginas_sin_desactivados(self):
+        vistos = []
+        for numero in (1, 2, 3):
+            respuesta = self.pagina(numero)
+            productos = list(respuesta.context['productos'])
+            self.assertEqual(len(productos), 2 if numero < 3 else 1)
+            self.assertEqual(respuesta.context['hay_siguiente'], numero < 3)
+            vistos.extend(p.pk for p in productos)
+        self.assertEqual(sorted(vistos), self.activos)
+
+    def test_navegacion_conserva_la_busqueda(self):
+        contenido = self.pagina(2).content.decode()
+        self.assertIn('?q=silla&pagina=1&', contenido)
+        self.assertIn('?q=silla&pagina=3&', contenido)
+
+
+# ============ MÉTRICAS ============
+class MetricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.cajero = User.objects.create_user('cajero', password='x')
+
+    def setUp(self):
+        metricas.registro.limpiar()
+        self.addCleanup(metricas.registro.limpiar)
+
+    def test_histograma_acumulativo(self):
+        registro = metricas.Registro()
+        for valor in (1, 2, 2.5, 1000):
+            registro.observar('a"b', {'tienda_peticion_consultas': valor})
+        lineas = registro.texto_prometheus().splitlines()
+        self.assertIn('tienda_peticion_consultas_bucket{vista="a\\"b",le="1"} 1', lineas)  # le incluye el límite
+        self.assertIn('tienda_peticion_consultas_bucket{vista="a\\"b",le="3"} 3', lineas)
+        self.assertIn('tienda_peticion_consultas_bucket{vista="a\\"b",le="+Inf"} 4', lineas)
+        self.assertIn('tienda_peticion_consultas_sum{vista="a\\"b"} 1005.500000', lineas)
+        self.assertIn('tienda_peticion_consultas_count{vista="a\\"b"} 4', lineas)
+        self.assertIn('# TYPE tienda_peticion_segundos histogram', lineas)  # Aunque no tenga observaciones
+
+    def test_middleware_agrupa_por_vista(self):
+        self.client.force_login(self.cajero)
+        self.client.get(reverse('producto_lista'))
+        self.client.get(reverse('producto_lista'))
+        self.client.get('/no-existe/')
+        self.client.force_login(self.staff)
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('tienda_peticion_segundos_count{vista="producto_lista"} 2', texto)
+        self.assertIn(f'tienda_peticion_segundos_count{{vista="{metricas.SIN_RUTA}"}} 1', texto)
+        self.assertNotIn('vista="metricas"', texto)  # Raspar no cuenta como tráfico
+        for metrica in ('tienda_peticion_consultas', 'tienda_peticion_plantillas_segundos'):
+            self.assertGreater(metricas.registro._histogramas[(metrica, 'producto_lista')].suma, 0, metrica)
+
+    @override_settings(TIENDA_METRICAS_TOKEN='s3creto')
+    def test_endpoint_solo_staff_o_token(self):
+        url = reverse('metricas')
+        respuesta = self.client.get(url)
+        self.assertEqual((respuesta.status_code, respuesta['WWW-Authenticate']), (401, 'Bearer'))
+        self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer otro'}).status_code, 401)
+        respuesta = self.client.get(url, headers={'Authorization': 'Bearer s3creto'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.client.force_login(self.cajero)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_server_timing_opcional(self):
+        self.client.force_login(self.cajero)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('producto_lista')).headers)
+        with override_settings(TIENDA_SERVER_TIMING=True):
+            self.client.handler.load_middleware()  # El middleware lee el ajuste al crearse
+            encabezado = self.client.get(reverse('producto_lista'))['Server-Timing']
+        self.assertRegex(encabezado, r'^sql;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+;desc="plantillas", '
+                                     r'total;dur=[\d.]+$')
+
+
+class PerfiladoTests(TestCase):
+    """Perfiles de peticiones: sin valores de parámetros y visibles solo para superusuarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.admin = User.objects.create_superuser('raiz', password='x')
+
+    def test_perfil_sin_parametros_sql(self):
+        with override_settings(TIENDA_PERFIL_FRACCION=1):
+            self.client.post(reverse('login'), {'username': 'staff', 'password': 'secreto-visible'})
+        perfil = perfilado.cargar(max(p['nombre'] for p in perfilado.recientes()))
+        texto = json.dumps(perfil)
+        self.assertIn('auth_user', texto)
+        self.assertNotIn("'staff'", texto)
+        self.assertNotIn('secreto-visible', texto)
+        self.assertTrue(all(set(g) == {'sql', 'veces', 'ms', 'variantes', 'duplicadas'} for g in perfil['sql']))
+        # Tampoco en memoria mientras dura la petición
+        peticion = perfilado._Peticion(muestreador=None)
+        peticion(lambda *args: None, 'SELECT %s', ('sesion-secreta',), False, {})
+        self.assertNotIn('sesion-secreta', repr(peticion.consultas))
+
+    def test_resumen_cuenta_variantes_y_duplicadas(self):
+        consultas = [('SELECT %s', hash(repr((1,))), 0.001), ('SELECT %s', hash(repr((1,))), 0.001),
+                     ('SELECT %s', hash(repr((2,))), 0.001)]
+        grupo, = perfilado.resumen_sql(consultas)
+        self.assertEqual((grupo['veces'], grupo['variantes'], grupo['duplicadas']), (3, 2, 1))
+
+    def test_buffer_circular_conserva_los_mas_recientes(self):
+        carpeta = tempfile.mkdtemp(prefix='tienda-perfiles-')
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        with override_settings(TIENDA_PERFIL_DIR=carpeta, TIENDA_PERFIL_MAX=3):
+            nombres = [perfilado.guardar({'ms': i, 'pilas': {}, 'sql': []}) for i in range(5)]
+            self.assertEqual(sorted(os.listdir(carpeta)), [n + perfilado.EXTENSION for n in nombres[2:]])
+            self.assertEqual([p['ms'] for p in perfilado.recientes()], [4, 3, 2])  # Los más lentos primero
+
+    def test_nombre_de_la_url_no_es_una_ruta(self):
+        for nombre in ('', '../settings', 'a.json', '..', '1/2'):
+            with self.subTest(nombre=nombre), self.assertRaises(FileNotFoundError):
+                perfilado.cargar(nombre)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('perfil_detalle', args=['..%2Fsettings'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('perfil_detalle', args=['123-4'])).status_code, 404)
+
+    @override_settings(TIENDA_PERFIL_FRACCION=0, TIENDA_PERFIL_UMBRAL_MS=30, TIENDA_PERFIL_INTERVALO_MS=1)
+    def test_guarda_solo_las_lentas_con_sus_pilas(self):
+        def vista_lenta(request):
+            time.sleep(0.05)
+            return HttpResponse()
+
+        antes = len(perfilado.recientes())
+        perfilado.PerfiladorMiddleware(lambda request: HttpResponse())(RequestFactory().get('/rapida/'))
+        self.assertEqual(len(perfilado.recientes()), antes)
+        perfilado.PerfiladorMiddleware(vista_lenta)(RequestFactory().get('/lenta/'))
+        perfil = perfilado.cargar(max(p['nombre'] for p in perfilado.recientes()))
+        self.assertEqual((perfil['ruta'], perfil['motivo']), ('/lenta/', 'lenta'))
+        self.assertGreater(perfil['muestras'], 0)
+        # La pila empieza debajo del middleware y termina en la vista
+        self.assertTrue(all(pila.split(';')[0] == 'tienda.tests:vista_lenta' for pila in perfil['pilas']),
+                        perfil['pilas'])
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('perfil_detalle', args=[perfil['nombre']]), {'formato': 'folded'})
+        self.assertEqual(respuesta.content.decode(), perfilado.colapsado(perfil))
+        self.assertRegex(respuesta.content.decode(), r'^tienda\.tests:vista_lenta\S* \d+\n')
+
+    @override_settings(TIENDA_PERFIL_FRACCION=0, TIENDA_PERFIL_UMBRAL_MS=None)
+    def test_se_desactiva_sin_fraccion_ni_umbral(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            perfilado.PerfiladorMiddleware(lambda request: HttpResponse())
+
+    def test_perfiles_solo_superusuarios(self):
+        self.client.force_login(self.staff)
+        self.assertRedirects(self.client.get(reverse('perfiles_lista')),
+                             reverse('login') + '?next=' + reverse('perfiles_lista'), fetch_redirect_response=False)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('perfiles_lista')).status_code, 200)
+
+
+# ============ HASH DE CONTRASEÑAS EN PARALELO ============
+# MD5 solo para que las pruebas no tarden lo que tarda PBKDF2
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher',
+                                     'django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+class HashingTests(SimpleTestCase):
+
+    def test_hashes_en_el_mismo_orden(self):
+        passwords = [f'clave-{i}' for i in range(hashing.LOTE_HASH * 2 + 3)]
+        for procesos in (1, 2):
+            with self.subTest(procesos=procesos):
+                avances = []
+                hashes = hashing.hashear(passwords, procesos=procesos, progreso=lambda h, t, s: avances.append((h, t)))
+                self.assertEqual(len(hashes), len(passwords))
+                self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+                self.assertEqual(len(set(hashes)), len(hashes))  # Cada uno con su sal
+                total = len(passwords)
+                self.assertEqual(avances, [(hashing.LOTE_HASH, total), (hashing.LOTE_HASH * 2, total), (total, total)])
+        self.assertEqual(hashing.hashear([]), [])
+
+    def test_hash_desactualizado(self):
+        self.assertFalse(hashing.hash_desactualizado(make_password('x')))
+        self.assertTrue(hashing.hash_desactualizado(PBKDF2PasswordHasher().encode('x', 'sal', iterations=1)))
+        self.assertTrue(hashing.hash_desactualizado('formato-desconocido'))
+        self.assertFalse(hashing.hash_desactualizado(make_password(None)))  # Inutilizable: no cuenta
+        self.assertFalse(hashing.hash_desactualizado(''))
+
+    def test_credenciales_solo_para_el_dueno(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta)
+        ruta = os.path.join(carpeta, 'credenciales.csv')
+        with open(ruta, 'w') as archivo:
+            archivo.write('contenido anterior, más largo que el nuevo\n' * 10)
+        os.chmod(ruta, 0o644)
+        hashing.escribir_credenciales(ruta, [('ana', 'temporal-1')])
+        self.assertEqual(os.stat(ruta).st_mode & 0o777, 0o600)
+        with open(ruta, encoding='utf-8', newline='') as archivo:
+            self.assertEqual(archivo.read(), 'username,password\r\nana,temporal-1\r\n')  # Sin restos del anterior
+
+
+# ============ MIDDLEWARES BAJO ASGI ============
+# TransactionTestCase: home consulta desde los hilos del pool (asincrono.en_paralelo)
+@override_settings(TIENDA_PERFIL_FRACCION=1)
+class MiddlewaresAsyncTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        metricas.registro.limpiar()
+        self.usuario = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=self.usuario, rol='gerente')
+
+    def ultimo_perfil(self):
+        return perfilado.cargar(max(p['nombre'] for p in perfilado.recientes()))
+
+    def test_middlewares_async_sin_adaptar(self):
+        # Con un siguiente async, Django no los envuelve en async_to_sync (un hilo por petición)
+        async def siguiente(request):
+            pass
+
+        for clase in (metricas.MetricasMiddleware, perfilado.PerfiladorMiddleware, RolUsuarioMiddleware):
+            self.assertTrue(clase.async_capable and iscoroutinefunction(clase(siguiente)), clase.__name__)
+
+    async def test_cadena_async_mide_el_sql_del_hilo_sincrono(self):
+        # AsyncClient arma la cadena de middlewares en modo async, como ASGIHandler
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('producto_lista'))
+        self.assertEqual(respuesta.status_code, 200)
+        consultas = metricas.registro._histogramas[('tienda_peticion_consultas', 'producto_lista')]
+        self.assertEqual(consultas.cuenta, 1)
+        self.assertGreater(consultas.suma, 0)
+        perfil = await sync_to_async(self.ultimo_perfil)()
+        self.assertEqual((perfil['vista'], perfil['usuario']), ('producto_lista', 'gerente'))
+        self.assertGreater(perfil['consultas'], 0)
+
+    def test_perfil_incluye_el_sql_de_los_hilos_del_pool(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        tabla = Producto._meta.db_table
+        self.assertTrue(any(g['sql'].startswith('SELECT COUNT(*)') and tabla in g['sql']
+                            for g in self.ultimo_perfil()['sql']))
+
+
+# ============ VISTAS ASYNC ============
+class VistasAsyncTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.gerente = User.objects.create_user('gerente', password='prueba')
+        PerfilUsuario.objects.create(user=self.gerente, rol='gerente')
+        self.vendedor = User.objects.create_user('caja1', password='prueba')
+        PerfilUsuario.objects.create(user=self.vendedor, rol='vendedor')
+
+    async def test_en_paralelo_corre_las_funciones_a_la_vez(self):
+        barrera = threading.Barrier(3, timeout=5)  # Solo pasa si las tres esperan al mismo tiempo
+
+        def contar():
+            barrera.wait()
+            return User.objects.count()  # Cada hilo con su propia conexión
+
+        def hilo():
+            barrera.wait()
+            return threading.get_ident()
+
+        resultados = await asincrono.en_paralelo(usuarios=contar, a=hilo, b=hilo)
+        self.assertEqual(list(resultados), ['usuarios', 'a', 'b'])
+        self.assertEqual(resultados['usuarios'], 2)
+        self.assertNotEqual(resultados['a'], resultados['b'])
+        with self.assertRaises(ZeroDivisionError):
+            await asincrono.en_paralelo(bien=lambda: 1, mal=lambda: 1 / 0)
+
+    async def test_reportes_calcula_los_cuatro_a_la_vez(self):
+        venta = await Venta.objects.acreate(total=Decimal('40.00'), vendido_por=self.gerente)
+        await self.async_client.aforce_login(self.gerente)
+        respuesta = await self.async_client.get(reverse('reportes'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([(f['vendedor__username'], f['total']) for f in respuesta.context['por_vendedor']],
+                         [('gerente', venta.total)])
+        self.assertEqual(respuesta.context['comparacion']['actual']['total'], venta.total)
+
+        await self.async_client.aforce_login(self.vendedor)  # rol_requerido en su versión async
+        self.assertRedirects(await self.async_client.get(reverse('reportes')), reverse('home'),
+                             fetch_redirect_response=False)
+
+    async def test_home_async_responde_304_si_nada_cambio(self):
+        await self.async_client.aforce_login(self.gerente)
+        respuesta = await self.async_client.get(reverse('home'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['total_productos'], 0)
+        etag = respuesta['ETag']
+        self.assertEqual((await self.async_client.get(reverse('home'), headers={'If-None-Match': etag})).status_code,
+                         304)
+
+
+# ============ INVENTARIO ============
+class InventarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Abarrotes', stock_minimo=3)
+        cls.producto = Producto.objects.create(nombre='Arroz', descripcion='1 kg', precio_venta=Decimal('20'),
+                                               stock=2, categoria=categoria)
+        cls.otro = Producto.objects.create(nombre='Frijol', descripcion='1 kg', precio_venta=Decimal('25'),
+                                           stock=0, categoria=categoria)
+
+    def stock(self, producto):
+        return Producto._base_manager.values_list('stock', flat=True).get(pk=producto.pk)
+
+    def test_producto_inexistente_no_es_falta_de_stock(self):
+        with self.assertRaises(inventario.ProductoInexistente), transaction.atomic():
+            inventario.aplicar_deltas({999999: 1})
+        with self.assertRaises(inventario.SinStock), transaction.atomic():
+            inventario.aplicar_deltas({self.producto.pk: -5})
+
+    def test_cargar_lecturas_conserva_las_validas(self):
+        a, b = self.producto.pk, self.otro.pk
+        lecturas = f'{a},5\n{b},5\n999999,1\n{a},2\n{b},-9,ajuste\nx\n'
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as archivo:
+            archivo.write(lecturas)
+        self.addCleanup(os.remove, archivo.name)
+        salida, errores = io.StringIO(), io.StringIO()
+        call_command('cargar_lecturas', archivo.name, stdout=salida, stderr=errores)
+        self.assertEqual((self.stock(self.producto), self.stock(self.otro)), (9, 5))
+        self.assertEqual(MovimientoInventario.objects.count(), 3)
+        self.assertIn('3 movimientos registrados, 3 líneas con error', salida.getvalue())
+        self.assertIn('Línea 3: No existe el producto 999999', errores.getvalue())
+        self.assertIn(f'Línea 5: Stock insuficiente para el producto {b}', errores.getvalue())
+
+    def test_buffer_escribe_al_vencer_el_intervalo(self):
+        buffer = inventario.BufferMovimientos(intervalo=60)
+        with mock.patch.object(buffer, 'vaciar') as vaciar, mock.patch.object(inventario, 'connection'):
+            buffer.agregar(self.producto.pk, 1, 'entrada')
+            self.assertIsNotNone(buffer._temporizador)
+            buffer._temporizador.cancel()
+            buffer._temporizador.function()  # Lo que haría el temporizador al vencer
+        vaciar.assert_called_once_with()
+
+    def test_buffer_escribe_un_update_por_producto(self):
+        producto = Producto._meta.db_table
+        movimientos = MovimientoInventario._meta.db_table
+        with CaptureQueriesContext(connection) as consultas, inventario.BufferMovimientos(intervalo=60) as buffer:
+            for _ in range(100):
+                buffer.agregar(self.producto.pk, 1, 'entrada')
+            buffer.agregar(self.otro.pk, 4, 'entrada')
+        self.assertEqual(buffer.escritos, 101)
+        sql = [c['sql'] for c in consultas]
+        self.assertEqual(len([c for c in sql if c.startswith(f'UPDATE "{producto}"')]), 2)
+        self.assertEqual(len([c for c in sql if c.startswith(f'INSERT INTO "{movimientos}"')]), 1)
+        self.assertEqual((self.stock(self.producto), self.stock(self.otro)), (102, 4))
+
+    def test_buffer_aparta_solo_las_lecturas_rechazadas(self):
+        buffer = inventario.BufferMovimientos(intervalo=60)
+        for referencia, (producto_id, cantidad) in enumerate(
+                [(self.producto.pk, -1), (self.otro.pk, -1), (self.producto.pk, -1), (self.producto.pk, -1),
+                 (999999, 1)], start=1):
+            buffer.agregar(producto_id, cantidad, 'ajuste', referencia=referencia)
+        self.assertEqual(buffer.vaciar(), 2)  # Las dos primeras salidas de arroz alcanzan; la tercera no
+        self.assertEqual([(ref, type(exc)) for ref, exc in buffer.rechazados],
+                         [(4, inventario.SinStock), (2, inventario.SinStock), (5, inventario.ProductoInexistente)])
+        self.assertEqual((self.stock(self.producto), self.stock(self.otro)), (0, 0))
+        self.assertEqual(len(buffer), 0)
+
+    def test_stock_a_fecha_con_y_sin_snapshot(self):
+        ahora = timezone.now()
+        dias = lambda n: ahora - datetime.timedelta(days=n)
+        pk = self.producto.pk
+        inventario.registrar_movimientos([MovimientoInventario(producto_id=pk, tipo='entrada', cantidad=5,
+                                                               fecha=dias(3))])
+        inventario.tomar_snapshot(fecha=dias(2))  # Stock 7
+        inventario.registrar_movimientos([MovimientoInventario(producto_id=pk, tipo='ajuste', cantidad=-3,
+                                                               fecha=dias(1))])
+        # Antes del snapshot: hacia atrás desde el stock actual (4)
+        self.assertEqual(inventario.stock_a_fecha(pk, dias(4)), 2)
+        self.assertEqual(inventario.stock_a_fecha(pk, dias(2.5)), 7)
+        # Después: el snapshot más los movimientos posteriores, sin leer el stock actual
+        Producto._base_manager.filter(pk=pk).update(stock=1000)
+        with self.assertNumQueries(2):
+            self.assertEqual(inventario.stock_a_fecha(pk, dias(1.5)), 7)
+        self.assertEqual(inventario.stock_a_fecha(pk, ahora), 4)
+        self.assertIsNone(inventario.stock_a_fecha(999999, ahora))
+
+    def test_editar_el_stock_conserva_las_ventas_intermedias(self):
+        datos = {'nombre': 'Arroz', 'descripcion': '1 kg', 'precio_venta': '20', 'stock': '5', 'initial-stock': '2',
+                 'categoria': self.producto.categoria_id, 'activo': 'on'}
+        ventas.registrar_venta([(self.producto.pk, 1)])  # Mientras el formulario estaba abierto
+        form = ProductoForm(data=datos, instance=Producto.objects.get(pk=self.producto.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        producto = inventario.guardar_producto(form)
+        self.assertEqual((producto.stock, self.stock(self.producto)), (4, 4))  # 2 - 1 vendido + 3 capturados
+        ajuste = MovimientoInventario.objects.get(tipo='ajuste')
+        self.assertEqual((ajuste.cantidad, ajuste.nota), (3, 'Edición de producto'))
+
+
+# ============ LISTA DE REORDEN ============
+class ReordenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Abarrotes', stock_minimo=3)
+        cls.arroz = Producto.objects.create(nombre='Arroz', descripcion='1 kg', precio_venta=Decimal('20'),
+                                            stock=10, categoria=cls.categoria)
+        cls.sal = Producto.objects.create(nombre='Sal', descripcion='1 kg', precio_venta=Decimal('8'), stock=6,
+                                          stock_minimo=5, categoria=cls.categoria)
+
+    def marcados(self):
+        return set(Producto._base_manager.filter(requiere_reorden=True).values_list('nombre', flat=True))
+
+    def test_aplicar_deltas_mueve_la_bandera(self):
+        self.assertEqual(self.marcados(), set())
+        inventario.aplicar_deltas({self.arroz.pk: -7, self.sal.pk: -1})  # 3 <= 3 (categoría), 5 <= 5 (propio)
+        self.assertEqual(self.marcados(), {'Arroz', 'Sal'})
+        inventario.aplicar_deltas({self.arroz.pk: 1})
+        self.assertEqual(self.marcados(), {'Sal'})
+        self.assertEqual([p.nombre for p in reorden.lista_de_reorden()], ['Sal'])
+
+    def test_cambio_de_umbral(self):
+        self.categoria.stock_minimo = 10
+        self.categoria.save()  # Solo los productos sin umbral propio
+        self.assertEqual(self.marcados(), {'Arroz'})
+        self.sal.stock_minimo = None
+        self.sal.save()  # Ahora usa el de la categoría
+        self.assertEqual(self.marcados(), {'Arroz', 'Sal'})
+        papelera.desactivar(self.sal)
+        self.assertEqual([p.nombre for p in reorden.lista_de_reorden()], ['Arroz'])  # Los inactivos no se piden
+
+    def test_actualizar_todo_corrige_la_bandera(self):
+        Producto._base_manager.update(stock=0)  # Sin pasar por aplicar_deltas ni señales
+        self.assertEqual(self.marcados(), set())
+        self.assertEqual(reorden.actualizar_todo(lote=1), 2)
+        self.assertEqual(self.marcados(), {'Arroz', 'Sal'})
+        self.assertEqual(reorden.actualizar_todo(lote=1), 0)  # Solo escribe las que cambian
+
+
+# ============ IMPORTACIÓN ============
+class ImportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Categoria.objects.create(nombre='Abarrotes')
+
+    def importar(self, modelo, texto, formato='jsonl', **kwargs):
+        errores = []
+        importador = importacion.IMPORTADORES[modelo](reportar_error=lambda n, m: errores.append((n, m)), **kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importador.importar(importacion.leer_renglones(io.StringIO(texto), formato))
+        return resultado, errores
+
+    def test_jsonl_que_no_es_objeto_es_error_del_renglon(self):
+        for modelo in ('producto', 'cliente'):
+            with self.subTest(modelo=modelo):
+                (importados, fallidos), errores = self.importar(modelo, '[1, 2]\n5\n"texto"\n{roto\n')
+                self.assertEqual((importados, fallidos), (0, 4))
+                self.assertEqual([n for n, _ in errores], [1, 2, 3, 4])
+                self.assertIn('se esperaba un objeto, no list', errores[0][1])
+
+    def test_csv_reporta_el_numero_de_renglon_y_sigue(self):
+        texto = ('nombre,descripcion,precio_venta,stock,categoria\n'
+                 'Arroz,1 kg,20.50,10,abarrotes\n'
+                 'Frijol,1 kg,caro,5,Abarrotes\n'
+                 'Azúcar,1 kg,18,3,Dulces\n'
+                 ',sin nombre,5,1,Abarrotes\n'
+                 'Sal,1 kg,8,4,ABARROTES\n')
+        (importados, fallidos), errores = self.importar('producto', texto, formato='csv', lote=1)
+        self.assertEqual((importados, fallidos), (2, 3))
+        self.assertEqual([n for n, _ in errores], [3, 4, 5])  # El renglón 1 son los encabezados
+        self.assertIn('precio_venta:', errores[0][1])
+        self.assertEqual(errores[1][1], 'categoria: no existe "Dulces"')
+        self.assertIn('nombre:', errores[2][1])
+        productos = Producto.objects.order_by('nombre')
+        self.assertEqual([(p.nombre, p.precio_venta, p.categoria.nombre, p.activo) for p in productos],
+                         [('Arroz', Decimal('20.50'), 'Abarrotes', True), ('Sal', Decimal('8.00'), 'Abarrotes', True)])
+        self.assertEqual(IndiceBusqueda.objects.values('producto').distinct().count(), 2)  # Indexados al terminar
+
+    def test_crea_las_categorias_que_faltan(self):
+        texto = ('{"nombre": "Azúcar", "descripcion": "1 kg", "precio_venta": 18, "stock": 3, "categoria": "Dulces"}\n'
+                 '{"nombre": "Cajeta", "descripcion": "Frasco", "precio_venta": 40, "stock": 1, '
+                 '"categoria": "dulces", "activo": "no"}\n')
+        (importados, fallidos), _ = self.importar('producto', texto, crear_categorias=True)
+        self.assertEqual((importados, fallidos), (2, 0))
+        self.assertEqual(Categoria.objects.filter(nombre__iexact='dulces').count(), 1)
+        self.assertFalse(Producto._base_manager.get(nombre='Cajeta').activo)
+
+    def test_clientes_se_actualizan_por_email(self):
+        existente = Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com',
+                                           telefono='1', direccion='Centro', activo=False)
+        renglon = '{{"nombre": "{}", "apellido": "Ruiz", "email": "{}", "telefono": "2", "direccion": "Norte"}}\n'
+        texto = (renglon.format('Ana María', 'ana@example.com') + renglon.format('Luis', 'luis@example.com')
+                 + renglon.format('Luis Alberto', 'luis@example.com') + renglon.format('Eva', 'no-es-email'))
+        (importados, fallidos), errores = self.importar('cliente', texto)
+        self.assertEqual((fallidos, [n for n, _ in errores]), (1, [4]))
+        self.assertEqual(Cliente._base_manager.count(), 2)
+        existente.refresh_from_db()
+        self.assertEqual((existente.nombre, existente.direccion, existente.activo), ('Ana María', 'Norte', True))
+        self.assertEqual(Cliente.objects.get(email='luis@example.com').nombre, 'Luis Alberto')  # Gana el último
+
+
+# ============ EXPORTACIÓN ============
+class ExportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='prueba')
+        cls.vendedor = User.objects.create_user('caja1', password='prueba')
+        categoria = Categoria.objects.create(nombre='Abarrotes')
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='x', precio_venta=Decimal('1'), categoria=categoria)
+            for i in range(5)
+        ])
+        cliente = Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com')
+        cls.ayer = Venta.objects.create(total=Decimal('10.00'), cliente=cliente, vendido_por=cls.vendedor)
+        cls.hoy = Venta.objects.create(total=Decimal('20.00'), vendido_por=cls.vendedor)
+        cls.otra = Venta.objects.create(total=Decimal('30.00'), vendido_por=cls.usuario)
+        Venta.objects.filter(pk=cls.ayer.pk).update(fecha_venta=timezone.now() - datetime.timedelta(days=1))
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def csv(self, respuesta):
+        self.assertTrue(respuesta.streaming)
+        texto = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertTrue(texto.startswith('\ufeff'))  # BOM para Excel
+        return list(csv.reader(io.StringIO(texto[1:])))
+
+    def test_bloques_por_cursor(self):
+        orden = list(Producto.objects.order_by('pk').values_list('nombre', flat=True))
+        for tamano, consultas in ((2, 3), (5, 2), (10, 1)):
+            with self.subTest(tamano=tamano), self.assertNumQueries(consultas):
+                filas = list(exportacion.iterar_en_bloques(Producto.objects.all(), ['nombre'], tamano=tamano))
+                self.assertEqual([nombre for nombre, in filas], orden)
+
+    def test_ventas_en_csv_con_los_filtros_de_reportes(self):
+        hoy = timezone.localdate().isoformat()
+        respuesta = self.client.get(reverse('venta_exportar'), {'desde': hoy, 'hasta': hoy, 'vendedor': self.vendedor.pk})
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="ventas.csv"')
+        filas = self.csv(respuesta)
+        self.assertEqual(filas[0], ['ID', 'Fecha', 'Total', 'Nombre del Cliente', 'Apellido del Cliente',
+                                    'Vendido por'])
+        self.assertEqual([(f[0], f[2], f[5]) for f in filas[1:]], [(str(self.hoy.pk), '20.00', 'caja1')])
+
+        filas = self.csv(self.client.get(reverse('venta_exportar'), {'formato': 'pdf'}))  # Formato desconocido: CSV
+        self.assertEqual([f[0] for f in filas[1:]], [str(v.pk) for v in (self.ayer, self.hoy, self.otra)])
+        self.assertEqual(filas[1][3:5], ['Ana', 'Ruiz'])
+
+    def test_productos_en_xlsx(self):
+        try:
+            import openpyxl
+        except ImportError:
+            self.skipTest('openpyxl no está instalado')
+        respuesta = self.client.get(reverse('producto_exportar'), {'formato': 'xlsx'})
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="productos.xlsx"')
+        hoja = openpyxl.load_workbook(io.BytesIO(b''.join(respuesta.streaming_content))).active
+        filas = list(hoja.values)
+        self.assertEqual(filas[0][:2], ('ID', 'Nombre'))
+        self.assertEqual(len(filas), 6)
+
+
+# ============ PAPELERA ============
+class PapeleraTests(TestCase):
+
+    def test_purga_los_dependientes_en_lotes(self):
+        categoria = Categoria.objects.create(nombre='Hogar')
+        with self.captureOnCommitCallbacks(execute=True):  # Índice de búsqueda
+            producto = Producto.objects.create(nombre='Silla plegable', descripcion='Madera', stock=0,
+                                               precio_venta=Decimal('10'), categoria=categoria)
+        for _ in range(5):
+            inventario.mover(producto.pk, 2, 'entrada')
+        inventario.tomar_snapshot()
+        venta = ventas.registrar_venta([(producto.pk, 1)])
+        papelera.desactivar(producto)
+        tabla = MovimientoInventario._meta.db_table
+        movimientos = list(MovimientoInventario.objects.order_by('pk').values_list('pk', flat=True))
+
+        with CaptureQueriesContext(connection) as consultas:
+            borradas = papelera.purgar(Producto, timezone.now() + datetime.timedelta(days=1), lote=2, pausa=0)
+        self.assertEqual(borradas, 1)
+        # 6 movimientos (5 entradas y la venta) en lotes de 2: tres DELETE acotados por id
+        borrados = [c['sql'] for c in consultas if c['sql'].startswith(f'DELETE FROM "{tabla}"')]
+        self.assertEqual([re.findall(r'"id" IN \(([\d, ]+)\)\)$', sql) for sql in borrados[:3]],
+                         [[', '.join(map(str, movimientos[i:i + 2]))] for i in (0, 2, 4)])
+        self.assertEqual(len(borrados), 4)  # El del producto ya no encuentra movimientos
+        self.assertFalse(MovimientoInventario.objects.exists())
+        self.assertFalse(SnapshotInventario.objects.exists())
+        self.assertFalse(IndiceBusqueda.objects.exists())
+        self.assertEqual(list(DetalleVenta.objects.filter(venta=venta).values_list('producto', flat=True)), [None])
+
+
+# ============ PAGINACIÓN POR CURSOR ============
+class PaginacionKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='prueba')
+        categoria = Categoria.objects.create(nombre='Hogar')
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', descripcion='x', precio_venta=Decimal('1'), categoria=categoria)
+            for i in range(7)
+        ])
+        # Empates en fecha_creacion: el id desempata, ninguna fila se repite ni se pierde
+        Producto.objects.filter(pk__in=list(Producto.objects.values_list('pk', flat=True)[:4])).update(
+            fecha_creacion=timezone.now() - datetime.timedelta(days=1))
+
+    def paginas(self, paginador):
+        paginas = [paginador.pagina()]
+        while paginas[-1].tiene_siguiente:
+            paginas.append(paginador.pagina(paginas[-1].siguiente))
+        return paginas
+
+    def test_recorre_todo_sin_repetir_en_ambos_sentidos(self):
+        for descendente in (True, False):
+            with self.subTest(descendente=descendente):
+                paginador = PaginadorKeyset(Producto.objects.all(), ('fecha_creacion', 'id'),
+                                            descendente=descendente, por_pagina=3)
+                paginas = self.paginas(paginador)
+                orden = [p.pk for p in Producto.objects.order_by(
+                    *(('-fecha_creacion', '-id') if descendente else ('fecha_creacion', 'id')))]
+                self.assertEqual([p.pk for pagina in paginas for p in pagina], orden)
+                self.assertEqual([len(p) for p in paginas], [3, 3, 1])
+                self.assertFalse(paginas[0].tiene_anterior)
+                # Hacia atrás desde la última se obtienen las mismas páginas
+                atras = paginador.pagina(paginas[-1].anterior)
+                self.assertEqual([p.pk for p in atras], [p.pk for p in paginas[1]])
+                self.assertEqual([p.pk for p in paginador.pagina(atras.anterior)], [p.pk for p in paginas[0]])
+
+    def test_cursor_invalido_o_de_otro_orden(self):
+        recientes = PaginadorKeyset(Producto.objects.all(), ('fecha_creacion', 'id'), por_pagina=3)
+        antiguos = PaginadorKeyset(Producto.objects.all(), ('fecha_creacion', 'id'), descendente=False)
+        for cursor in ('zzz', antiguos.pagina().siguiente or 'x', 'eyJ2IjpbMV19'):
+            with self.subTest(cursor=cursor), self.assertRaises(CursorInvalido):
+                recientes.pagina(cursor)
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('producto_lista'), {'cursor': 'zzz', 'por_pagina': 3})
+        self.assertEqual(len(respuesta.context['pagina']), 3)  # Vuelve a la primera página
+
+    def test_consultas_no_crecen_con_el_tamano_de_pagina(self):
+        self.client.force_login(self.usuario)
+        conteos = []
+        for por_pagina in (2, 7):
+            cache.clear()  # Sin filas cacheadas: cada página renderiza todas sus filas
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.get(reverse('producto_lista'), {'por_pagina': por_pagina})
+            conteos.append(len(consultas))
+        self.assertEqual(conteos[0], conteos[1])
+
+
+# ============ FILAS CACHEADAS DE LAS LISTAS ============
+class FilasCacheadasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', password='prueba')
+        cls.categoria = Categoria.objects.create(nombre='Hogar', stock_minimo=2)
+        cls.producto = Producto.objects.create(nombre='Silla', descripcion='x', precio_venta=Decimal('10'), stock=5,
+                                               categoria=cls.categoria)
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+        self.client.force_login(self.usuario)
+
+    def lista(self):
+        return self.client.get(reverse('producto_lista')).content.decode()
+
+    def test_la_fila_se_cachea_hasta_que_cambia_modificado(self):
+        self.assertIn('<td>Silla</td>', self.lista())
+        Producto.objects.filter(pk=self.producto.pk).update(nombre='Mesa')  # Sin tocar `modificado`
+        self.assertIn('<td>Silla</td>', self.lista())  # Servida desde la caché
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.precio_venta = Decimal('12.50')
+        producto.save()  # auto_now cambia la llave de la fila
+        contenido = self.lista()
+        self.assertIn('<td>Mesa</td>', contenido)
+        self.assertIn('$12.50', contenido)
+
+    def test_stock_y_categoria_cambian_la_fila(self):
+        self.lista()
+        inventario.aplicar_deltas({self.producto.pk: -3})  # UPDATE sin señales: pone `modificado` a mano
+        self.assertRegex(self.lista(), r'bg-danger">\s*2</span>')  # Y la bandera de reorden
+        self.categoria.nombre = 'Jardín'
+        self.categoria.save()  # La fila muestra el nombre de la categoría
+        self.assertIn('<td>Jardín</td>', self.lista())
+
+    def test_recalcular_la_bandera_sin_cambios_no_invalida(self):
+        modificado = Producto.objects.values_list('modificado', flat=True).get(pk=self.producto.pk)
+        self.assertEqual(reorden.actualizar_todo(), 0)
+        self.assertEqual(Producto.objects.values_list('modificado', flat=True).get(pk=self.producto.pk), modificado)
+
+
+# ============ ESTADÍSTICAS DEL DASHBOARD ============
+class EstadisticasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Hogar')
+        Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def nuevo_producto(self, nombre='Silla'):
+        return Producto.objects.create(nombre=nombre, descripcion='x', precio_venta=Decimal('10'), stock=5,
+                                       categoria=self.categoria)
+
+    def test_cacheadas_y_ajustadas_por_las_senales(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = self.nuevo_producto()
+        self.assertEqual(estadisticas.obtener_estadisticas()['total_productos'], 1)  # Un SELECT y a la caché
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = self.nuevo_producto('Mesa')
+            papelera.desactivar(producto)
+            Venta.objects.create(total=Decimal('12.50'))
+            Venta.objects.create(total=Decimal('7.25'))
+        with self.assertNumQueries(0):
+            valores = estadisticas.obtener_estadisticas()
+        self.assertEqual((valores['total_productos'], valores['total_clientes'], valores['total_categorias']),
+                         (1, 1, 1))
+        self.assertEqual((valores['conteo_ventas_hoy'], valores['total_ventas_hoy']), (2, Decimal('19.75')))
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.delete()
+        self.assertEqual(estadisticas.obtener_estadisticas()['total_productos'], 0)
+
+    def test_revertido_no_cuenta(self):
+        estadisticas.obtener_estadisticas()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ZeroDivisionError), transaction.atomic():
+                self.nuevo_producto()
+                1 / 0
+        self.assertEqual(estadisticas.obtener_estadisticas()['total_productos'], 0)
+
+    def test_cambio_masivo_recalcula(self):
+        self.nuevo_producto()
+        estadisticas.obtener_estadisticas()
+        Producto.objects.update(activo=False)  # update() no envía señales
+        estadisticas.invalidar_conteo(Producto)
+        with self.assertNumQueries(1):
+            self.assertEqual(estadisticas.obtener_estadisticas()['total_productos'], 0)
+
+
+# ============ VENTAS ============
+class VentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Abarrotes')
+        cls.arroz = Producto.objects.create(nombre='Arroz', descripcion='1 kg', precio_venta=Decimal('20.00'),
+                                            stock=5, categoria=categoria)
+        cls.frijol = Producto.objects.create(nombre='Frijol', descripcion='1 kg', precio_venta=Decimal('25.00'),
+                                             stock=1, categoria=categoria)
+
+    def stock(self, producto):
+        return Producto._base_manager.values_list('stock', flat=True).get(pk=producto.pk)
+
+    def test_descuenta_stock_y_anota_los_movimientos(self):
+        venta = ventas.registrar_venta([(self.arroz.pk, 2), (self.frijol.pk, 1), (self.arroz.pk, 1)])
+        self.assertEqual(venta.total, Decimal('85.00'))
+        self.assertEqual((self.stock(self.arroz), self.stock(self.frijol)), (2, 0))
+        self.assertEqual(dict(venta.detalles.values_list('producto', 'cantidad')),
+                         {self.arroz.pk: 3, self.frijol.pk: 1})  # El producto repetido va en un renglón
+        self.assertEqual(dict(MovimientoInventario.objects.filter(venta=venta, tipo='venta')
+                              .values_list('producto', 'cantidad')), {self.arroz.pk: -3, self.frijol.pk: -1})
+
+    def test_stock_insuficiente_revierte_la_venta(self):
+        with self.assertRaises(ventas.StockInsuficiente) as error:
+            ventas.registrar_venta([(self.arroz.pk, 2), (self.frijol.pk, 2)])
+        self.assertEqual((error.exception.producto_id, error.exception.cantidad), (self.frijol.pk, 2))
+        # El arroz se descontó antes que el frijol: también se revierte
+        self.assertEqual((self.stock(self.arroz), self.stock(self.frijol)), (5, 1))
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_producto_inactivo_o_cantidad_invalida(self):
+        Producto._base_manager.filter(pk=self.frijol.pk).update(activo=False)
+        with self.assertRaises(ventas.ProductoNoDisponible) as error:
+            ventas.registrar_venta([(self.arroz.pk, 1), (self.frijol.pk, 1)])
+        self.assertEqual(error.exception.producto_ids, [self.frijol.pk])
+        for lineas in ([], [(self.arroz.pk, 0)]):
+            with self.subTest(lineas=lineas), self.assertRaises(ventas.ErrorVenta):
+                ventas.registrar_venta(lineas)
+        self.assertEqual(self.stock(self.arroz), 5)
+
+    def test_lote_suma_la_demanda_y_es_todo_o_nada(self):
+        lote = [{'lineas': [(self.arroz.pk, 3)]}, {'lineas': [(self.arroz.pk, 3)]}]
+        with self.assertRaises(ventas.StockInsuficiente) as error:
+            ventas.registrar_lote(lote)  # Cada venta alcanza sola, las dos juntas no
+        self.assertEqual(error.exception.cantidad, 6)
+        self.assertEqual(self.stock(self.arroz), 5)
+        self.assertFalse(Venta.objects.exists())
+
+        creadas = ventas.registrar_lote([{'lineas': [(self.arroz.pk, 2)]},
+                                         {'lineas': [(self.arroz.pk, 3), (self.frijol.pk, 1)]}])
+        self.assertEqual([v.total for v in creadas], [Decimal('40.00'), Decimal('85.00')])
+        self.assertEqual((self.stock(self.arroz), self.stock(self.frijol)), (0, 0))
+        self.assertEqual(DetalleVenta.objects.count(), 3)
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='venta').count(), 3)
+
+    def test_error_de_una_venta_del_lote_indica_cual(self):
+        with self.assertRaisesMessage(ventas.ErrorVenta, 'Venta 2 del lote'):
+            ventas.registrar_lote([{'lineas': [(self.arroz.pk, 1)]}, {'lineas': []}])
+        self.assertEqual(self.stock(self.arroz), 5)
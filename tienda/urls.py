@@ -1,6 +1,8 @@
 # tienda/urls.py
 from django.urls import path # Importa la función path para definir rutas.
 from . import views # Importa las vistas de la aplicación actual.
+from . import api # API JSON para cajas y lectores de inventario.
+from . import metricas # Métricas de las vistas en formato Prometheus.
 # Se eliminó la importación de CustomLoginView/CustomLogoutView, ya que usas vistas de función (login_view, logout_view)
 
 urlpatterns = [ # Lista de patrones de URL.
@@ -17,14 +19,27 @@ urlpatterns = [ # Lista de patrones de URL.
     # La URL raíz redirecciona al dashboard (vista 'home')
     path('', views.home, name='home'), # URL raíz de la aplicación 'tienda'.
 
+    # Ventas (caja): disponible para todos los roles
+    path('ventas/nueva/', views.venta_crear, name='venta_crear'), # URL para registrar una venta.
+    path('ventas/exportar/', views.venta_exportar, name='venta_exportar'), # URL para exportar ventas (Gerente y Administrador).
+
+    # Reportes de ventas (solo Gerente y Administrador)
+    path('reportes/', views.reportes_ventas, name='reportes'), # URL de los reportes de ventas.
+
+    # Reorden: productos con stock bajo (solo Gerente y Administrador)
+    path('reorden/', views.reorden_lista, name='reorden_lista'), # URL de la lista de reorden por proveedor.
+    path('reorden/exportar/', views.reorden_exportar, name='reorden_exportar'), # URL para exportar la lista de reorden.
+
     # CRUD Productos
     path('productos/', views.producto_lista, name='producto_lista'), # URL para listar productos.
+    path('productos/exportar/', views.producto_exportar, name='producto_exportar'), # URL para exportar productos (CSV/XLSX).
     path('productos/crear/', views.producto_crear, name='producto_crear'), # URL para crear un producto.
     path('productos/editar/<int:pk>/', views.producto_editar, name='producto_editar'), # URL para editar un producto específico (usando su PK).
     path('productos/eliminar/<int:pk>/', views.producto_eliminar, name='producto_eliminar'), # URL para eliminar (desactivar) un producto específico.
 
     # ============ RUTAS PARA CATEGORÍAS ============
     path('categorias/', views.categoria_lista, name='categoria_lista'),  # Lista todas las categorías
+    path('categorias/exportar/', views.categoria_exportar, name='categoria_exportar'),  # Exportar categorías
     path('categorias/crear/', views.categoria_crear, name='categoria_crear'),  # Crear categoría
     # Corregido: Se agregó <int:pk> para editar/eliminar
     path('categorias/editar/<int:pk>/', views.categoria_editar, name='categoria_editar'),  # Editar categoría
@@ -32,6 +47,7 @@ urlpatterns = [ # Lista de patrones de URL.
     
     # ============ RUTAS PARA PROVEEDORES ============
     path('proveedores/', views.proveedor_lista, name='proveedor_lista'),  # Lista todos los proveedores
+    path('proveedores/exportar/', views.proveedor_exportar, name='proveedor_exportar'),  # Exportar proveedores
     path('proveedores/crear/', views.proveedor_crear, name='proveedor_crear'),  # Crear proveedor
     # Corregido: Se agregó <int:pk> para editar/eliminar
     path('proveedores/editar/<int:pk>/', views.proveedor_editar, name='proveedor_editar'),  # Editar proveedor
@@ -39,10 +55,24 @@ urlpatterns = [ # Lista de patrones de URL.
     
     # ============ RUTAS PARA CLIENTES ============
     path('clientes/', views.cliente_lista, name='cliente_lista'),  # Lista todos los clientes
+    path('clientes/exportar/', views.cliente_exportar, name='cliente_exportar'),  # Exportar clientes
     path('clientes/crear/', views.cliente_crear, name='cliente_crear'),  # Crear cliente
     # Corregido: Se agregó <int:pk> para editar/eliminar
     path('clientes/editar/<int:pk>/', views.cliente_editar, name='cliente_editar'),  # Editar cliente
     path('clientes/eliminar/<int:pk>/', views.cliente_eliminar, name='cliente_eliminar'),  # Eliminar cliente
+
+    # ============ API JSON (cajas y lectores de inventario) ============
+    # <recurso>: productos, clientes, categorias, proveedores o ventas (ver tienda/api.py)
+    path('api/<str:recurso>/', api.lista, name='api_lista'),  # Lista paginada por cursor
+    path('api/<str:recurso>/lote/', api.lote, name='api_lote'),  # Crear/actualizar/eliminar en lote
+    path('api/<str:recurso>/<int:pk>/', api.detalle, name='api_detalle'),  # Consultar, modificar o eliminar uno
+
+    # ============ MÉTRICAS (Prometheus) ============
+    path('metrics/', metricas.vista, name='metricas'),  # Histogramas por vista (staff o token)
+
+    # ============ PERFILES DE PETICIONES LENTAS (staff) ============
+    path('perfiles/', views.perfiles_lista, name='perfiles_lista'),  # Peticiones lentas/muestreadas recientes
+    path('perfiles/<str:nombre>/', views.perfil_detalle, name='perfil_detalle'),  # Pilas y SQL de una petición
 ]
 
 # Nota: <int:pk> captura un número entero de la URL y lo pasa como parámetro 'pk' a la vista
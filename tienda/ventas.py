@@ -0,0 +1,155 @@
+# tienda/ventas.py
+# Registro de ventas con renglones (DetalleVenta) y descuento de stock.
+#
+# El stock se descuenta con UPDATE condicionales:
+#     UPDATE producto SET stock = stock - n WHERE id = X AND stock >= n
+# La base de datos evalúa la condición y resta en la misma operación, con el
+# renglón bloqueado, así que 20 cajas vendiendo el mismo producto a la vez no
+# pierden actualizaciones ni venden más de lo que hay: a la que no le alcanza le
+# afecta 0 filas y la venta completa se revierte.
+#
+# Cada renglón queda también en el libro de inventario (MovimientoInventario tipo 'venta').
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import inventario
+from .models import DetalleVenta, MovimientoInventario, Producto, Venta
+
+
+class ErrorVenta(Exception):
+    """Error de negocio al registrar una venta (el mensaje se muestra al usuario)"""
+
+
+class ProductoNoDisponible(ErrorVenta):
+    def __init__(self, producto_ids):
+        self.producto_ids = sorted(producto_ids)
+        super().__init__(f'Productos inexistentes o inactivos: {", ".join(map(str, self.producto_ids))}')
+
+
+class StockInsuficiente(ErrorVenta):
+    def __init__(self, producto_id, cantidad):
+        self.producto_id = producto_id
+        self.cantidad = cantidad
+        super().__init__(f'Stock insuficiente para el producto {producto_id} (se pidieron {cantidad})')
+
+
+def agrupar_lineas(lineas):
+    """
+    Convierte [(producto_id, cantidad), ...] en {producto_id: cantidad_total}.
+
+    El mismo producto escaneado dos veces se suma en un solo renglón.
+    """
+    cantidades = {}
+    for producto_id, cantidad in lineas:
+        cantidad = int(cantidad)
+        if cantidad <= 0:
+            raise ErrorVenta(f'Cantidad inválida para el producto {producto_id}: {cantidad}')
+        cantidades[int(producto_id)] = cantidades.get(int(producto_id), 0) + cantidad
+    if not cantidades:
+        raise ErrorVenta('La venta no tiene productos')
+    return cantidades
+
+
+def _precios(producto_ids):
+    """Precio actual de cada producto activo (una consulta); falla si alguno no existe"""
+    precios = dict(
+        Producto.objects.filter(pk__in=producto_ids, activo=True).values_list('pk', 'precio_venta')
+    )
+    faltantes = set(producto_ids) - set(precios)
+    if faltantes:
+        raise ProductoNoDisponible(faltantes)
+    return precios
+
+
+def descontar_stock(cantidades):
+    """
+    Resta las cantidades del stock con UPDATE condicionales.
+
+    Debe ejecutarse dentro de una transacción: si un producto no alcanza se lanza
+    StockInsuficiente y todo lo descontado antes se revierte. Los productos se
+    procesan ordenados por id para que dos ventas simultáneas bloqueen los
+    renglones en el mismo orden y no se produzcan interbloqueos (deadlocks).
+    """
+    try:
+        inventario.aplicar_deltas({producto_id: -cantidad for producto_id, cantidad in cantidades.items()})
+    except inventario.SinStock as exc:
+        raise StockInsuficiente(exc.producto_id, -exc.delta) from exc
+
+
+def _detalles(venta, cantidades, precios):
+    return [
+        DetalleVenta(
+            venta=venta, producto_id=producto_id, cantidad=cantidad,
+            precio_unitario=precios[producto_id], subtotal=precios[producto_id] * cantidad,
+        )
+        for producto_id, cantidad in cantidades.items()
+    ]
+
+
+def _movimientos(venta, cantidades):
+    """Salidas de inventario de la venta (el stock ya se descontó en descontar_stock)"""
+    return [
+        MovimientoInventario(producto_id=producto_id, tipo='venta', cantidad=-cantidad,
+                             fecha=venta.fecha_venta, usuario=venta.vendido_por, venta=venta)
+        for producto_id, cantidad in cantidades.items()
+    ]
+
+
+def registrar_venta(lineas, vendedor=None, cliente=None):
+    """
+    Registra una venta completa: valida el carrito, descuenta stock, crea la
+    Venta (que actualiza el resumen diario) y sus renglones, todo en una
+    transacción. Devuelve la Venta creada o lanza ErrorVenta.
+    """
+    cantidades = agrupar_lineas(lineas)
+    with transaction.atomic():
+        precios = _precios(cantidades)
+        descontar_stock(cantidades)
+        total = sum((precios[pk] * cantidad for pk, cantidad in cantidades.items()), Decimal('0.00'))
+        venta = Venta(total=total, cliente=cliente, vendido_por=vendedor)
+        venta.save()
+        DetalleVenta.objects.bulk_create(_detalles(venta, cantidades, precios))
+        inventario.anotar(_movimientos(venta, cantidades))
+    return venta
+
+
+def registrar_lote(ventas, vendedor=None):
+    """
+    Registra de una vez un lote de ventas (p. ej. de una caja que estuvo sin conexión).
+
+    `ventas` es una lista de diccionarios {'lineas': [(producto_id, cantidad), ...],
+    'cliente_id': opcional}. Todo el lote va en una sola transacción: los precios se
+    leen en una consulta, el stock se descuenta con un UPDATE por producto (sumando
+    lo que piden todas las ventas del lote) y los renglones se insertan con un solo
+    bulk_create. Si algo falla no se registra ninguna venta del lote.
+    """
+    carritos = []
+    demanda = {}
+    for i, datos in enumerate(ventas):
+        try:
+            cantidades = agrupar_lineas(datos.get('lineas', []))
+        except ErrorVenta as exc:
+            raise ErrorVenta(f'Venta {i + 1} del lote: {exc}') from exc
+        carritos.append((cantidades, datos.get('cliente_id')))
+        for producto_id, cantidad in cantidades.items():
+            demanda[producto_id] = demanda.get(producto_id, 0) + cantidad
+
+    creadas = []
+    with transaction.atomic():
+        precios = _precios(demanda)
+        descontar_stock(demanda)
+        detalles = []
+        movimientos = []
+        for cantidades, cliente_id in carritos:
+            total = sum((precios[pk] * cantidad for pk, cantidad in cantidades.items()), Decimal('0.00'))
+            # save() individual: MySQL no devuelve las PK de bulk_create y las necesitan los renglones;
+            # además mantiene el resumen diario dentro de esta misma transacción
+            venta = Venta(total=total, cliente_id=cliente_id, vendido_por=vendedor)
+            venta.save()
+            detalles.extend(_detalles(venta, cantidades, precios))
+            movimientos.extend(_movimientos(venta, cantidades))
+            creadas.append(venta)
+        DetalleVenta.objects.bulk_create(detalles)
+        inventario.anotar(movimientos)
+    return creadas
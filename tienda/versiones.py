@@ -0,0 +1,138 @@
+# tienda/versiones.py
+# Versiones por tabla para las peticiones condicionales (ETag / Last-Modified).
+#
+# Cada modelo tiene en la tabla VersionTabla un contador de cambios y la hora del
+# último. Las vistas de lista y el dashboard derivan de ahí su ETag y su
+# Last-Modified (decorador condicional()): si el navegador ya tiene la página y
+# ninguna de sus tablas cambió, se responde 304 sin ejecutar la consulta principal
+# ni renderizar la plantilla. Leer las versiones cuesta una consulta por PK.
+#
+# - Los cambios por el ORM (save/delete) avisan por señales (tienda/signals.py).
+# - Los UPDATE y bulk_create que no disparan señales (stock, reorden, importaciones,
+#   generar_datos) llaman a cambiar() directamente.
+# - Las versiones están en la base y no en la caché de cada proceso: un cambio hecho
+#   por un comando o por otro worker invalida los ETag de todos, nunca queda un 304
+#   con datos viejos.
+import datetime
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import roles
+from .models import VersionTabla
+
+
+def _tabla(modelo):
+    # Un texto es un contador que no corresponde a una tabla (p. ej. el de tienda/reportes.py)
+    return modelo if isinstance(modelo, str) else modelo._meta.label_lower
+
+
+def _incrementar(tablas):
+    ahora = timezone.now()
+    filas = VersionTabla.objects.filter(tabla__in=tablas)
+    # UPDATE en autocommit (después del commit): el bloqueo de la fila dura una sentencia
+    if filas.update(version=F('version') + 1, modificado=ahora) < len(tablas):
+        # Primera vez que cambia alguna: se crea en 0 (si otro proceso ganó, se conserva
+        # la suya) y se vuelve a incrementar; un incremento de más solo cuesta un 200
+        VersionTabla.objects.bulk_create([VersionTabla(tabla=t, modificado=ahora) for t in tablas],
+                                         ignore_conflicts=True)
+        filas.update(version=F('version') + 1, modificado=ahora)
+
+
+def cambiar(*modelos):
+    """Marca las tablas como cambiadas al confirmar la transacción en curso"""
+    tablas = sorted({_tabla(m) for m in modelos})  # Siempre en el mismo orden: sin bloqueos cruzados
+    transaction.on_commit(lambda: _incrementar(tablas))
+
+
+def versiones(*modelos):
+    """{tabla: (versión, hora del último cambio o None)} de cada modelo, en una consulta"""
+    tablas = [_tabla(m) for m in modelos]
+    filas = {tabla: (version, modificado) for tabla, version, modificado in
+             VersionTabla.objects.filter(tabla__in=tablas).values_list('tabla', 'version', 'modificado')}
+    return {tabla: filas.get(tabla, (0, None)) for tabla in tablas}
+
+
+@lru_cache(maxsize=None)
+def despliegue():
+    """
+    Huella del código y las plantillas: un despliegue nuevo invalida los ETag aunque
+    los datos no hayan cambiado. TIENDA_VERSION permite fijarla (p. ej. el commit).
+    """
+    version = getattr(settings, 'TIENDA_VERSION', '')
+    if version:
+        return version
+    raiz = os.path.dirname(__file__)
+    ultima = 0.0
+    for carpeta, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            if nombre.endswith(('.py', '.html')):
+                ultima = max(ultima, os.path.getmtime(os.path.join(carpeta, nombre)))
+    return str(int(ultima))
+
+
+def _hay_mensajes(request):
+    # len() no marca los mensajes como leídos; la página que los muestra no se cachea
+    return bool(len(messages.get_messages(request)))
+
+
+def condicional(*modelos, por_dia=False):
+    """
+    Decorador (va después de login_required/rol_requerido) que responde 304 si
+    ninguna de las tablas de `modelos` cambió desde la copia del navegador.
+
+    El ETag incluye al usuario y su rol (el menú depende de ellos), la URL completa
+    (cursor, búsqueda, orden) y, con por_dia=True, la fecha (ventas de hoy).
+    No hay ETag mientras haya mensajes pendientes de mostrar. Cache-Control
+    private, no-cache: el navegador guarda la página pero siempre pregunta.
+    """
+
+    def estado(request):
+        # (etag, última modificación) calculados una vez por petición
+        if not hasattr(request, '_version_condicional'):
+            if _hay_mensajes(request):
+                request._version_condicional = (None, None)
+            else:
+                valores = versiones(*modelos)
+                rol = roles.rol_de_request(request)
+                partes = [despliegue(), request.get_full_path(), str(request.user.pk), str(rol.nombre),
+                          str(rol.activo), str(rol.es_superusuario), str(request.user.is_staff)]
+                cambios = [modificado for _, modificado in valores.values() if modificado]
+                if por_dia:
+                    hoy = timezone.localdate()
+                    partes.append(hoy.isoformat())
+                    cambios.append(timezone.make_aware(datetime.datetime.combine(hoy, datetime.time.min)))
+                # La hora entra al ETag: si la tabla de versiones se vacía, el contador
+                # vuelve a empezar pero no repite un ETag anterior
+                partes.extend(f'{tabla}={version}@{modificado.timestamp() if modificado else 0}'
+                              for tabla, (version, modificado) in sorted(valores.items()))
+                request._version_condicional = (
+                    hashlib.md5('|'.join(partes).encode()).hexdigest(),
+                    max(cambios, default=None),
+                )
+        return request._version_condicional
+
+    def decorador(vista):
+        vista_condicional = condition(etag_func=lambda request, *a, **k: estado(request)[0],
+                                      last_modified_func=lambda request, *a, **k: estado(request)[1])(vista)
+        if iscoroutinefunction(vista):
+            # Vista async: estado() usa el ORM (usuario, rol), se calcula antes en un hilo
+            # y condition() solo lee el resultado guardado en el request
+            @wraps(vista)
+            async def previa(request, *args, **kwargs):
+                request.user = await request.auser()  # El que ya cargó login_required: sin otra consulta
+                await sync_to_async(estado)(request)
+                return await vista_condicional(request, *args, **kwargs)
+            return cache_control(private=True, no_cache=True)(previa)
+        return cache_control(private=True, no_cache=True)(vista_condicional)
+
+    return decorador
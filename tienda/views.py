@@ -1,18 +1,25 @@
 # tienda/views.py
 from django.shortcuts import render, redirect, get_object_or_404 # Funciones comunes para renderizar, redirigir y obtener objetos.
-from django.contrib.auth.decorators import login_required, permission_required # Decoradores para requerir autenticación y permisos.
+from django.contrib.auth.decorators import login_required, permission_required, user_passes_test # Decoradores para requerir autenticación y permisos.
 from django.contrib.auth.views import LoginView, LogoutView # Vistas predefinidas de Django para autenticación.
 from django.urls import reverse_lazy # Función para obtener URLs de forma perezosa.
 from django.contrib.auth.models import Group # Modelo para gestionar grupos/roles de usuarios.
 from django.contrib import messages # Módulo para enviar mensajes de notificación al usuario.
 from .models import Producto, Categoria # Importa los modelos necesarios.
 from .forms import ProductoForm # Importa el formulario de Producto.
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
+import datetime
+import json
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import Http404, HttpResponse
 from .models import Producto, Categoria, Proveedor, Cliente, PerfilUsuario, Venta
-from .forms import ProductoForm, CategoriaForm, ProveedorForm, ClienteForm
-from django.db.models import Sum
-from django.utils import timezone
+from .forms import ProductoForm, CategoriaForm, ProveedorForm, ClienteForm, VentaForm, DetalleVentaFormSet
+from .paginacion import PaginadorKeyset, CursorInvalido
+from . import acceso, asincrono, busqueda, estadisticas, inventario, papelera, perfilado, reorden, reportes, roles, versiones
+from .ventas import registrar_venta, ErrorVenta
+from .exportacion import exportar
 
 
 # ============ DECORADOR PERSONALIZADO PARA PERMISOS POR ROL ============
@@ -30,36 +37,54 @@ def rol_requerido(*roles_permitidos):
                           Opciones: 'vendedor', 'gerente', 'administrador'
     """
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            # Vista async (bajo ASGI): la verificación usa el ORM, así que corre en un hilo
+            @wraps(view_func)
+            async def _wrapped_async(request, *args, **kwargs):
+                request.user = await request.auser()  # El que ya cargó login_required: sin otra consulta
+                denegado = await sync_to_async(_verificar_rol)(request, roles_permitidos)
+                if denegado is not None:
+                    return denegado
+                return await view_func(request, *args, **kwargs)  # Permitir acceso
+            return _wrapped_async
+
+        @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            # 1. Verificar si el usuario está autenticado
-            if not request.user.is_authenticated:
-                messages.error(request, 'Debes iniciar sesión para acceder')
-                return redirect('login')
-            
-            # 2. Si es superusuario, permitir acceso siempre
-            if request.user.is_superuser:
-                return view_func(request, *args, **kwargs)
-            
-            # 3. Verificar si el usuario tiene perfil con rol asignado
-            try:
-                perfil = request.user.perfil  # Obtener perfil del usuario
-                # 4. Verificar si su rol está en los roles permitidos
-                if perfil.rol in roles_permitidos:
-                    return view_func(request, *args, **kwargs)  # Permitir acceso
-                else:
-                    # Mostrar mensaje de error indicando roles necesarios
-                    roles_texto = ', '.join([r.capitalize() for r in roles_permitidos])
-                    messages.error(request, f'⚠️ Acceso denegado. Se requiere rol: {roles_texto}')
-                    return redirect('home')  # Redirigir al home
-            except PerfilUsuario.DoesNotExist:
-                # Si el usuario no tiene perfil asignado
-                messages.error(request, '⚠️ Tu cuenta no tiene un perfil asignado. Contacta al administrador.')
-                return redirect('home')
+            denegado = _verificar_rol(request, roles_permitidos)
+            if denegado is not None:
+                return denegado
+            return view_func(request, *args, **kwargs)  # Permitir acceso
         
         return _wrapped_view
     return decorator
 
 
+def _verificar_rol(request, roles_permitidos):
+    """None si el usuario puede entrar; si no, la redirección (con su mensaje de error)"""
+    # 1. Verificar si el usuario está autenticado
+    if not request.user.is_authenticated:
+        messages.error(request, 'Debes iniciar sesión para acceder')
+        return redirect('login')
+    
+    # 2. Rol resuelto una sola vez por petición (User y PerfilUsuario ya vienen juntos)
+    rol = roles.rol_de_request(request)
+    
+    # 3. Superusuario, o perfil activo con uno de los roles permitidos
+    if rol.permite(*roles_permitidos):
+        return None
+    
+    if not rol.tiene_perfil:
+        # Si el usuario no tiene perfil asignado
+        messages.error(request, '⚠️ Tu cuenta no tiene un perfil asignado. Contacta al administrador.')
+    elif not rol.activo:
+        messages.error(request, '⚠️ Tu perfil está desactivado. Contacta al administrador.')
+    else:
+        # Mostrar mensaje de error indicando roles necesarios
+        roles_texto = ', '.join([r.capitalize() for r in roles_permitidos])
+        messages.error(request, f'⚠️ Acceso denegado. Se requiere rol: {roles_texto}')
+    return redirect('home')  # Redirigir al home
+
+
 # ============ VISTA DE LOGIN ============
 def login_view(request):
     """Vista para el inicio de sesión de usuarios"""
@@ -70,21 +95,24 @@ def login_view(request):
     # Si el método es POST, procesamos el formulario de login
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)  # Creamos el formulario con los datos enviados
-        if form.is_valid():  # Si el formulario es válido
-            username = form.cleaned_data.get('username')  # Obtenemos el nombre de usuario
-            password = form.cleaned_data.get('password')  # Obtenemos la contraseña
-            user = authenticate(username=username, password=password)  # Autenticamos al usuario
-            if user is not None:  # Si la autenticación fue exitosa
-                login(request, user)  # Iniciamos sesión
-                messages.success(request, f'Bienvenido {username}!')  # Mensaje de bienvenida
-                return redirect('home')  # Redirigimos al home
-            else:
-                messages.error(request, 'Usuario o contraseña incorrectos')  # Mensaje de error
-        else:
-            messages.error(request, 'Usuario o contraseña incorrectos')  # Mensaje de error si el formulario no es válido
+        username = request.POST.get('username', '')
+        ip = acceso.ip_de(request)
+        # Demasiados fallos: se rechaza sin calcular el hash de la contraseña
+        if acceso.bloqueado(username, ip):
+            messages.error(request, 'Demasiados intentos fallidos. Espera unos minutos e inténtalo de nuevo.')
+            return render(request, 'tienda/login.html', {'form': AuthenticationForm()}, status=429)
+        # is_valid() ya llama a authenticate(): el hash se calcula una sola vez
+        if form.is_valid():
+            user = form.get_user()  # El usuario que autenticó el formulario
+            acceso.registrar_exito(username, ip)
+            login(request, user)  # Iniciamos sesión
+            messages.success(request, f'Bienvenido {user.get_username()}!')  # Mensaje de bienvenida
+            return redirect('home')  # Redirigimos al home
+        acceso.registrar_fallo(username, ip)
+        messages.error(request, 'Usuario o contraseña incorrectos')  # Mensaje de error si el formulario no es válido
     else:
         form = AuthenticationForm()  # Si es GET, creamos un formulario vacío
-    
+
     return render(request, 'tienda/login.html', {'form': form})  # Renderizamos el template de login
 
 
@@ -98,47 +126,186 @@ def logout_view(request):
 
 # ============ VISTA PRINCIPAL (HOME) ============
 @login_required  # Decorador que requiere autenticación para acceder a esta vista
-def home(request):
-    """Vista principal que muestra el dashboard con estadísticas"""
-    
-    # --- OBTENER FECHA DE HOY (LA PARTE IMPORTANTE) ---
-    today = timezone.now().date()  # <-- Aquí se define 'today' como solo la fecha
-
-    # --- CONSULTAS DE ESTADÍSTICAS ---
-    
-    total_productos = Producto.objects.count()
-    total_categorias = Categoria.objects.count()
-    total_proveedores = Proveedor.objects.count()
-    total_clientes = Cliente.objects.count()
-    
-    ventas_de_hoy = Venta.objects.filter(fecha_venta__date=today)
+@versiones.condicional(Producto, Categoria, Proveedor, Cliente, Venta, por_dia=True)  # 304 si nada cambió
+async def home(request):
+    """Vista principal que muestra el dashboard con estadísticas (async, ver tienda/asincrono.py)"""
     
-    total_ventas_hoy = ventas_de_hoy.aggregate(
-        total_sum=Sum('total')
-    ).get('total_sum') or 0.00
-    
-    conteo_ventas_hoy = ventas_de_hoy.count()
+    # --- ESTADÍSTICAS (cacheadas y mantenidas por señales; sin caché, los conteos van en paralelo) ---
+    stats = await estadisticas.aobtener_estadisticas()
     
     productos_recientes = Producto.objects.order_by('-fecha_creacion')[:5]
     
+    context = dict(stats, productos_recientes=productos_recientes)
+    
+    return await asincrono.renderizar(request, 'tienda/home.html', context)
+
+# ============ VISTA DE REGISTRO DE VENTAS (CAJA) ============
+@login_required  # Todos los roles pueden vender
+def venta_crear(request):
+    """Vista para registrar una venta con sus renglones; descuenta el stock"""
+    if request.method == 'POST':
+        form = VentaForm(request.POST)
+        renglones = DetalleVentaFormSet(request.POST, prefix='renglones')
+        if form.is_valid() and renglones.is_valid():
+            # Solo los renglones que el cajero llenó
+            lineas = [(r['producto'], r['cantidad']) for r in renglones.cleaned_data if r]
+            try:
+                venta = registrar_venta(lineas, vendedor=request.user, cliente=form.cleaned_data['cliente'])
+            except ErrorVenta as exc:
+                messages.error(request, f'⚠️ No se registró la venta: {exc}')
+            else:
+                messages.success(request, f'Venta #{venta.pk} registrada por ${venta.total:.2f}')
+                return redirect('venta_crear')  # Caja lista para la siguiente venta
+    else:
+        form = VentaForm()
+        renglones = DetalleVentaFormSet(prefix='renglones')
+
+    return render(request, 'tienda/venta_form.html', {'form': form, 'renglones': renglones})
+
+
+# ============ VISTA DE REPORTES DE VENTAS ============
+REPORTES_TOP_MAX = 50  # Máximo de filas en los rankings
+# Fechas aceptadas en el query string: con margen para sumar un día o pasar a UTC
+FECHA_MINIMA = datetime.date(1900, 1, 1)
+FECHA_MAXIMA = datetime.date(9998, 12, 31)
+
+
+def _fecha_param(request, nombre):
+    """
+    Lee una fecha AAAA-MM-DD del query string; None si falta o es inválida. Se acota
+    a [FECHA_MINIMA, FECHA_MAXIMA]: ?hasta=9999-12-31 no desborda al sumarle un día.
+    """
+    try:
+        fecha = datetime.date.fromisoformat(request.GET.get(nombre, ''))
+    except ValueError:
+        return None
+    return min(max(fecha, FECHA_MINIMA), FECHA_MAXIMA)
+
+
+@login_required
+@rol_requerido('gerente', 'administrador')
+async def reportes_ventas(request):
+    """
+    Vista de reportes de ventas (datos agregados del resumen diario). Es async: los
+    cuatro reportes son independientes y se calculan a la vez (ver tienda/asincrono.py).
+
+    Parámetros GET:
+        desde, hasta: rango de fechas AAAA-MM-DD (ambas inclusive; por defecto los últimos 30 días)
+        granularidad: 'dia', 'semana' o 'mes'
+        top: tamaño de los rankings de vendedores y clientes
+    """
+    desde, hasta = reportes.rango_por_defecto()
+    desde = _fecha_param(request, 'desde') or desde
+    hasta_inclusive = _fecha_param(request, 'hasta') or (hasta - datetime.timedelta(days=1))
+    if hasta_inclusive < desde:
+        desde, hasta_inclusive = hasta_inclusive, desde
+    hasta = hasta_inclusive + datetime.timedelta(days=1)  # Internamente el rango es semiabierto [desde, hasta)
+
+    granularidad = request.GET.get('granularidad', 'dia')
+    if granularidad not in reportes.GRANULARIDADES:
+        granularidad = 'dia'
+    top = _entero_param(request, 'top', 10, 1, REPORTES_TOP_MAX)
+
     context = {
-        'total_productos': total_productos,
-        'total_categorias': total_categorias,
-        'total_proveedores': total_proveedores,
-        'total_clientes': total_clientes,
-        'productos_recientes': productos_recientes,
-        'total_ventas_hoy': total_ventas_hoy,
-        'conteo_ventas_hoy': conteo_ventas_hoy,
+        'desde': desde,
+        'hasta': hasta_inclusive,
+        'granularidad': granularidad,
+        'top': top,
+        **await asincrono.en_paralelo(
+            por_periodo=lambda: reportes.ingresos_por_periodo(desde, hasta, granularidad),
+            por_vendedor=lambda: reportes.ranking_vendedores(desde, hasta, top),
+            por_cliente=lambda: reportes.ranking_clientes(desde, hasta, top),
+            comparacion=lambda: reportes.comparar_con_anterior(desde, hasta),
+        ),
     }
-    
-    return render(request, 'tienda/home.html', context)
+    return await asincrono.renderizar(request, 'tienda/reportes.html', context)
+
+
+# ============ VISTA DE REORDEN (STOCK BAJO) ============
+@login_required
+@rol_requerido('gerente', 'administrador')
+def reorden_lista(request):
+    """Productos activos con stock bajo, agrupados por proveedor (solo lee los marcados, ver reorden.py)"""
+    productos = reorden.lista_de_reorden()
+    return render(request, 'tienda/reorden_lista.html', {'productos': productos})
+
 
 # ============ VISTAS CRUD PARA PRODUCTOS ============
+# Parámetros de paginación de la lista de productos (se pueden cambiar por query string)
+PRODUCTOS_POR_PAGINA = 25  # Tamaño de página por defecto
+PRODUCTOS_POR_PAGINA_MAX = 100  # Límite para que nadie pida 200k filas de golpe
+BUSQUEDA_PAGINAS_MAX = 50  # Páginas de resultados de una búsqueda (más allá ya no son relevantes)
+ORDENES_PRODUCTO = {
+    'recientes': True,  # fecha_creacion descendente (más nuevos primero)
+    'antiguos': False,  # fecha_creacion ascendente
+}
+
+
+def _entero_param(request, nombre, defecto, minimo, maximo):
+    """Lee un entero del query string y lo acota a [minimo, maximo]; usa `defecto` si no es válido"""
+    try:
+        valor = int(request.GET.get(nombre, defecto))
+    except (TypeError, ValueError):
+        return defecto
+    return max(minimo, min(valor, maximo))
+
+
 @login_required
+@versiones.condicional(Producto, Categoria)  # Las cajas la recargan todo el día: 304 si nada cambió
 def producto_lista(request):
-    """Vista que lista todos los productos"""
-    productos = Producto.objects.all()  # Obtenemos todos los productos de la base de datos
-    return render(request, 'tienda/producto_lista.html', {'productos': productos})  # Renderizamos template con la lista
+    """
+    Vista que lista los productos paginados por cursor.
+
+    Parámetros GET:
+        cursor: posición devuelta por la página anterior/siguiente
+        por_pagina: filas por página (1..PRODUCTOS_POR_PAGINA_MAX)
+        orden: 'recientes' (por defecto) o 'antiguos'
+        q: texto a buscar; si viene, los resultados van por relevancia
+        pagina: con q, número de página de los resultados (1..BUSQUEDA_PAGINAS_MAX)
+    """
+    por_pagina = _entero_param(request, 'por_pagina', PRODUCTOS_POR_PAGINA, 1, PRODUCTOS_POR_PAGINA_MAX)
+    orden = request.GET.get('orden', 'recientes')
+    if orden not in ORDENES_PRODUCTO:
+        orden = 'recientes'
+
+    # JOIN con categoría (evita una consulta por fila) y solo las columnas que muestra la tabla
+    productos = Producto.objects.select_related('categoria').only(
+        'id', 'nombre', 'precio_venta', 'stock', 'requiere_reorden', 'fecha_creacion', 'modificado',
+        'categoria__nombre', 'categoria__modificado',
+    )
+    q = request.GET.get('q', '').strip()
+    if q:
+        # Búsqueda rankeada sobre el índice de trigramas. El orden es por relevancia (no
+        # hay columna para un cursor): se pagina por número, pidiendo una fila de más
+        # para saber si hay página siguiente
+        numero = _entero_param(request, 'pagina', 1, 1, BUSQUEDA_PAGINAS_MAX)
+        resultados = busqueda.buscar_productos(q, queryset=productos, limite=por_pagina + 1,
+                                               desde=(numero - 1) * por_pagina)
+        context = {
+            'productos': resultados[:por_pagina],
+            'pagina': None,
+            'q': q,
+            'numero': numero,
+            'hay_siguiente': len(resultados) > por_pagina and numero < BUSQUEDA_PAGINAS_MAX,
+            'orden': orden,
+            'por_pagina': por_pagina,
+        }
+        return render(request, 'tienda/producto_lista.html', context)
+
+    paginador = PaginadorKeyset(productos, ('fecha_creacion', 'id'),
+                                descendente=ORDENES_PRODUCTO[orden], por_pagina=por_pagina)
+    try:
+        pagina = paginador.pagina(request.GET.get('cursor'))
+    except CursorInvalido:
+        pagina = paginador.pagina()  # Cursor dañado o de otro orden: volvemos a la primera página
+
+    context = {
+        'productos': pagina,
+        'pagina': pagina,
+        'orden': orden,
+        'por_pagina': por_pagina,
+    }
+    return render(request, 'tienda/producto_lista.html', context)  # Renderizamos template con la página
 
 
 @login_required
@@ -148,7 +315,7 @@ def producto_crear(request):
     if request.method == 'POST':  # Si se envió el formulario
         form = ProductoForm(request.POST)  # Creamos el formulario con los datos enviados
         if form.is_valid():  # Si el formulario es válido (todos los campos correctos)
-            form.save()  # Guardamos el producto en la base de datos
+            inventario.guardar_producto(form, usuario=request.user)  # Guardamos el producto y su stock inicial en el libro
             messages.success(request, 'Producto creado exitosamente')  # Mensaje de éxito
             return redirect('producto_lista')  # Redirigimos a la lista de productos
     else:
@@ -165,9 +332,14 @@ def producto_editar(request, pk):
     if request.method == 'POST':
         form = ProductoForm(request.POST, instance=producto)  # Creamos el formulario con los datos del producto existente
         if form.is_valid():
-            form.save()  # Guardamos los cambios
-            messages.success(request, 'Producto actualizado exitosamente')
-            return redirect('producto_lista')
+            # El stock no se sobrescribe: la diferencia contra el valor mostrado se registra como ajuste
+            try:
+                inventario.guardar_producto(form, usuario=request.user)
+            except inventario.SinStock:
+                form.add_error('stock', 'El stock cambió mientras editabas (hubo ventas) y el ajuste lo dejaría negativo. Revisa el valor.')
+            else:
+                messages.success(request, 'Producto actualizado exitosamente')
+                return redirect('producto_lista')
     else:
         form = ProductoForm(instance=producto)  # Mostramos el formulario con los datos actuales del producto
     
@@ -177,10 +349,10 @@ def producto_editar(request, pk):
 @login_required
 @rol_requerido('administrador')  # Solo Administrador puede eliminar
 def producto_eliminar(request, pk):
-    """Vista para eliminar un producto"""
-    producto = get_object_or_404(Producto, pk=pk)  # Obtenemos el producto
+    """Vista para eliminar (desactivar) un producto"""
+    producto = get_object_or_404(Producto, pk=pk)  # Obtenemos el producto (solo los activos)
     if request.method == 'POST':  # Confirmación de eliminación debe ser POST por seguridad
-        producto.delete()  # Eliminamos el producto de la base de datos
+        papelera.desactivar(producto)  # Eliminación lógica: el borrado real lo hace purgar_inactivos
         messages.success(request, 'Producto eliminado exitosamente')
         return redirect('producto_lista')
     
@@ -190,6 +362,7 @@ def producto_eliminar(request, pk):
 # ============ VISTAS CRUD PARA CATEGORÍAS ============
 @login_required
 @rol_requerido('gerente', 'administrador')  # Vendedor NO puede ver categorías
+@versiones.condicional(Categoria)
 def categoria_lista(request):
     """Vista que lista todas las categorías"""
     categorias = Categoria.objects.all()
@@ -232,10 +405,10 @@ def categoria_editar(request, pk):
 @login_required
 @rol_requerido('administrador')  # Solo Administrador
 def categoria_eliminar(request, pk):
-    """Vista para eliminar una categoría"""
+    """Vista para eliminar (desactivar) una categoría junto con sus productos"""
     categoria = get_object_or_404(Categoria, pk=pk)
     if request.method == 'POST':
-        categoria.delete()
+        papelera.desactivar(categoria)  # Un UPDATE de sus productos, no un DELETE en cascada
         messages.success(request, 'Categoría eliminada exitosamente')
         return redirect('categoria_lista')
     
@@ -245,6 +418,7 @@ def categoria_eliminar(request, pk):
 # ============ VISTAS CRUD PARA PROVEEDORES ============
 @login_required
 @rol_requerido('gerente', 'administrador')  # Vendedor NO puede ver proveedores
+@versiones.condicional(Proveedor)
 def proveedor_lista(request):
     """Vista que lista todos los proveedores"""
     proveedores = Proveedor.objects.all()
@@ -287,10 +461,10 @@ def proveedor_editar(request, pk):
 @login_required
 @rol_requerido('administrador')
 def proveedor_eliminar(request, pk):
-    """Vista para eliminar un proveedor"""
+    """Vista para eliminar (desactivar) un proveedor"""
     proveedor = get_object_or_404(Proveedor, pk=pk)
     if request.method == 'POST':
-        proveedor.delete()
+        papelera.desactivar(proveedor)
         messages.success(request, 'Proveedor eliminado exitosamente')
         return redirect('proveedor_lista')
     
@@ -299,6 +473,7 @@ def proveedor_eliminar(request, pk):
 
 # ============ VISTAS CRUD PARA CLIENTES ============
 @login_required
+@versiones.condicional(Cliente)
 def cliente_lista(request):
     """Vista que lista todos los clientes"""
     clientes = Cliente.objects.all()
@@ -341,11 +516,137 @@ def cliente_editar(request, pk):
 @login_required
 @rol_requerido('administrador')
 def cliente_eliminar(request, pk):
-    """Vista para eliminar un cliente"""
+    """Vista para eliminar (desactivar) un cliente; sus ventas lo siguen referenciando"""
     cliente = get_object_or_404(Cliente, pk=pk)
     if request.method == 'POST':
-        cliente.delete()
+        papelera.desactivar(cliente)
         messages.success(request, 'Cliente eliminado exitosamente')
         return redirect('cliente_lista')
     
-    return render(request, 'tienda/cliente_eliminar.html', {'cliente': cliente})
\ No newline at end of file
+    return render(request, 'tienda/cliente_eliminar.html', {'cliente': cliente})
+
+
+# ============ EXPORTACIONES (CSV / XLSX) ============
+# Cada exportación aplica los mismos filtros que su lista y respeta los mismos roles.
+EXPORTACION_LIMITE_BUSQUEDA = 10000  # Resultados máximos de una búsqueda exportada
+
+
+@login_required
+def producto_exportar(request):
+    """Exporta los productos (con el mismo ?q= de la lista, si viene)"""
+    productos = Producto.objects.all()
+    q = request.GET.get('q', '').strip()
+    if q:
+        ids = [pk for pk, _ in busqueda.buscar_ids(q, limite=EXPORTACION_LIMITE_BUSQUEDA)]
+        productos = productos.filter(pk__in=ids)
+    columnas = [
+        ('id', 'ID'), ('nombre', 'Nombre'), ('precio_venta', 'Precio Venta'), ('stock', 'Stock'),
+        ('categoria__nombre', 'Categoría'), ('proveedor__empresa', 'Proveedor'),
+        ('activo', 'Activo'), ('fecha_creacion', 'Fecha de Creación'),
+    ]
+    return exportar(request, 'productos', productos, columnas)
+
+
+@login_required
+@rol_requerido('gerente', 'administrador')
+def categoria_exportar(request):
+    """Exporta las categorías"""
+    columnas = [('id', 'ID'), ('nombre', 'Nombre'), ('descripcion', 'Descripción')]
+    return exportar(request, 'categorias', Categoria.objects.all(), columnas)
+
+
+@login_required
+@rol_requerido('gerente', 'administrador')
+def proveedor_exportar(request):
+    """Exporta los proveedores"""
+    columnas = [
+        ('id', 'ID'), ('nombre', 'Nombre del Contacto'), ('empresa', 'Empresa'),
+        ('telefono', 'Teléfono'), ('email', 'Correo Electrónico'), ('direccion', 'Dirección'),
+    ]
+    return exportar(request, 'proveedores', Proveedor.objects.all(), columnas)
+
+
+@login_required
+def cliente_exportar(request):
+    """Exporta los clientes"""
+    columnas = [
+        ('id', 'ID'), ('nombre', 'Nombre'), ('apellido', 'Apellido'), ('email', 'Correo Electrónico'),
+        ('telefono', 'Teléfono'), ('direccion', 'Dirección'), ('fecha_registro', 'Fecha de Registro'),
+    ]
+    return exportar(request, 'clientes', Cliente.objects.all(), columnas)
+
+
+@login_required
+@rol_requerido('gerente', 'administrador')
+def venta_exportar(request):
+    """
+    Exporta las ventas.
+
+    Parámetros GET (los mismos que reportes): desde, hasta (AAAA-MM-DD, inclusive)
+    y vendedor (ID de usuario).
+    """
+    ventas = Venta.objects.all()
+    desde = _fecha_param(request, 'desde')
+    hasta = _fecha_param(request, 'hasta')
+    if desde:
+        ventas = ventas.filter(fecha_venta__gte=estadisticas.rango_del_dia(desde)[0])
+    if hasta:
+        ventas = ventas.filter(fecha_venta__lt=estadisticas.rango_del_dia(hasta)[1])
+    vendedor = _entero_param(request, 'vendedor', 0, 0, 2 ** 63 - 1)
+    if vendedor:
+        ventas = ventas.filter(vendido_por_id=vendedor)
+    columnas = [
+        ('id', 'ID'), ('fecha_venta', 'Fecha'), ('total', 'Total'),
+        ('cliente__nombre', 'Nombre del Cliente'), ('cliente__apellido', 'Apellido del Cliente'),
+        ('vendido_por__username', 'Vendido por'),
+    ]
+    # Orden cronológico: el índice de fecha (o vendedor + fecha) ya entrega las filas en ese orden
+    return exportar(request, 'ventas', ventas, columnas, orden=('fecha_venta', 'pk'))
+
+
+@login_required
+@rol_requerido('gerente', 'administrador')
+def reorden_exportar(request):
+    """Exporta la lista de reorden (para enviar pedidos a los proveedores)"""
+    productos = Producto.objects.filter(**reorden.FILTRO_REORDEN).annotate(umbral=reorden.umbral())
+    columnas = [
+        ('proveedor__empresa', 'Empresa'), ('proveedor__nombre', 'Proveedor'), ('id', 'ID'),
+        ('nombre', 'Producto'), ('stock', 'Stock'), ('umbral', 'Stock Mínimo'),
+    ]
+    return exportar(request, 'reorden', productos, columnas)
+
+
+# ============ PERFILES DE PETICIONES LENTAS (SOLO SUPERUSUARIOS) ============
+PERFIL_PILAS_MAX = 30  # Pilas distintas que se muestran en el detalle (la descarga las trae todas)
+
+
+@user_passes_test(lambda u: u.is_active and u.is_superuser, login_url='login')
+def perfiles_lista(request):
+    """Perfiles guardados por PerfiladorMiddleware, los más lentos primero"""
+    return render(request, 'tienda/perfiles_lista.html', {'perfiles': perfilado.recientes()})
+
+
+@user_passes_test(lambda u: u.is_active and u.is_superuser, login_url='login')
+def perfil_detalle(request, nombre):
+    """Pilas más frecuentes y consultas agrupadas de un perfil; ?formato=folded|json lo descarga"""
+    try:
+        datos = perfilado.cargar(nombre)
+    except (FileNotFoundError, ValueError):
+        raise Http404('El perfil no existe (el buffer circular pudo haberlo descartado)')
+
+    formato = request.GET.get('formato')
+    if formato in ('folded', 'json'):
+        if formato == 'folded':
+            respuesta = HttpResponse(perfilado.colapsado(datos), content_type='text/plain; charset=utf-8')
+        else:
+            respuesta = HttpResponse(json.dumps(datos, ensure_ascii=False, indent=2),
+                                     content_type='application/json; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="perfil-{nombre}.{formato}"'
+        return respuesta
+
+    total = datos['muestras'] or 1
+    pilas = [
+        {'pila': pila.split(';'), 'muestras': n, 'porcentaje': 100 * n / total}
+        for pila, n in sorted(datos['pilas'].items(), key=lambda p: -p[1])[:PERFIL_PILAS_MAX]
+    ]
+    return render(request, 'tienda/perfil_detalle.html', {'perfil': datos, 'pilas': pilas})